@@ -0,0 +1,97 @@
+
+# -*- coding: utf-8 -*-
+"""
+Benchmark del aplanador iterativo (src/util/flatten.py) frente a las
+implementaciones recursivas anteriores, con formas de mensaje WAMP típicas.
+
+    python -m bench.bench_flatten [repeticiones]
+"""
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Dict
+
+from src.util.flatten import flatten, flatten_dict
+from src.core.flat_view import flatten_json
+
+# --- implementaciones anteriores (referencia) ---
+
+def flatten_dict_rec(obj: Any, prefix: str = "") -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            p = f"{prefix}.{k}" if prefix else str(k)
+            out.update(flatten_dict_rec(v, p))
+    elif isinstance(obj, (list, tuple)):
+        for i, v in enumerate(obj):
+            out.update(flatten_dict_rec(v, f"{prefix}[{i}]"))
+    else:
+        out[prefix] = obj
+    return out
+
+def flatten_json_rec(obj: Any, prefix: str = "") -> "OrderedDict[str, Any]":
+    out: "OrderedDict[str, Any]" = OrderedDict()
+    p = f"{prefix}." if prefix else ""
+    if isinstance(obj, dict):
+        for k in sorted(obj.keys()):
+            out.update(flatten_json_rec(obj[k], f"{p}{k}" if prefix else k))
+        return out
+    if isinstance(obj, list):
+        for i, it in enumerate(obj):
+            out.update(flatten_json_rec(it, f"{prefix}[{i}]"))
+        return out
+    out[prefix] = obj
+    return out
+
+# --- formas de mensaje ---
+
+def event_small(i: int) -> dict:
+    """EVENT con kwargs planos (ticker)."""
+    return {"EP": {"id": i, "px": 101.25 + i % 7, "qty": i % 100, "side": "B", "ts": 1700000000 + i}}
+
+def event_nested(i: int) -> dict:
+    """Snapshot anidado con libro de 20 niveles por lado."""
+    return {"book": {"sym": "ABC", "seq": i,
+                     "bids": [{"px": 100 - j * 0.01, "qty": j + i % 5} for j in range(20)],
+                     "asks": [{"px": 100 + j * 0.01, "qty": j + i % 3} for j in range(20)]},
+            "meta": {"venue": "X", "flags": [1, 0, 1], "common": {"a": {"b": {"c": {"d": i}}}}}}
+
+def result_array(i: int) -> dict:
+    """RESULT con una lista grande de escalares."""
+    return {"rows": list(range(i % 10, i % 10 + 500)), "count": 500}
+
+def deep_chain(i: int, depth: int = 400) -> dict:
+    """Anidamiento muy profundo (la versión recursiva se acerca al límite de recursión)."""
+    o: Any = i
+    for d in range(depth):
+        o = {f"n{d % 3}": o}
+    return o
+
+SHAPES = [("event_small", event_small, 20000), ("event_nested", event_nested, 2000),
+          ("result_array", result_array, 1000), ("deep_chain", deep_chain, 500)]
+
+def _time(fn, items) -> float:
+    t = time.perf_counter()
+    for o in items:
+        fn(o)
+    return time.perf_counter() - t
+
+def main(rounds: int = 3):
+    cases = [
+        ("flatten_dict", flatten_dict_rec, lambda o: flatten_dict(o, "kw")),
+        ("flatten_json", flatten_json_rec, flatten_json),
+        ("json cap=16", None, lambda o: flatten_json(o, arrays="cap", max_items=16)),
+        ("json arrays=json", None, lambda o: flatten_json(o, arrays="json")),
+    ]
+    print(f"{'forma':14} {'caso':18} {'anterior':>10} {'nuevo':>10} {'x':>6}")
+    for name, make, n in SHAPES:
+        items = [make(i) for i in range(n)]
+        for label, old, new in cases:
+            t_old = min(_time(old, items) for _ in range(rounds)) if old else None
+            t_new = min(_time(new, items) for _ in range(rounds))
+            old_txt = f"{t_old * 1e3:8.1f}ms" if t_old else "         -"
+            ratio = f"{t_old / t_new:5.2f}" if t_old else "    -"
+            print(f"{name:14} {label:18} {old_txt} {t_new * 1e3:8.1f}ms {ratio}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark del JSON del extractor: MB/s de json (biblioteca
+estándar) frente a src.core.jsoncodec con el motor instalado (orjson,
+simdjson o el propio json) sobre los payloads de unas capturas.
+
+    python -m bench.bench_json captura.pcap [más.pcapng ...]
+    python -m bench.bench_json                  # mensajes sintéticos de bench_records
+
+Casos: decodificar el raw de cada mensaje (arrays WAMP y objetos TCP-JSON),
+codificarlo de nuevo con los separadores por defecto (raw, NDJSON, hoja
+Raw) y en compacto (celdas de listas/dicts). Comprueba además que las
+salidas de ambos son idénticas.
+"""
+import json
+import sys
+import time
+from typing import Any, List
+
+from src.core import jsoncodec
+from src.core.pcap_parser import Filters
+from src.core.pcap_processor import process_pcap_to_records
+
+
+def capture_payloads(paths: List[str]) -> List[str]:
+    texts = []
+    for p in paths:
+        for rec in process_pcap_to_records(p, Filters(backend="NATIVE")):
+            raw = rec.get("raw")
+            if isinstance(raw, str) and raw:
+                texts.append(raw)
+    return texts
+
+
+def synthetic_payloads(n: int = 20000) -> List[str]:
+    from bench.bench_records import raw_messages
+    return [m[-1] for m in raw_messages(n)]
+
+
+def _best(fn, rounds: int = 3) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def _nested(objs: List[Any]) -> List[Any]:
+    """Listas/dicts dentro de cada mensaje: lo que acaba en celdas JSON compactas."""
+    out = []
+    for o in objs:
+        stack = [o]
+        while stack:
+            v = stack.pop()
+            if isinstance(v, dict):
+                out.append(v)
+                stack.extend(v.values())
+            elif isinstance(v, list):
+                out.append(v)
+                stack.extend(v)
+    return out
+
+
+def main(paths: List[str]) -> None:
+    texts = capture_payloads(paths) if paths else synthetic_payloads()
+    objs = []
+    for t in texts:
+        try:
+            objs.append(json.loads(t))
+        except ValueError:
+            pass  # texto no JSON (TCP-JSON con basura): no cuenta
+    texts = [json.dumps(o, ensure_ascii=False) for o in objs]
+    cells = _nested(objs)
+    if not objs:
+        print("sin payloads JSON", file=sys.stderr)
+        return
+
+    std_compact = lambda o: json.dumps(o, ensure_ascii=False, separators=(",", ":"))
+    cases = [
+        ("decode (raw)", texts, lambda t: json.loads(t), jsoncodec.loads),
+        ("encode (raw/NDJSON)", objs, lambda o: json.dumps(o, ensure_ascii=False), jsoncodec.dumps),
+        ("encode compacto (celdas)", cells, std_compact, lambda o: jsoncodec.dumps(o, compact=True)),
+    ]
+    src = ", ".join(paths) if paths else "sintéticos"
+    print(f"{len(objs)} payloads ({src}); motor: {jsoncodec.BACKEND}")
+    print(f"{'caso':26} {'stdlib':>12} {jsoncodec.BACKEND:>12} {'x':>6}")
+    for label, items, std, fast in cases:
+        ref = [std(x) for x in items]
+        if [fast(x) for x in items] != ref:
+            print(f"{label}: ¡salida distinta de json!", file=sys.stderr)
+            sys.exit(1)
+        # MB de texto JSON que entra (decode) o sale (encode)
+        nbytes = sum(len(s.encode("utf-8")) for s in (items if label.startswith("decode") else ref))
+        t_std = _best(lambda: [std(x) for x in items])
+        t_fast = _best(lambda: [fast(x) for x in items])
+        print(f"{label:26} {nbytes / t_std / 1e6:8.1f}MB/s {nbytes / t_fast / 1e6:8.1f}MB/s {t_std / t_fast:5.1f}x")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Memoria residente de los registros extraídos: dict por mensaje (con
+args/kwargs parseados y raw) frente a Record (__slots__, cadenas
+internadas, args/kwargs desde raw bajo demanda). Mide también el caso de
+la GUI, con FlatViews indexando el esquema de columnas de cada lote.
+
+    python -m bench.bench_records [mensajes]
+"""
+import json
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+from src.core.flat_view import FlatViews
+from src.core.pcap_parser import _root_key, finalize_message
+from src.core.record import Record, clear_payload_cache
+from src.core.wamp_parser import WampSessions
+
+HOSTS = [f"10.0.{i // 256}.{i % 256}" for i in range(40)]
+TOPICS = [f"com.example.topic.{i}" for i in range(25)]
+
+
+def raw_messages(n: int, seed: int = 1) -> List[tuple]:
+    """(epoch, stream, src, dst, sport, dport, texto) con EVENT/CALL/RESULT típicos."""
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        h = rnd.randrange(len(HOSTS))
+        body = {"MsgEV": {"seq": i, "price": rnd.random() * 100, "qty": rnd.randrange(1000),
+                          "tags": ["a", "b", "c"][: rnd.randrange(4)],
+                          "common": {"src": HOSTS[h], "ts": 1_700_000_000 + i}}}
+        kind = i % 3
+        if kind == 0:
+            arr = [36, 1000 + h, 5000 + i, {}, [], body]
+        elif kind == 1:
+            arr = [48, i, {}, TOPICS[i % len(TOPICS)], [i, "x"], body]
+        else:
+            arr = [50, i - 1, {}, [body]]
+        out.append((1_700_000_000 + i * 0.001, str(h), HOSTS[h], "10.1.0.1", 40000 + h, 8080,
+                    json.dumps(arr)))
+    return out
+
+
+def build_dicts(msgs: List[tuple]) -> List[Dict[str, Any]]:
+    """Registro anterior: dict con 14 claves + args/kwargs + raw."""
+    wamp = WampSessions()
+    recs = []
+    for epoch, stream, src, dst, sport, dport, text in msgs:
+        opcode, topic, args, kwargs, extra = wamp.decode(stream, text)
+        rec = {"time": "", "ms": "", "epoch": epoch, "stream": stream, "src": src, "dst": dst,
+               "src_port": sport, "dst_port": dport, "opcode": opcode, "topic": topic,
+               "type": _root_key(kwargs), "args": args, "kwargs": kwargs, "raw": text}
+        rec.update(extra)
+        recs.append(finalize_message(rec))
+    return recs
+
+
+def build_records(msgs: List[tuple]) -> List[Record]:
+    wamp = WampSessions()
+    recs = []
+    for epoch, stream, src, dst, sport, dport, text in msgs:
+        opcode, topic, args, kwargs, extra = wamp.decode(stream, text)
+        recs.append(Record(epoch, stream, src, dst, sport, dport, opcode, topic, _root_key(kwargs), text, extra))
+    return recs
+
+
+def measure(build, msgs, views: bool) -> tuple:
+    clear_payload_cache()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    recs = build(msgs)
+    fv = None
+    if views:
+        fv = FlatViews(recs)
+        fv.add(recs)
+    secs = time.perf_counter() - t0
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del recs, fv
+    return size, secs
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    msgs = raw_messages(n)
+    raw_bytes = sum(sys.getsizeof(m[-1]) for m in msgs)
+    print(f"{n} mensajes, raw {raw_bytes / 1e6:.1f} MB (común a ambos)")
+    for views in (False, True):
+        label = "con FlatViews" if views else "sólo registros"
+        old, t_old = measure(build_dicts, msgs, views)
+        new, t_new = measure(build_records, msgs, views)
+        print(f"{label:15s} dict {old / 1e6:8.1f} MB ({t_old:5.2f}s)   "
+              f"Record {new / 1e6:8.1f} MB ({t_new:5.2f}s)   x{old / max(new, 1):.2f}")
+
+
+if __name__ == "__main__":
+    main()
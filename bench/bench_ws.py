@@ -0,0 +1,122 @@
+
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark del desenmascarado WebSocket y del parseo/reensamblado de
+frames: MB/s de la versión anterior (byte a byte + bytearray) frente a la
+actual (XOR masivo + memoryview).
+
+    python -m bench.bench_ws [MB]
+"""
+import os
+import struct
+import sys
+import time
+from typing import List, Tuple
+
+from src.core import utils
+from src.core.pcap_native import WsFrameParser
+
+# --- implementaciones anteriores (referencia) ---
+
+def ws_unmask_old(payload: bytes, key: bytes) -> bytes:
+    return bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+
+class WsFrameParserOld:
+    def __init__(self):
+        self.buf = bytearray()
+
+    def feed(self, data: bytes) -> List[Tuple[int, int, int, bytes]]:
+        buf = self.buf
+        buf.extend(data)
+        frames = []
+        off, n = 0, len(buf)
+        while n - off >= 2:
+            b0, b1 = buf[off], buf[off + 1]
+            ln = b1 & 0x7F
+            hdr = 2
+            if ln == 126:
+                if n - off < 4:
+                    break
+                ln = (buf[off + 2] << 8) | buf[off + 3]
+                hdr = 4
+            elif ln == 127:
+                if n - off < 10:
+                    break
+                ln = struct.unpack_from("!Q", buf, off + 2)[0]
+                hdr = 10
+            masked = b1 & 0x80
+            if masked:
+                hdr += 4
+            if n - off < hdr + ln:
+                break
+            payload = bytes(buf[off + hdr:off + hdr + ln])
+            if masked:
+                payload = ws_unmask_old(payload, bytes(buf[off + hdr - 4:off + hdr]))
+            frames.append((b0 >> 7, (b0 >> 4) & 0x07, b0 & 0x0F, payload))
+            off += hdr + ln
+        if off:
+            del buf[:off]
+        return frames
+
+# --- datos ---
+
+def frame(payload: bytes, mask: bytes = b"") -> bytes:
+    n = len(payload)
+    b1 = 0x80 if mask else 0
+    if n < 126:
+        h = bytes([0x81, b1 | n])
+    elif n < 65536:
+        h = bytes([0x81, b1 | 126]) + struct.pack("!H", n)
+    else:
+        h = bytes([0x81, b1 | 127]) + struct.pack("!Q", n)
+    if mask:
+        payload = utils.ws_unmask(payload, mask)
+    return h + mask + payload
+
+def segments(stream: bytes, mss: int = 1460) -> List[bytes]:
+    return [stream[i:i + mss] for i in range(0, len(stream), mss)]
+
+def _mbps(nbytes: int, fn, rounds: int = 3) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return nbytes / best / 1e6
+
+def main(mb: float = 4.0):
+    total = int(mb * 1e6)
+    key = os.urandom(4)
+    print(f"{'caso':34} {'anterior':>10} {'actual':>10}")
+
+    for size in (64, 1024, 65536, 1 << 20):
+        chunks = [os.urandom(size) for _ in range(max(1, total // size))]
+        nbytes = size * len(chunks)
+        # la versión byte a byte es lenta: se mide sobre una fracción
+        sub = chunks[:max(1, len(chunks) // 16)]
+        old = _mbps(size * len(sub), lambda: [ws_unmask_old(c, key) for c in sub])
+        new = _mbps(nbytes, lambda: [utils.ws_unmask(c, key) for c in chunks])
+        print(f"{'unmask ' + str(size) + ' B':34} {old:8.1f}MB/s {new:8.1f}MB/s")
+
+    for size, masked in ((200, True), (16384, True), (1 << 20, True), (16384, False)):
+        payload = os.urandom(size)
+        count = max(1, total // size)
+        segs = segments(b"".join(frame(payload, key if masked else b"") for _ in range(count)))
+        nbytes = size * count
+        label = f"frames {size} B {'masked' if masked else 'plain'} (MSS 1460)"
+        def run(cls):
+            p = cls()
+            for s in segs:
+                p.feed(s)
+        new = _mbps(nbytes, lambda: run(WsFrameParser))
+        if masked:
+            # la versión anterior se mide sobre una fracción de los segmentos
+            count = max(1, count // 16)
+            segs = segments(b"".join(frame(payload, key) for _ in range(count)))
+            nbytes = size * count
+        old = _mbps(nbytes, lambda: run(WsFrameParserOld))
+        print(f"{label:34} {old:8.1f}MB/s {new:8.1f}MB/s")
+    print(f"numpy: {'sí' if utils._np is not None else 'no'} (umbral {utils.UNMASK_NUMPY_MIN} B)")
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 4.0)
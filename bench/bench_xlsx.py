@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+Velocidad de la exportación a Excel sobre registros sintéticos (los de
+bench_records): filas/s contando Mensajes y Raw, mejor de `repeticiones`.
+Las filas de las dos hojas se escriben en la misma pasada, así que cada
+registro son dos filas.
+
+    python -m bench.bench_xlsx [mensajes] [repeticiones]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from src.core.export_excel import export_to_xlsx
+
+from .bench_records import build_records, raw_messages
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 12_000
+    reps = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    recs = build_records(raw_messages(n))
+    try:
+        import lxml  # noqa: F401
+        writer = "lxml"
+    except ImportError:
+        writer = "et_xmlfile"
+    best = float("inf")
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "bench.xlsx")
+        for _ in range(reps):
+            t0 = time.perf_counter()
+            export_to_xlsx(recs, out)
+            best = min(best, time.perf_counter() - t0)
+        size = os.path.getsize(out)
+    rows = 2 * n
+    print(f"{n} registros ({rows} filas Mensajes+Raw, XML con {writer}): {best:.2f} s, "
+          f"{rows / best:,.0f} filas/s, {n / best:,.0f} registros/s, {size / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
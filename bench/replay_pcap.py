@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Reproduce una captura como si se estuviera capturando: escribe sus
+paquetes (en formato pcap) en un fichero que crece, una FIFO o stdout a
+un ritmo controlado. Sirve para probar el seguimiento en vivo sin red:
+
+    mkfifo /tmp/vivo.pcap
+    python -m bench.replay_pcap captura.pcapng /tmp/vivo.pcap --rate 2000 &
+    python -m src.cli --follow /tmp/vivo.pcap | head
+
+    python -m bench.replay_pcap captura.pcap - --speed 1 | python -m src.cli --follow -
+    python -m bench.replay_pcap captura.pcap /tmp/crece.pcap --rate 500   # GUI: Seguir captura…
+
+--rate fija paquetes por segundo; --speed reproduce los tiempos de la
+captura (1 = tiempo real, 10 = diez veces más rápido). Sin ninguno de
+los dos escribe todo de golpe. Todos los paquetes se escriben con el
+linktype del primero (pcapng con interfaces de distinto tipo no se
+reproduce bien).
+"""
+import argparse
+import os
+import struct
+import sys
+import time
+
+from src.core.pcap_native import PCAP_MAGICS, iter_packets, open_capture
+
+# magic pcap según la resolución de las marcas de tiempo
+PCAP_MAGIC = {1e-6: 0xA1B2C3D4, 1e-9: 0xA1B23C4D}
+
+
+def pcap_header(linktype: int, res: float) -> bytes:
+    return struct.pack("<IHHiIII", PCAP_MAGIC[res], 2, 4, 0, 0, 0x40000, linktype)
+
+
+def pcap_record(epoch: float, data, res: float) -> bytes:
+    # misma resolución que el origen: el lector obtiene el mismo epoch
+    sec = int(epoch)
+    frac = int(round((epoch - sec) / res))
+    if frac * res >= 1.0:
+        sec, frac = sec + 1, 0
+    return struct.pack("<IIII", sec, frac, len(data), len(data)) + bytes(data)
+
+
+def replay(src: str, out, rate: float = 0.0, speed: float = 0.0, burst: int = 1) -> int:
+    """Escribe los paquetes de `src` en `out` (binario); devuelve cuántos."""
+    buf = open_capture(src)
+    # pcapng: resolución por defecto (µs); pcap: la de su cabecera
+    res = PCAP_MAGICS.get(bytes(buf[:4]), ("<", 1e-6))[1]
+    count = 0
+    t0 = time.monotonic()
+    first_ts = None
+    pending = []
+    for ts, linktype, data, _ in iter_packets(buf):
+        if count == 0:
+            out.write(pcap_header(linktype, res))
+        if first_ts is None:
+            first_ts = ts
+        pending.append(pcap_record(ts, data, res))
+        count += 1
+        if len(pending) < burst:
+            continue
+        # momento en que debería salir este paquete
+        due = count / rate if rate > 0 else (ts - first_ts) / speed if speed > 0 else 0.0
+        delay = t0 + due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        out.write(b"".join(pending))
+        out.flush()
+        pending = []
+    if pending:
+        out.write(b"".join(pending))
+    out.flush()
+    return count
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(prog="python -m bench.replay_pcap", description=__doc__.split("\n\n")[0])
+    ap.add_argument("pcap", help="captura de origen (pcap o pcapng)")
+    ap.add_argument("out", help="fichero (se va escribiendo), FIFO o '-' para stdout")
+    pace = ap.add_mutually_exclusive_group()
+    pace.add_argument("--rate", type=float, default=0.0, help="paquetes por segundo")
+    pace.add_argument("--speed", type=float, default=0.0, help="factor sobre los tiempos de la captura")
+    ap.add_argument("--burst", type=int, default=1, help="paquetes por escritura")
+    args = ap.parse_args()
+    out = sys.stdout.buffer if args.out == "-" else open(args.out, "wb")
+    t0 = time.perf_counter()
+    try:
+        n = replay(args.pcap, out, args.rate, args.speed, max(1, args.burst))
+    except (BrokenPipeError, KeyboardInterrupt):
+        # el lector se cerró antes de tiempo
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return
+    finally:
+        if out is not sys.stdout.buffer:
+            try:
+                out.close()
+            except BrokenPipeError:
+                pass
+    print(f"{n} paquetes en {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
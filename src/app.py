@@ -1,34 +1,20 @@
 
 # -*- coding: utf-8 -*-
-import os, json
+import os
+from functools import partial
 from typing import List, Dict
-from PyQt5 import QtWidgets, QtCore, QtGui
+from PyQt5 import QtWidgets, QtCore
 from .ui.main_window import MainWindow
-from .ui.filters_dialog import FiltersDialog
-from .ui.help_dialog import HelpDialog
-from .core.pcap_parser import Filters
-from .core.pcap_processor import process_pcap_to_records
-from .io.ndjson_io import read_ndjson, write_ndjson
-from .core.export_excel import export_to_xlsx
-from .util.flatten import flatten_dict
-
-class RecordsModel(QtGui.QStandardItemModel):
-    COLS = ["time","ms","epoch","stream","src","dst","opcode","topic","type"]
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setColumnCount(len(self.COLS))
-        self.setHorizontalHeaderLabels(self.COLS)
-
-    def load(self, items: List[Dict]):
-        self.setRowCount(0)
-        for r in items:
-            row = []
-            for c in self.COLS:
-                val = r.get(c, "")
-                it = QtGui.QStandardItem(str(val))
-                it.setEditable(False)
-                row.append(it)
-            self.appendRow(row)
+from .core.filters import Filters, CancelToken
+from .ui.records_model import RecordsModel
+# Exportadores (openpyxl), diálogos, el worker de extracción y el núcleo
+# (vistas aplanadas, latencias, caché de sesiones, JSON) se importan al
+# usarlos por primera vez: no cuentan en el arranque (tests/test_startup.py).
+
+# seguimiento en vivo: la tabla guarda como mucho FOLLOW_MAX_ROWS mensajes;
+# los más antiguos se descartan en bloques de FOLLOW_EVICT_CHUNK
+FOLLOW_MAX_ROWS = int(os.environ.get("WAMP_EXTRACTOR_FOLLOW_ROWS", "200000"))
+FOLLOW_EVICT_CHUNK = max(1, FOLLOW_MAX_ROWS // 10)
 
 class Controller(QtCore.QObject):
     def __init__(self, app):
@@ -38,28 +24,218 @@ class Controller(QtCore.QObject):
         self.model = RecordsModel()
         self.win.set_model(self.model)
         self.records: List[Dict] = []
+        # vistas aplanadas compartidas por exportadores y tabla (ver views)
+        self._views = None
+        self.model.set_tooltip_provider(lambda row: self.views.preview(self.records[row]))
+        # latencias CALL->RESULT y PUBLISH->EVENT, alimentadas lote a lote
+        # (se crean al empezar la primera sesión)
+        self.analytics = None
         self.filters = Filters(mode="AUTO")
+        self._cache = None
+        self.cancel = None
+        self.thread = None
+        self.worker = None
+        self.following = False
+        self.evicted = 0        # mensajes descartados por el búfer circular
+        # descartes de búferes de reensamblado de la última extracción (hoja Resumen)
+        self.buffer_stats: Dict[str, int] = {}
+        app.aboutToQuit.connect(self.cancel_processing)
         self.win.show()
 
+    @property
+    def views(self):
+        if self._views is None:
+            from .core.flat_view import FlatViews
+            self._views = FlatViews(self.records)
+        return self._views
+
+    @property
+    def cache(self):
+        """Extracciones ya hechas: reabrir una captura no vuelve a lanzar tshark."""
+        if self._cache is None:
+            from .core.session_cache import SessionCache
+            self._cache = SessionCache()
+        return self._cache
+
     # ----------------- actions -----------------
 
     def open_pcap(self):
         path, _ = QtWidgets.QFileDialog.getOpenFileName(self.win, "Abrir PCAP/PCAPNG", "", "PCAP(*.pcap *.pcapng)")
         if not path: return
-        self.win.show_message("Procesando PCAP…")
-        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        self._reset_session()
+        if self._open_cached(path):
+            return
+        self.win.show_message("Procesando PCAP…", 0)
+        self._start_worker(path, follow=False)
+
+    def follow_capture(self):
+        """Sigue una captura en curso (dumpcap/tcpdump -w) o una FIFO hasta cancelar."""
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self.win, "Seguir captura en curso", "", "PCAP(*.pcap *.pcapng);;Todos los ficheros (*)")
+        if not path: return
+        self._reset_session()
+        self.following = True
+        self.win.show_message(f"Siguiendo {os.path.basename(path)}… (Cancelar para detener)", 0)
+        self._start_worker(path, follow=True)
+
+    def _reset_session(self):
+        self.cancel_processing()
+        # lo que el worker anterior ya dejó en cola no es de esta sesión
+        self.worker = None
+        self.following = False
+        self.evicted = 0
+        self.buffer_stats = {}
+        self.records = []
+        self.views.reset(self.records)
+        from .core.analytics import WampAnalytics
+        self.analytics = WampAnalytics()
+        self.model.load(self.records)
+
+    def _start_worker(self, path: str, follow: bool):
+        self.win.start_progress()
+        from .ui.pcap_worker import PcapWorker
+        self.cancel = CancelToken()
+        self.thread = QtCore.QThread(self)
+        # en seguimiento no hay caché: la captura no está completa
+        worker = self.worker = PcapWorker(path, self.filters, self.cancel, self.views,
+                                          None if follow else self.cache, follow=follow)
+        worker.moveToThread(self.thread)
+        self.thread.started.connect(worker.run)
+        # las señales llevan su worker: las de una extracción ya sustituida se ignoran
+        worker.batchReady.connect(partial(self._on_batch, worker))
+        if not follow:
+            worker.progress.connect(partial(self._on_progress, worker))
+        worker.finished.connect(partial(self._on_pcap_done, worker))
+        worker.failed.connect(partial(self._on_pcap_failed, worker))
+        worker.finished.connect(self.thread.quit)
+        worker.failed.connect(self.thread.quit)
+        self.thread.finished.connect(worker.deleteLater)
+        self.thread.start()
+
+    def _open_cached(self, path: str) -> bool:
         try:
-            self.records = process_pcap_to_records(path, self.filters)
+            recs = self.cache.load(path, self.filters)
+        except OSError:
+            recs = None
+        if recs is None:
+            return False
+        # se guardan en orden de llegada, como los lotes del worker
+        recs.sort(key=lambda r: r.get("epoch", 0.0))
+        self.records = recs
+        self.views.reset(self.records)
+        from .core.analytics import analyze
+        self.analytics = analyze(self.records)
+        self.win.latencyPanel.set_analytics(self.analytics)
+        if self.analytics.has_data:
+            self.win.latencyPanel.show()
+        self.model.load(self.records)
+        self.win.show_message(f"{len(self.records)} mensajes (caché) — {self.filters.to_display()}", 0)
+        return True
+
+    def clear_cache(self):
+        n = self.cache.clear()
+        self.win.show_message(f"Caché de sesiones vaciada ({n} entradas)")
+
+    def cancel_processing(self):
+        """Cancela la extracción en curso (mata tshark) y espera al hilo."""
+        if self.cancel is not None:
+            self.cancel.cancel()
+        if self.thread is not None:
+            self.thread.quit()
+            self.thread.wait()
+            self.thread = None
+
+    def _on_progress(self, worker, done: int, total: int):
+        if worker is self.worker:
+            self.win.show_progress(done, total)
+
+    def _on_batch(self, worker, batch: List[Dict], keys: list):
+        if worker is not self.worker:
+            return
+        self.records.extend(batch)
+        self.views.add(batch, keys or None)
+        self.analytics.feed_many(batch)
+        self.model.append(batch)
+        if not self.following:
+            self.win.show_message(f"Procesando PCAP… {len(self.records)} mensajes", 0)
+            return
+        excess = len(self.records) - FOLLOW_MAX_ROWS
+        if excess >= FOLLOW_EVICT_CHUNK:
+            old = self.records[:excess]
+            del self.records[:excess]
+            self.views.discard(old)
+            self.model.drop_first(excess)
+            self.evicted += excess
+        self.win.show_message(f"Siguiendo captura… {self._follow_counts()}", 0)
+
+    def _follow_counts(self) -> str:
+        text = f"{len(self.records)} mensajes"
+        if self.evicted:
+            text += f" (+{self.evicted} antiguos descartados, máx. {FOLLOW_MAX_ROWS})"
+        from .core.reassembly import describe as describe_buffers
+        buffers = describe_buffers(self.worker.stats.get("buffers", {})) if self.worker is not None else ""
+        if buffers:
+            text += f" — {buffers}"
+        return text
+
+    def _on_pcap_done(self, worker, cancelled: bool):
+        if worker is not self.worker:
+            return
+        self.win.stop_progress()
+        stats = worker.stats
+        self.buffer_stats = dict(stats.get("buffers", {}))
+        # los lotes llegan en orden de llegada; se reordena por epoch si hace falta
+        epochs = [r.get("epoch", 0.0) for r in self.records]
+        unordered = any(a > b for a, b in zip(epochs, epochs[1:]))
+        if unordered:
+            self.records.sort(key=lambda r: r.get("epoch", 0.0))
             self.model.load(self.records)
-            self.win.show_message(f"{len(self.records)} mensajes — {self.filters.to_display()}")
-        except Exception as e:
-            QtWidgets.QMessageBox.critical(self.win, "Error", str(e))
-        finally:
-            QtWidgets.QApplication.restoreOverrideCursor()
+        # tras descartar mensajes antiguos no se recalcula: se perderían sus latencias
+        if unordered and not self.evicted:
+            from .core.analytics import analyze
+            self.analytics = analyze(self.records)
+        else:
+            self.analytics.finish()
+        self.win.latencyPanel.set_analytics(self.analytics)
+        if self.analytics.has_data:
+            self.win.latencyPanel.show()
+        msg = f"{len(self.records)} mensajes — {self.filters.to_display()}"
+        if self.following:
+            msg = f"Seguimiento detenido — {self._follow_counts()} — {self.filters.to_display()}"
+        else:
+            if cancelled:
+                msg = "Cancelado — " + msg
+            from .core.reassembly import describe as describe_buffers
+            if describe_buffers(self.buffer_stats):
+                msg += f" — {describe_buffers(self.buffer_stats)}"
+        if len(stats.get("shards", [])) > 1:
+            times = ", ".join(f"{s['seconds']:.1f}s" for s in stats["shards"])
+            msg += f" — shards: {times} (total {stats['seconds']:.1f}s)"
+        self.win.show_message(msg, 0)
+
+    def apply_table_filter(self, spec: Dict):
+        self.model.set_filter(spec)
+        shown, total = self.model.visible_count(), self.model.total_count()
+        if shown == total:
+            self.win.show_message(f"{total} mensajes")
+        else:
+            self.win.show_message(f"{shown} de {total} mensajes", 0)
+
+    def _on_pcap_failed(self, worker, err: str):
+        if worker is not self.worker:
+            return
+        self.win.stop_progress()
+        self.win.show_message(f"{len(self.records)} mensajes (con error)", 0)
+        QtWidgets.QMessageBox.critical(self.win, "Error", err)
 
     def open_ndjson(self):
         path, _ = QtWidgets.QFileDialog.getOpenFileName(self.win, "Abrir NDJSON", "", "NDJSON(*.ndjson *.jsonl)")
         if not path: return
+        # un seguimiento en curso seguiría añadiendo lotes a la tabla nueva
+        self._reset_session()
+        from .io.ndjson_io import read_ndjson
+        from .core.jsoncodec import dumps as json_dumps
+        from .core.analytics import analyze
         items = read_ndjson(path)
         # formatea a records mínimos
         recs = []
@@ -68,40 +244,30 @@ class Controller(QtCore.QObject):
             recs.append({
                 "time":"", "ms":"", "epoch":0.0, "stream":"", "src":"", "dst":"",
                 "opcode":"NDJSON","topic":"","type": (next(iter(kwargs.keys())) if isinstance(kwargs, dict) and kwargs else ""),
-                "args": [], "kwargs": kwargs, "raw": json.dumps(obj, ensure_ascii=False) if not isinstance(obj, str) else obj
+                "args": [], "kwargs": kwargs, "raw": json_dumps(obj) if not isinstance(obj, str) else obj
             })
         self.records = recs
+        self.views.reset(self.records)
+        self.analytics = analyze(self.records)
+        self.win.latencyPanel.set_analytics(self.analytics)
         self.model.load(self.records)
         self.win.show_message(f"{len(self.records)} registros NDJSON")
 
-    def export_csv(self):
+    def export_csv(self, split_by: str = ""):
         if not self.records:
             QtWidgets.QMessageBox.information(self.win, "Info", "No hay registros para exportar.")
             return
         path, _ = QtWidgets.QFileDialog.getSaveFileName(self.win, "Guardar CSV", "mensajes.csv", "CSV (*.csv)")
         if not path: return
-        import csv
-        # aplanar todas las claves
-        base = ["time","ms","epoch","stream","src","dst","opcode","topic","type"]
-        keys = set()
-        flat_cache = []
-        for r in self.records:
-            flat = {}
-            if isinstance(r.get("kwargs"), dict):
-                flat.update(flatten_dict(r["kwargs"], "kw"))
-            if isinstance(r.get("args"), (list, tuple)):
-                flat.update(flatten_dict(list(r["args"]), "args"))
-            flat_cache.append(flat)
-            keys.update(flat.keys())
-        keys = sorted(keys)
-        headers = base + keys
-        with open(path, "w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            w.writerow(headers)
-            for r, flat in zip(self.records, flat_cache):
-                row = [r.get(c,"") for c in base] + [flat.get(k,"") for k in keys]
-                w.writerow(row)
-        self.win.show_message(f"CSV guardado: {os.path.basename(path)}")
+        from .io.csv_io import write_csv
+        paths = write_csv(path, self.records, self.views, split_by or None)
+        if len(paths) > 1:
+            self.win.show_message(f"{len(paths)} CSV guardados (uno por {split_by})")
+        else:
+            self.win.show_message(f"CSV guardado: {os.path.basename(path)}")
+
+    def export_csv_by_type(self):
+        self.export_csv("type")
 
     def export_ndjson(self):
         if not self.records:
@@ -109,26 +275,38 @@ class Controller(QtCore.QObject):
             return
         path, _ = QtWidgets.QFileDialog.getSaveFileName(self.win, "Guardar NDJSON", "mensajes.ndjson", "NDJSON (*.ndjson *.jsonl)")
         if not path: return
-        write_ndjson(path, self.records)
+        from .io.ndjson_io import write_ndjson
+        write_ndjson(path, self.records, self.views)
         self.win.show_message(f"NDJSON guardado: {os.path.basename(path)}")
 
-    def export_xlsx(self):
+    def export_xlsx(self, split_by: str = ""):
         if not self.records:
             QtWidgets.QMessageBox.information(self.win, "Info", "No hay registros para exportar.")
             return
         path, _ = QtWidgets.QFileDialog.getSaveFileName(self.win, "Guardar Excel", "mensajes.xlsx", "Excel (*.xlsx)")
         if not path: return
-        export_to_xlsx(self.records, path)
+        from .core.export_excel import export_to_xlsx
+        export_to_xlsx(self.records, path, views=self.views, split_by=split_by or None,
+                       analytics=self.analytics, buffers=self.buffer_stats)
         self.win.show_message(f"Excel guardado: {os.path.basename(path)}")
 
+    def export_xlsx_by_type(self):
+        self.export_xlsx("type")
+
     def open_filters_dialog(self):
+        from .ui.filters_dialog import FiltersDialog
         dlg = FiltersDialog(self.filters, self.win)
         if dlg.exec_() == QtWidgets.QDialog.Accepted:
             data = dlg.get_filters()
-            self.filters = Filters(**data)
+            try:
+                self.filters = Filters(**data)
+            except ValueError as e:
+                QtWidgets.QMessageBox.warning(self.win, "Filtros", str(e))
+                return
             self.win.show_message("Filtros actualizados")
 
     def show_help(self):
+        from .ui.help_dialog import HelpDialog
         HelpDialog(self.win).exec_()
 
     def show_about(self):
@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+Extracción sin interfaz gráfica (servidores de captura, cron):
+
+    python -m src.cli capturas/*.pcapng -o mensajes.ndjson
+    python -m src.cli "rot/*.pcap" --backend native -j 4 --out-dir salida/ -f csv
+    python -m src.cli a.pcap --mode wamp --dst-port 8080 -f xlsx -o a.xlsx
+    dumpcap -i eth0 -w - | python -m src.cli --follow - -o vivo.ndjson
+
+Acepta ficheros o globs, los mismos filtros y modo que la GUI y escribe
+NDJSON (por defecto a stdout), CSV o XLSX. Cada captura se extrae en un
+proceso del pool (-j) y sus registros se vuelcan a un fichero temporal
+según salen, así que la memoria no depende del tamaño de las capturas.
+Las salidas siguen el orden de los ficheros de entrada y, dentro de cada
+captura, el orden de llegada de los mensajes.
+
+Con --follow sigue una sola captura en curso (fichero que crece, FIFO o
+'-' para stdin) con el lector nativo y escribe NDJSON según llegan los
+mensajes, hasta Ctrl+C o hasta que se cierra la tubería.
+
+No importa PyQt5: arranca rápido y funciona sin display.
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .core.flat_view import ndjson_payload
+from .core.jsoncodec import dumps
+from .core.pcap_parser import Filters
+from .core.pcap_processor import follow_records, iter_pcap_records
+from .core.reassembly import describe as describe_buffers, merge_stats
+from .io.spool import RecordSpool, SpoolWriter
+
+FORMATS = ("ndjson", "csv", "xlsx")
+_EXT = {".ndjson": "ndjson", ".jsonl": "ndjson", ".csv": "csv", ".xlsx": "xlsx"}
+
+# (captura, fichero temporal, registros, segundos, error, búferes de reensamblado descartados)
+Result = Tuple[str, str, int, float, str, Dict[str, int]]
+
+
+def expand_inputs(patterns: List[str]) -> List[str]:
+    """Ficheros y globs -> rutas existentes, sin repetir, en el orden dado (cada glob ordenado)."""
+    out: List[str] = []
+    seen = set()
+    for p in patterns:
+        matches = sorted(glob.glob(p, recursive=True)) if glob.has_magic(p) else [p]
+        if not matches:
+            raise ValueError(f"Sin coincidencias: {p}")
+        for m in matches:
+            if not os.path.isfile(m):
+                raise ValueError(f"No es un fichero: {m}")
+            if m not in seen:
+                seen.add(m)
+                out.append(m)
+    return out
+
+
+def _extract(task: Tuple[str, Filters, str]) -> Result:
+    """Extrae una captura a un fichero temporal (se ejecuta en el pool)."""
+    path, filters, spool_path = task
+    t0 = time.perf_counter()
+    stats: Dict = {}
+    try:
+        with SpoolWriter(spool_path) as w:
+            for rec in iter_pcap_records(path, filters, stats=stats):
+                w.write(rec)
+            spool_path, count = w.close()
+    except Exception as e:
+        return path, spool_path, 0, time.perf_counter() - t0, str(e) or type(e).__name__, {}
+    return path, spool_path, count, time.perf_counter() - t0, "", dict(stats.get("buffers", {}))
+
+
+def _run(tasks: List[Tuple[str, Filters, str]], jobs: int) -> Iterator[Result]:
+    """Resultados en el orden de `tasks`, según van terminando."""
+    if jobs <= 1 or len(tasks) <= 1:
+        yield from map(_extract, tasks)
+        return
+    # ProcessPoolExecutor y no multiprocessing.Pool: sus procesos no son daemon
+    # y pueden abrir a su vez el pool de --shards
+    ex = ProcessPoolExecutor(min(jobs, len(tasks)), mp_context=multiprocessing.get_context("spawn"))
+    try:
+        futures = [ex.submit(_extract, t) for t in tasks]
+        for fut in futures:
+            yield fut.result()
+    finally:
+        ex.shutdown(wait=True, cancel_futures=True)
+
+
+def _ndjson_line(rec, full: bool) -> str:
+    if full:
+        return dumps(dict(rec), default=str) + "\n"
+    return dumps(ndjson_payload(rec)) + "\n"
+
+
+def write_output(fmt: str, out: str, spool: RecordSpool, split_by: Optional[str] = None,
+                 full: bool = False, append: bool = False,
+                 buffers: Optional[Dict[str, int]] = None) -> List[str]:
+    """
+    Escribe los registros del spool en `out` ('-' = stdout, sólo NDJSON).
+    NDJSON admite append (varias capturas a la misma salida). `buffers`
+    va a la hoja Resumen del XLSX. Devuelve las rutas.
+    """
+    if fmt == "ndjson":
+        if out == "-":
+            sys.stdout.writelines(_ndjson_line(r, full) for r in spool)
+            sys.stdout.flush()
+            return [out]
+        with open(out, "a" if append else "w", encoding="utf-8") as f:
+            f.writelines(_ndjson_line(r, full) for r in spool)
+        return [out]
+    if fmt == "csv":
+        from .io.csv_io import write_csv
+        return write_csv(out, spool, split_by=split_by)
+    # openpyxl sólo si se pide Excel
+    from .core.export_excel import export_to_xlsx
+    export_to_xlsx(spool, out, split_by=split_by, buffers=buffers)
+    return [out]
+
+
+def follow_output(source: str, filters: Filters, out: str, full: bool = False,
+                  stats: Optional[Dict] = None) -> int:
+    """Sigue `source` y escribe NDJSON en `out` según llegan; vacía el búfer cuando no llega nada."""
+    f = sys.stdout if out == "-" else open(out, "w", encoding="utf-8")
+    count = 0
+    try:
+        for rec in follow_records(source, filters, stats=stats):
+            if rec is None:
+                f.flush()
+                continue
+            f.write(_ndjson_line(rec, full))
+            count += 1
+        f.flush()
+    finally:
+        if f is not sys.stdout:
+            f.close()
+    return count
+
+
+def _out_path(out_dir: str, path: str, fmt: str, used: set) -> str:
+    """salida/<nombre de la captura>.<fmt>, con sufijo si dos capturas se llaman igual."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    out = os.path.join(out_dir, f"{stem}.{fmt}")
+    n = 2
+    while out in used:
+        out = os.path.join(out_dir, f"{stem}_{n}.{fmt}")
+        n += 1
+    used.add(out)
+    return out
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(
+        prog="python -m src.cli",
+        description="Extrae mensajes WAMP/WebSocket y TCP→JSON de capturas PCAP/PCAPNG sin interfaz gráfica.")
+    ap.add_argument("inputs", nargs="+", metavar="PCAP", help="ficheros o globs ('rot/*.pcap', '**/*.pcapng')")
+    out = ap.add_mutually_exclusive_group()
+    out.add_argument("-o", "--output", default="-",
+                     help="fichero de salida con todos los registros ('-' = stdout, sólo NDJSON)")
+    out.add_argument("--out-dir", help="un fichero de salida por captura en este directorio")
+    ap.add_argument("-f", "--format", choices=FORMATS, help="por defecto, según la extensión de -o (o ndjson)")
+    ap.add_argument("--full", action="store_true",
+                    help="NDJSON con el registro completo (metadatos, args, kwargs, raw) en lugar del payload")
+    ap.add_argument("--split-by", choices=("type", "opcode", "topic"),
+                    help="CSV: un fichero por valor; XLSX: una hoja Mensajes por valor")
+    g = ap.add_argument_group("filtros (como en Filtros / Modo… de la GUI)")
+    g.add_argument("--mode", default="AUTO", type=str.upper, choices=("AUTO", "WAMP", "TCPJSON"))
+    g.add_argument("--backend", default="TSHARK", type=str.upper, choices=("TSHARK", "NATIVE"))
+    g.add_argument("--src-ip", default="", help="IPs o CIDR, separados por comas")
+    g.add_argument("--dst-ip", default="")
+    g.add_argument("--src-port", default="", help="puertos o rangos: 8080,9000-9010")
+    g.add_argument("--dst-port", default="")
+    g.add_argument("--streams", default="", help="TCP streams o rangos")
+    ap.add_argument("--follow", action="store_true",
+                    help="seguir una captura en curso (fichero que crece, FIFO o '-') y escribir NDJSON según llega")
+    ap.add_argument("-j", "--jobs", type=int, default=1, help="capturas procesadas a la vez (procesos)")
+    ap.add_argument("--shards", type=int, default=1,
+                    help="procesos por captura (reparto por TCP stream; sólo con --backend native)")
+    ap.add_argument("-q", "--quiet", action="store_true", help="sin resumen por captura en stderr")
+    return ap
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = build_parser()
+    args = ap.parse_args(argv)
+    fmt = args.format or _EXT.get(os.path.splitext(args.output)[1].lower(), "ndjson")
+    if fmt != "ndjson" and not args.out_dir and args.output == "-":
+        ap.error(f"{fmt} necesita -o FICHERO o --out-dir")
+    if args.follow and (fmt != "ndjson" or args.out_dir or len(args.inputs) != 1):
+        ap.error("--follow admite una sola captura y salida NDJSON (-o FICHERO o stdout)")
+    if args.shards > 1 and args.backend != "NATIVE":
+        # cada shard tendría que disecar la captura entera con su propio tshark
+        ap.error("--shards necesita --backend native (con tshark no reduce el tiempo)")
+    try:
+        inputs = args.inputs if args.follow else expand_inputs(args.inputs)
+        filters = Filters(src_ip=args.src_ip, dst_ip=args.dst_ip, src_port=args.src_port,
+                          dst_port=args.dst_port, mode=args.mode, backend=args.backend,
+                          streams=args.streams, workers=args.shards)
+    except ValueError as e:
+        ap.error(str(e))
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+
+    def log(msg: str) -> None:
+        if not args.quiet:
+            print(msg, file=sys.stderr, flush=True)
+
+    if args.follow:
+        return _follow_main(inputs[0], filters, args, log)
+
+    tmp = tempfile.mkdtemp(prefix="wamp_extractor_")
+    tasks = [(p, filters, os.path.join(tmp, f"{i}.spool")) for i, p in enumerate(inputs)]
+    parts = []               # CSV/XLSX común: se escribe al final con todas las capturas
+    buffers = []             # descartes de reensamblado de esas capturas
+    ndjson_started = False
+    used: set = set()        # salidas de --out-dir ya asignadas
+    failed = 0
+    t0 = time.perf_counter()
+    try:
+        for path, spool_path, count, secs, err, bstats in _run(tasks, args.jobs):
+            if err:
+                failed += 1
+                log(f"{path}: ERROR {err}")
+                continue
+            dropped = describe_buffers(bstats)
+            log(f"{path}: {count} mensajes ({secs:.1f}s)" + (f" — {dropped}" if dropped else ""))
+            if args.out_dir or fmt == "ndjson":
+                # una salida por captura, o NDJSON común escrito según llegan (en orden)
+                spool = RecordSpool([(spool_path, count)])
+                if args.out_dir:
+                    write_output(fmt, _out_path(args.out_dir, path, fmt, used), spool, args.split_by, args.full,
+                                 buffers=bstats)
+                else:
+                    write_output(fmt, args.output, spool, full=args.full, append=ndjson_started)
+                    ndjson_started = True
+                spool.remove()
+            else:
+                parts.append((spool_path, count))
+                buffers.append(bstats)
+        if parts:
+            spool = RecordSpool(parts)
+            written = write_output(fmt, args.output, spool, args.split_by, args.full,
+                                   buffers=merge_stats(buffers))
+            log(f"{len(spool)} mensajes -> {', '.join(written)}")
+    except KeyboardInterrupt:
+        log("Cancelado")
+        return 130
+    except BrokenPipeError:
+        # stdout cerrado antes de tiempo (| head): no es un error
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except OSError as e:
+        log(f"ERROR {e}")
+        return 1
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    log(f"{len(inputs) - failed}/{len(inputs)} capturas en {time.perf_counter() - t0:.1f}s")
+    return 1 if failed else 0
+
+
+def _follow_main(source: str, filters: Filters, args, log) -> int:
+    t0 = time.perf_counter()
+    stats: Dict = {}
+    try:
+        count = follow_output(source, filters, args.output, args.full, stats)
+    except KeyboardInterrupt:
+        dropped = describe_buffers(stats.get("buffers", {}))
+        log("Seguimiento detenido" + (f" — {dropped}" if dropped else ""))
+        return 0
+    except BrokenPipeError:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except (OSError, ValueError) as e:
+        log(f"{source}: ERROR {e}")
+        return 1
+    dropped = describe_buffers(stats.get("buffers", {}))
+    log(f"{source}: {count} mensajes ({time.perf_counter() - t0:.1f}s)" + (f" — {dropped}" if dropped else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,258 @@
+# src/core/analytics.py
+"""
+Latencias WAMP sobre los registros ya extraídos, en una sola pasada:
+  - RPC: CALL -> RESULT/ERROR por (stream, request_id), por procedure.
+  - Pub/Sub: PUBLISH -> EVENT por publication_id (vía PUBLISHED), por topic.
+    Sólo se miden las publicaciones con acknowledge=True: sin PUBLISHED el
+    EVENT no se puede atribuir a un PUBLISH. Esos PUBLISH y EVENT se
+    cuentan aparte (unacknowledged, unmatched_events), no como pérdidas.
+    Un PUBLISH rechazado (ERROR con request_type 16) cuenta como error
+    del topic y deja de estar pendiente.
+  - Throughput: mensajes por ventana de tiempo.
+
+Las peticiones pendientes están acotadas (se descarta la más antigua) y
+las distribuciones se guardan en histogramas logarítmicos, así que la
+memoria no crece con el número de mensajes. Las ventanas tampoco: al
+pasar de MAX_WINDOWS se duplica su duración y se suman de dos en dos.
+"""
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+JsonDict = Dict[str, Any]
+
+# códigos WAMP (ver wamp_parser.WAMP_MESSAGES)
+ERROR, PUBLISH, PUBLISHED, EVENT, CALL, RESULT = 8, 16, 17, 36, 48, 50
+
+# peticiones/publicaciones recordadas a la vez
+MAX_PENDING = 100_000
+# EVENTs que esperan a su PUBLISHED (el router suele entregar antes de confirmar)
+MAX_EARLY_EVENTS = 10_000
+# ventana de throughput por defecto (segundos)
+WINDOW_SECONDS = 1.0
+# ventanas recordadas a la vez (3 h de captura con ventanas de 1 s)
+MAX_WINDOWS = 10_800
+# crecimiento entre cubetas del histograma: error relativo <= 1 %
+HIST_GROWTH = 1.02
+HIST_MIN = 1e-6  # 1 µs
+
+WINDOW_COLUMNS = ["mensajes", "CALL", "RESULT", "ERROR", "PUBLISH", "EVENT"]
+_WINDOW_SLOT = {CALL: 1, RESULT: 2, ERROR: 3, PUBLISH: 4, EVENT: 5}
+_LOG_GROWTH = math.log(HIST_GROWTH)
+
+
+class LatencyHistogram:
+    """Histograma logarítmico: percentiles aproximados (±1 %), máximo exacto."""
+    __slots__ = ("buckets", "count", "max")
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        b = int(math.log(max(seconds, HIST_MIN) / HIST_MIN) / _LOG_GROWTH)
+        self.buckets[b] = self.buckets.get(b, 0) + 1
+        self.count += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * p / 100.0))
+        seen = 0
+        for b in sorted(self.buckets):
+            seen += self.buckets[b]
+            if seen >= rank:
+                # punto medio (geométrico) de la cubeta, sin pasar del máximo visto
+                return min(HIST_MIN * HIST_GROWTH ** (b + 0.5), self.max)
+        return self.max
+
+
+class _KeyStats:
+    __slots__ = ("latency", "errors")
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.errors = 0
+
+
+def _put(d: Dict, key: Any, value: Any, limit: int) -> int:
+    """Inserta acotando el tamaño; devuelve cuántas entradas se descartaron."""
+    dropped = 0
+    if key not in d and len(d) >= limit:
+        del d[next(iter(d))]
+        dropped = 1
+    d[key] = value
+    return dropped
+
+
+class WampAnalytics:
+    """
+    Se alimenta registro a registro (feed) en orden de llegada. Usa los
+    campos que añade el decodificador WAMP: wamp_code, request_id,
+    request_type, publication_id, topic.
+    """
+
+    def __init__(self, window: float = WINDOW_SECONDS, max_pending: int = MAX_PENDING,
+                 max_windows: int = MAX_WINDOWS):
+        self.window = window
+        self.max_pending = max_pending
+        self.max_windows = max_windows
+        self.rpc: Dict[str, _KeyStats] = {}
+        self.pubsub: Dict[str, _KeyStats] = {}
+        self.windows: Dict[int, List[int]] = {}
+        self._calls: Dict[Tuple[Any, int], Tuple[float, str]] = {}
+        self._publishes: Dict[Tuple[Any, int], Tuple[float, str]] = {}
+        self._publications: Dict[int, Tuple[float, str]] = {}
+        self._early: Dict[int, List[Tuple[float, str]]] = {}
+        self.unanswered = 0      # respuestas sin CALL visto
+        self.unmatched_events = 0  # EVENT cuyo publication_id no llegó en un PUBLISHED
+        self.dropped = 0         # pendientes descartadas por el límite
+        self._unacked = 0        # PUBLISH sin PUBLISHED ya olvidados (límite)
+
+    def _stats(self, table: Dict[str, _KeyStats], key: str) -> _KeyStats:
+        st = table.get(key)
+        if st is None:
+            st = table[key] = _KeyStats()
+        return st
+
+    def feed(self, rec: JsonDict) -> None:
+        try:
+            epoch = float(rec.get("epoch") or 0.0)
+        except (TypeError, ValueError):
+            return
+        code = rec.get("wamp_code")
+        slots = self.windows.get(int(epoch // self.window))
+        if slots is None:
+            while len(self.windows) >= self.max_windows and self._coarsen():
+                pass
+            slots = self.windows.setdefault(int(epoch // self.window), [0] * len(WINDOW_COLUMNS))
+        slots[0] += 1
+        slot = _WINDOW_SLOT.get(code)
+        if slot is not None:
+            slots[slot] += 1
+        elif code != PUBLISHED:
+            return
+        stream = rec.get("stream")
+        if code == CALL:
+            self.dropped += _put(self._calls, (stream, rec.get("request_id")),
+                                 (epoch, rec.get("topic") or ""), self.max_pending)
+        elif code == RESULT or (code == ERROR and rec.get("request_type") == CALL):
+            start = self._calls.pop((stream, rec.get("request_id")), None)
+            if start is None:
+                self.unanswered += 1
+                return
+            st = self._stats(self.rpc, start[1])
+            st.latency.add(epoch - start[0])
+            if code == ERROR:
+                st.errors += 1
+        elif code == ERROR and rec.get("request_type") == PUBLISH:
+            # publicación rechazada por el router: no habrá PUBLISHED ni EVENT
+            start = self._publishes.pop((stream, rec.get("request_id")), None)
+            if start is None:
+                self.unanswered += 1
+                return
+            self._stats(self.pubsub, start[1]).errors += 1
+        elif code == PUBLISH:
+            # sin acknowledge nunca llega PUBLISHED: al desbordar, el más antiguo
+            # casi siempre es uno de ésos, así que no cuenta como descartado
+            self._unacked += _put(self._publishes, (stream, rec.get("request_id")),
+                                  (epoch, rec.get("topic") or ""), self.max_pending)
+        elif code == PUBLISHED:
+            start = self._publishes.pop((stream, rec.get("request_id")), None)
+            pub = rec.get("publication_id")
+            if start is None or pub is None:
+                return
+            self.dropped += _put(self._publications, pub, start, self.max_pending)
+            for ev_epoch, topic in self._early.pop(pub, ()):
+                self._event(start, ev_epoch, topic)
+        elif code == EVENT:
+            pub = rec.get("publication_id")
+            start = self._publications.get(pub)
+            if start is not None:
+                self._event(start, epoch, rec.get("topic") or "")
+            elif pub is not None:
+                waiting = self._early.get(pub)
+                if waiting is None:
+                    if len(self._early) >= MAX_EARLY_EVENTS:
+                        self.unmatched_events += len(self._early.pop(next(iter(self._early))))
+                    waiting = self._early[pub] = []
+                waiting.append((epoch, rec.get("topic") or ""))
+
+    def _coarsen(self) -> bool:
+        """Duplica la duración de las ventanas sumando las que caen en la misma; False si no se une ninguna."""
+        merged: Dict[int, List[int]] = {}
+        for w, counts in self.windows.items():
+            slots = merged.get(w // 2)
+            if slots is None:
+                merged[w // 2] = counts
+            else:
+                for i, n in enumerate(counts):
+                    slots[i] += n
+        self.window *= 2
+        shrunk = len(merged) < len(self.windows)
+        self.windows = merged
+        return shrunk
+
+    def _event(self, start: Tuple[float, str], epoch: float, topic: str) -> None:
+        # cada suscriptor recibe su EVENT: una muestra por entrega
+        self._stats(self.pubsub, topic or start[1]).latency.add(max(0.0, epoch - start[0]))
+
+    def feed_many(self, records: Iterable[JsonDict]) -> "WampAnalytics":
+        for rec in records:
+            self.feed(rec)
+        return self
+
+    # --- resultados ---
+    @property
+    def pending_calls(self) -> int:
+        return len(self._calls)
+
+    @property
+    def unacknowledged(self) -> int:
+        """PUBLISH sin PUBLISHED (acknowledge=False o confirmación fuera de la captura)."""
+        return self._unacked + len(self._publishes)
+
+    @property
+    def has_data(self) -> bool:
+        return bool(self.rpc or self.pubsub)
+
+    def finish(self) -> None:
+        """EVENTs cuyo PUBLISHED no llegó: sin pareja (publicación sin acknowledge)."""
+        self.unmatched_events += sum(len(v) for v in self._early.values())
+        self._early.clear()
+
+    @staticmethod
+    def _rows(table: Dict[str, _KeyStats]) -> List[Tuple[str, int, int, float, float, float, float]]:
+        rows = []
+        for key, st in table.items():
+            h = st.latency
+            rows.append((key, h.count, st.errors,
+                         h.percentile(50) * 1000, h.percentile(95) * 1000,
+                         h.percentile(99) * 1000, h.max * 1000))
+        rows.sort(key=lambda r: (-r[1], r[0]))
+        return rows
+
+    def rpc_rows(self) -> List[Tuple[str, int, int, float, float, float, float]]:
+        """(procedure, respuestas, errores, p50, p95, p99, max) con tiempos en ms."""
+        return self._rows(self.rpc)
+
+    def pubsub_rows(self) -> List[Tuple[str, int, int, float, float, float, float]]:
+        """(topic, entregas, PUBLISH rechazados, p50, p95, p99, max) con tiempos en ms."""
+        return self._rows(self.pubsub)
+
+    def window_rows(self) -> List[Tuple[float, List[int]]]:
+        """(inicio de ventana en epoch, [mensajes, CALL, RESULT, ERROR, PUBLISH, EVENT])."""
+        return [(w * self.window, self.windows[w]) for w in sorted(self.windows)]
+
+
+def analyze(records: Iterable[JsonDict], window: float = WINDOW_SECONDS,
+            max_pending: Optional[int] = None, max_windows: Optional[int] = None) -> WampAnalytics:
+    """Una pasada sobre los registros (en orden de epoch) -> WampAnalytics terminado."""
+    a = WampAnalytics(window, max_pending or MAX_PENDING, max_windows or MAX_WINDOWS)
+    a.feed_many(records)
+    a.finish()
+    return a
@@ -1,196 +1,51 @@
 # src/core/export_excel.py
 from __future__ import annotations
 
-from collections import OrderedDict, defaultdict
-from typing import Any, Dict, Iterable, List, Tuple, Union
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import PatternFill, Font, Alignment
+from openpyxl.utils import get_column_letter
 from openpyxl.utils.exceptions import IllegalCharacterError
-import json
+import datetime as _dt
 import re
 
+from .analytics import WampAnalytics, WINDOW_COLUMNS
+from .jsoncodec import dumps
+from .reassembly import LABELS as BUFFER_LABELS, evicted as buffers_evicted
+from .flat_view import (  # noqa: F401  (reexportados por compatibilidad)
+    FlatViews, extract_json_object, flatten_json, json_cell, _is_scalar,
+    _try_parse_json_from_text,
+)
+
 JsonDict = Dict[str, Any]
 
 # ------------------------------------------------------------
 # Saneo para Excel (evita IllegalCharacterError)
 # ------------------------------------------------------------
 _ILLEGAL_RX = re.compile(r"[\x00-\x08\x0b-\x0c\x0e-\x1f]")
+# algo que _excel_clean cambiaría (casi nunca: el caso común sale tal cual)
+_NEEDS_CLEAN = re.compile(r"[\x00-\x08\x0b-\x0c\x0e-\x1f\r]").search
+MAX_CELL_CHARS = 32000
 
 def _excel_clean(v: Any) -> Any:
     if v is None:
         return ""
     if isinstance(v, (int, float, bool)):
         return v
-    s = str(v)
+    s = v if type(v) is str else str(v)
+    if len(s) <= MAX_CELL_CHARS and not _NEEDS_CLEAN(s):
+        return s
     # normaliza saltos de línea y quita no imprimibles
     s = s.replace("\r\n", "\n").replace("\r", "\n")
     s = _ILLEGAL_RX.sub("", s)
     # Excel no admite cadenas muy largas en ciertas versiones; corta con indicación
-    if len(s) > 32000:
+    if len(s) > MAX_CELL_CHARS:
         s = s[:31980] + " …(truncado)"
     return s
 
 
-# ------------------------------------------------------------
-# JSON helpers
-# ------------------------------------------------------------
-def _find_largest_json_object(text: str) -> str | None:
-    """Devuelve el mayor bloque '{...}' balanceado en el texto, si existe."""
-    start_idx = []
-    best = None
-    best_len = 0
-    for i, ch in enumerate(text):
-        if ch == "{":
-            start_idx.append(i)
-        elif ch == "}" and start_idx:
-            s = start_idx.pop()
-            length = i - s + 1
-            if length > best_len:
-                best = text[s : i + 1]
-                best_len = length
-    return best
-
-
-def _try_parse_json_from_text(s: str) -> Any | None:
-    """Intenta parsear JSON desde una cadena que puede contener basura alrededor."""
-    if not s or not isinstance(s, str):
-        return None
-
-    # 1) intento directo
-    try:
-        return json.loads(s)
-    except Exception:
-        pass
-
-    # 2) si parece array WAMP, intenta sacar el primer objeto
-    #    formato típico: [16, 11, {}, "Topic", [{ ...obj... }]]
-    try:
-        arr = json.loads(s.strip())
-        if isinstance(arr, list):
-            # recorre buscando el primer dict
-            stack = list(arr)
-            while stack:
-                it = stack.pop(0)
-                if isinstance(it, dict):
-                    return it
-                if isinstance(it, list):
-                    stack = it + stack
-    except Exception:
-        pass
-
-    # 3) extrae el mayor bloque {...} y parsea
-    candidate = _find_largest_json_object(s)
-    if candidate:
-        try:
-            return json.loads(candidate)
-        except Exception:
-            return None
-    return None
-
-
-def _first_dict_in_nested(value: Any) -> JsonDict | None:
-    """Devuelve el primer dict que encuentre dentro de una estructura (list/tuple/dict)."""
-    if isinstance(value, dict):
-        return value
-    if isinstance(value, (list, tuple)):
-        for it in value:
-            d = _first_dict_in_nested(it)
-            if d is not None:
-                return d
-    return None
-
-
-CAND_TEXT_KEYS = (
-    "json",
-    "payload",
-    "payload_text",
-    "raw_text",
-    "text",
-    "data",
-    "message",
-    "body",
-    "content",
-)
-
-RAW_KEYS = ("raw", "raw_text", "raw_payload", "payload", "json")
-
-
-def extract_json_object(rec: JsonDict) -> Tuple[JsonDict | None, str | None]:
-    """
-    Intenta obtener un objeto JSON 'útil' desde el registro:
-      - Si hay un dict ya en 'json' u otras claves, úsalo.
-      - Si hay texto con JSON, parsea.
-      - Si es array WAMP, extrae el dict interior.
-    Devuelve (obj_dict, raw_text_detected).
-    """
-    # 1) dict directo
-    for k in ("json_obj", "json", "obj", "object", "payload_obj"):
-        if isinstance(rec.get(k), dict):
-            return rec[k], json.dumps(rec[k], ensure_ascii=False)
-
-    # 2) texto con JSON
-    for k in CAND_TEXT_KEYS:
-        v = rec.get(k)
-        if isinstance(v, str) and v:
-            parsed = _try_parse_json_from_text(v)
-            if isinstance(parsed, dict):
-                return parsed, v
-            # si parsed es lista WAMP, coge el primer dict
-            d = _first_dict_in_nested(parsed)
-            if isinstance(d, dict):
-                return d, v
-
-    # 3) a veces args/kwargs esconden el objeto
-    args = rec.get("args")
-    kwargs = rec.get("kwargs")
-    if isinstance(kwargs, dict) and kwargs:
-        return kwargs, json.dumps(kwargs, ensure_ascii=False)
-    d = _first_dict_in_nested(args)
-    if isinstance(d, dict):
-        return d, json.dumps(args, ensure_ascii=False)
-
-    # nada encontrado
-    raw_example = None
-    for k in RAW_KEYS:
-        if isinstance(rec.get(k), str):
-            raw_example = rec[k]
-            break
-    return None, raw_example
-
-
-# ------------------------------------------------------------
-# Flatten
-# ------------------------------------------------------------
-def _is_scalar(x: Any) -> bool:
-    return isinstance(x, (int, float, str, bool)) or x is None
-
-
-def flatten_json(obj: Any, prefix: str = "") -> "OrderedDict[str, Any]":
-    """
-    Aplana dict/list a par clave->valor.
-    - dict -> 'prefix.key'
-    - list escalar -> 'prefix[0]', 'prefix[1]'
-    - list de dicts -> idem (indexada)
-    """
-    out: "OrderedDict[str, Any]" = OrderedDict()
-    p = f"{prefix}." if prefix else ""
-
-    if isinstance(obj, dict):
-        for k in sorted(obj.keys()):
-            out.update(flatten_json(obj[k], f"{p}{k}" if prefix else k))
-        return out
-
-    if isinstance(obj, list):
-        # si todos son escalares, indexa
-        for i, it in enumerate(obj):
-            out.update(flatten_json(it, f"{prefix}[{i}]"))
-        return out
-
-    # escalar
-    out[prefix] = obj
-    return out
-
-
 # ------------------------------------------------------------
 # Cabeceras: agrupación y colores
 # ------------------------------------------------------------
@@ -219,160 +74,267 @@ def _top_prefix(col: str) -> str:
 
 
 # ------------------------------------------------------------
-# Export principal
+# Escritura en streaming (write-only) con reparto en hojas
 # ------------------------------------------------------------
-def export_to_xlsx(records: List[JsonDict], out_path: str) -> None:
+# Excel admite 1.048.576 filas por hoja (incluida la cabecera)
+EXCEL_MAX_ROWS = 1_048_576
+WIDTH_SAMPLE = 200
+
+def _header_cells(ws, header: List[str], colors: List[str]) -> List[WriteOnlyCell]:
+    cells = []
+    for col, color in zip(header, colors):
+        c = WriteOnlyCell(ws, value=_excel_clean(col))
+        c.fill = PatternFill("solid", start_color=color, end_color=color)
+        c.font = HEADER_FONT
+        c.alignment = HEADER_ALIGN
+        cells.append(c)
+    return cells
+
+
+class _SheetWriter:
     """
-    Exporta a Excel con 3 hojas:
-      - Mensajes: metadatos + JSON aplanado (sin args/kwargs)
-      - Raw: registro bruto + args/kwargs + texto crudo detectado
-      - Resumen: conteos por type/topic
+    Hoja write-only que añade filas según llegan; al alcanzar el límite de
+    Excel continúa en 'Titulo (2)', 'Titulo (3)'... repitiendo la cabecera.
     """
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Mensajes"
 
-    ws_raw = wb.create_sheet("Raw")
-    ws_sum = wb.create_sheet("Resumen")
+    def __init__(self, wb: Workbook, title: str, header: List[str], colors: List[str],
+                 widths: List[int] | None = None, max_rows: int = EXCEL_MAX_ROWS):
+        self.wb = wb
+        self.title = title
+        self.header = header
+        self.colors = colors
+        self.widths = widths or []
+        self.max_rows = max_rows
+        self.sheets: List[Any] = []
+        self.ws = None
+        self.rows = 0
+
+    def _new_sheet(self):
+        n = len(self.sheets) + 1
+        self.ws = self.wb.create_sheet(self.title if n == 1 else f"{self.title} ({n})")
+        self.sheets.append(self.ws)
+        # en write-only las anchuras deben fijarse antes de la primera fila
+        for j, w in enumerate(self.widths, start=1):
+            self.ws.column_dimensions[get_column_letter(j)].width = w
+        if self.header:
+            self.ws.append(_header_cells(self.ws, self.header, self.colors))
+        self.rows = 1 if self.header else 0
+
+    def append(self, row: List[Any]) -> None:
+        if self.ws is None or self.rows >= self.max_rows:
+            self._new_sheet()
+        try:
+            self.ws.append(row)
+        except IllegalCharacterError:
+            self.ws.append([_excel_clean(x) for x in row])
+        self.rows += 1
 
-    # --- Detecta columnas de metadatos presentes en los registros ---
-    meta_candidates = [
-        "time", "time_hms_ms", "hms", "ms",
-        "epoch", "frame", "tcp_stream", "stream",
-        "src", "dst", "src_ip", "dst_ip", "src_port", "dst_port",
-        "realm", "topic", "type", "opcode", "len", "proto",
-    ]
-    meta_cols: List[str] = [k for k in meta_candidates if any(k in r for r in records)]
+    def close(self) -> None:
+        if self.ws is None:
+            self._new_sheet()
 
-    # --- Recolecta claves aplanadas para cabecera ---
-    flat_keys_order: List[str] = []
-    flat_keys_seen = set()
 
-    extracted_objs: List[Tuple[JsonDict | None, str | None]] = []
-    for rec in records:
-        obj, rawtxt = extract_json_object(rec)
-        extracted_objs.append((obj, rawtxt))
-        if isinstance(obj, dict):
-            flat = flatten_json(obj)
-            for k in flat.keys():
-                if k not in flat_keys_seen:
-                    flat_keys_seen.add(k)
-                    flat_keys_order.append(k)
-
-    # Cabecera: meta + flat
-    header = meta_cols + flat_keys_order
-    if not header:
-        header = ["time", "type"]  # fallback
-
-    # --- Escribe cabecera con colores por grupo ---
+def _header_colors(header: List[str], meta_cols: List[str]) -> List[str]:
+    """Color de fondo por columna: meta en gris oscuro, resto por grupo de prefijo."""
     group2color: Dict[str, str] = {}
+    colors: List[str] = []
     pal_idx = 0
-    for col_idx, col in enumerate(header, start=1):
+    for col in header:
         grp = _top_prefix(col) if col not in meta_cols else "__meta__"
         if grp not in group2color:
-            # meta en gris oscuro, resto en paleta
             if grp == "__meta__":
                 group2color[grp] = "FF323232"
             else:
                 group2color[grp] = PALETTE[pal_idx % len(PALETTE)]
                 pal_idx += 1
-        fill = PatternFill(start_color=group2color[grp], end_color=group2color[grp], fill_type="solid")
-        cell = ws.cell(row=1, column=col_idx, value=_excel_clean(col))
-        cell.fill = fill
-        cell.font = HEADER_FONT
-        cell.alignment = HEADER_ALIGN
-
-    # --- Filas de datos (Mensajes) ---
-    for rec, (obj, rawtxt) in zip(records, extracted_objs):
-        row: List[Any] = []
-        # metadatos
+        colors.append(group2color[grp])
+    return colors
+
+
+_SHEET_BAD_RX = re.compile(r"[\[\]:*?/\\]")
+
+def _sheet_title(label: str, used: set) -> str:
+    """Título de hoja válido y único; deja sitio para el sufijo ' (N)' de continuación."""
+    base = _SHEET_BAD_RX.sub("_", f"Mensajes {label}" if label else "Mensajes (vacío)")[:25].strip()
+    title, n = base, 2
+    while title.lower() in used:
+        title = f"{base[:22]}~{n}"
+        n += 1
+    used.add(title.lower())
+    return title
+
+
+LATENCY_HEADER = ["Procedure / topic", "count", "errores", "p50 ms", "p95 ms", "p99 ms", "max ms"]
+
+def _write_latency_sheet(wb: Workbook, analytics: WampAnalytics, max_rows: int) -> _SheetWriter:
+    """Hoja 'Latencias': distribuciones por procedure/topic y throughput por ventana."""
+    ws = _SheetWriter(wb, "Latencias", LATENCY_HEADER, ["FF1F4E79"] * len(LATENCY_HEADER), max_rows=max_rows)
+    for title, rows in (("RPC: CALL → RESULT/ERROR", analytics.rpc_rows()),
+                        ("Pub/Sub: PUBLISH (acknowledge) → EVENT", analytics.pubsub_rows())):
+        ws.append([title])
+        for name, count, errors, p50, p95, p99, mx in rows:
+            ws.append([_excel_clean(name or "(vacío)"), count, errors,
+                       round(p50, 3), round(p95, 3), round(p99, 3), round(mx, 3)])
+        ws.append([])
+    ws.append(["CALL sin respuesta", analytics.pending_calls])
+    ws.append(["Respuestas sin CALL", analytics.unanswered])
+    ws.append(["PUBLISH sin acknowledge (sin latencia)", analytics.unacknowledged])
+    ws.append(["EVENT sin PUBLISHED (sin latencia)", analytics.unmatched_events])
+    ws.append(["Pendientes descartadas (límite)", analytics.dropped])
+    ws.append([])
+    ws.append([f"Throughput (ventana {analytics.window:g} s)"] + WINDOW_COLUMNS)
+    for start, counts in analytics.window_rows():
+        ws.append([_dt.datetime.utcfromtimestamp(start).strftime("%Y-%m-%d %H:%M:%S")] + counts)
+    ws.close()
+    return ws
+
+
+# ------------------------------------------------------------
+# Export principal
+# ------------------------------------------------------------
+def export_to_xlsx(records: List[JsonDict], out_path: str, max_rows: int = EXCEL_MAX_ROWS,
+                   views: FlatViews | None = None, split_by: str | None = None,
+                   analytics: WampAnalytics | None = None,
+                   buffers: Dict[str, int] | None = None) -> None:
+    """
+    Exporta a Excel con estas hojas:
+      - Mensajes: metadatos + JSON aplanado (sin args/kwargs)
+      - Raw: registro bruto + args/kwargs + texto crudo detectado
+      - Resumen: conteos por type/topic y columnas por type
+      - Latencias: CALL->RESULT/ERROR y PUBLISH->EVENT (si hay WAMP) y throughput
+
+    Usa un Workbook write-only: las filas se serializan según se generan.
+    Las cabeceras salen del SchemaIndex de `views` (FlatViews de estos mismos
+    registros), sin recorrer los registros; sin `views` se calcula en una
+    pasada previa sin guardar nada, con memoria constante. Con split_by
+    ('type', 'opcode' o 'topic') Mensajes se parte en una hoja por valor con
+    sólo las columnas de ese grupo. Si una hoja supera el límite de filas
+    de Excel se continúa en 'Mensajes (2)', 'Raw (2)'...
+    `analytics` (ya alimentado con estos registros) evita recalcular las
+    latencias; sin él se calculan en la misma pasada que Mensajes/Raw.
+    `buffers` (stats["buffers"] de la extracción) añade a Resumen los
+    búferes de reensamblado descartados.
+    """
+    if views is None or views.records is not records:
+        views = FlatViews(records, keep=False)
+    schema = views.sync(kv=False)
+    wb = Workbook(write_only=True)
+
+    # --- Detecta columnas de metadatos presentes en los registros ---
+    meta_candidates = [
+        "time", "time_hms_ms", "hms", "ms",
+        "epoch", "frame", "tcp_stream", "stream",
+        "src", "dst", "src_ip", "dst_ip", "src_port", "dst_port",
+        "realm", "topic", "type", "opcode", "len", "proto",
+    ]
+    present = set(schema.total.rec.keys)
+    meta_cols: List[str] = [k for k in meta_candidates if k in present]
+
+    # --- Anchuras sobre una muestra ---
+    widths_seen: Dict[str, int] = defaultdict(int)
+    for rec in records[:WIDTH_SAMPLE]:
         for m in meta_cols:
-            row.append(_excel_clean(rec.get(m)))
+            widths_seen[m] = max(widths_seen[m], len(str(rec.get(m, ""))))
+        for k, v in views.entry(rec).flat.items():
+            widths_seen[k] = max(widths_seen[k], len(str(json_cell(v))))
+
+    def sheet_for(title: str, flat_keys: List[str]) -> _SheetWriter:
+        # Cabecera: meta + flat
+        header = meta_cols + flat_keys
+        if not header:
+            header = ["time", "type"]  # fallback
+        # Ajuste de anchuras (simple, sobre la muestra)
+        widths = [min(max(8, len(col), widths_seen.get(col, 0)), 60) + 1 for col in header]
+        return _SheetWriter(wb, title, header, _header_colors(header, meta_cols), widths, max_rows)
+
+    # route: valor del campo -> (hoja, claves aplanadas)
+    writers: List[_SheetWriter] = []
+    route: Dict[str, Tuple[_SheetWriter, List[str]]] = {}
+    if split_by:
+        used = set()
+        for label, values, group in schema.split(split_by):
+            keys = list(group.flat.keys)
+            writers.append(sheet_for(_sheet_title(label, used), keys))
+            for v in values:
+                route[v] = (writers[-1], keys)
+    else:
+        keys = list(schema.total.flat.keys)
+        writers.append(sheet_for("Mensajes", keys))
+
+    # --- Filas de Mensajes y Raw ---
+    # Claves base a exportar sin perder info (incluye args/kwargs/raw)
+    raw_keys = sorted(present | {"raw_detected_json_text"})
+    ws_raw = _SheetWriter(wb, "Raw", raw_keys, ["FF1F4E79"] * len(raw_keys), max_rows=max_rows)
+    ws, flat_keys_order = writers[0], keys
+    feed = None
+    if analytics is None:
+        analytics = WampAnalytics()
+        feed = analytics.feed
+    for rec in records:
+        if feed is not None:
+            feed(rec)
+        entry = views.entry(rec)
+        flat = entry.flat
+        if split_by:
+            ws, flat_keys_order = route[str(rec.get(split_by) or "")]
+        row: List[Any] = [_excel_clean(rec.get(m)) for m in meta_cols]
         # JSON aplanado (sin args/kwargs)
-        flat = flatten_json(obj) if isinstance(obj, dict) else OrderedDict()
         for k in flat_keys_order:
-            v = flat.get(k, "")
-            # convierte listas/dicts restantes a JSON compacto
-            if not _is_scalar(v):
-                try:
-                    v = json.dumps(v, ensure_ascii=False, separators=(",", ":"))
-                except Exception:
-                    v = str(v)
-            row.append(_excel_clean(v))
-        try:
-            ws.append(row)
-        except IllegalCharacterError:
-            ws.append([_excel_clean(x) for x in row])
-
-    # Ajuste de anchuras (simple)
-    for col in ws.columns:
-        max_len = 8
-        for cell in col[:200]:  # muestreo
-            v = cell.value
-            if v is None:
-                continue
-            l = len(str(v))
-            if l > max_len:
-                max_len = min(l, 60)
-        ws.column_dimensions[col[0].column_letter].width = max_len + 1
-
-    # --- Hoja Raw ---
-    # Claves base a exportar sin perder info (incluye args/kwargs/raw)
-    raw_keys = sorted(
-        set().union(*(r.keys() for r in records))
-        | {"raw_detected_json_text"}
-    )
-    # Cabecera Raw
-    for j, k in enumerate(raw_keys, start=1):
-        c = ws_raw.cell(row=1, column=j, value=_excel_clean(k))
-        c.fill = PatternFill("solid", start_color="FF1F4E79", end_color="FF1F4E79")
-        c.font = HEADER_FONT
-        c.alignment = HEADER_ALIGN
+            row.append(_excel_clean(json_cell(flat.get(k, ""))))
+        ws.append(row)
 
-    # Filas Raw
-    for rec, (obj, rawtxt) in zip(records, extracted_objs):
         row = []
         for k in raw_keys:
             if k == "raw_detected_json_text":
-                row.append(_excel_clean(rawtxt))
+                row.append(_excel_clean(entry.raw_text))
             else:
                 v = rec.get(k, "")
                 if isinstance(v, (dict, list)):
                     try:
-                        v = json.dumps(v, ensure_ascii=False)
+                        v = dumps(v)
                     except Exception:
                         v = str(v)
                 row.append(_excel_clean(v))
-        try:
-            ws_raw.append(row)
-        except IllegalCharacterError:
-            ws_raw.append([_excel_clean(x) for x in row])
+        ws_raw.append(row)
+    for w in writers:
+        w.close()
+    ws_raw.close()
 
     # --- Hoja Resumen ---
-    by_type = defaultdict(int)
-    by_topic = defaultdict(int)
-    for rec in records:
-        if "type" in rec and rec["type"]:
-            by_type[str(rec["type"])] += 1
-        if "topic" in rec and rec["topic"]:
-            by_topic[str(rec["topic"])] += 1
-
-    ws_sum.append(["Métrica", "Valor"])
+    by_type = {v: g.count for v, g in schema.groups["type"].items() if v}
+    by_topic = {v: g.count for v, g in schema.groups["topic"].items() if v}
+    ws_sum = _SheetWriter(wb, "Resumen", ["Métrica", "Valor"], ["FF1F4E79"] * 2, max_rows=max_rows)
     ws_sum.append(["Total registros", len(records)])
+    if buffers:
+        # mensajes perdidos por el presupuesto de reensamblado (ver core/reassembly.py)
+        ws_sum.append(["Búferes de reensamblado descartados", buffers_evicted(buffers)])
+        for k, label in BUFFER_LABELS.items():
+            ws_sum.append([f"  por {label}", buffers.get(k, 0)])
+        ws_sum.append(["  bytes descartados", buffers.get("dropped_bytes", 0)])
+        ws_sum.append(["  pico de bytes en reensamblado", buffers.get("peak_bytes", 0)])
     ws_sum.append([])
     ws_sum.append(["Por type", "count"])
     for k, v in sorted(by_type.items(), key=lambda x: (-x[1], x[0])):
-        ws_sum.append([k, v])
+        ws_sum.append([_excel_clean(k), v])
     ws_sum.append([])
     ws_sum.append(["Por topic", "count"])
     for k, v in sorted(by_topic.items(), key=lambda x: (-x[1], x[0])):
-        ws_sum.append([k, v])
-
-    # Estilo sencillo en Resumen
-    for cell in ws_sum["A1:B1"][0]:
-        cell.fill = PatternFill("solid", start_color="FF1F4E79", end_color="FF1F4E79")
-        cell.font = HEADER_FONT
-        cell.alignment = HEADER_ALIGN
+        ws_sum.append([_excel_clean(k), v])
+    ws_sum.append([])
+    ws_sum.append(["Columnas JSON por type", "columnas"])
+    for k, _, ncols in sorted(schema.summary("type"), key=lambda x: (-x[1], x[0])):
+        ws_sum.append([_excel_clean(k or "(vacío)"), ncols])
+    ws_sum.close()
+
+    # --- Hoja Latencias ---
+    if feed is not None:
+        analytics.finish()
+    ws_lat = _write_latency_sheet(wb, analytics, max_rows)
+
+    # las hojas de continuación se crean intercaladas; se agrupan por tipo
+    sheets = [sh for w in writers for sh in w.sheets] + ws_raw.sheets + ws_sum.sheets + ws_lat.sheets
+    for target, sheet in enumerate(sheets):
+        wb.move_sheet(sheet.title, target - wb.index(sheet))
 
     # --- Guarda ---
     wb.save(out_path)
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Filtros de red y cancelación de una extracción.
+
+Separado de pcap_parser para que la GUI pueda crear Filters y CancelToken
+al arrancar sin importar el decodificador (JSON, WAMP, WebSocket).
+"""
+import copy
+import ipaddress
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+def _split_items(text: str) -> List[str]:
+    return [t for t in re.split(r"[,;\s]+", text.strip()) if t]
+
+def _parse_nets(text: str) -> list:
+    """'10.0.0.1, 192.168.0.0/16, fe80::/10' -> lista de ip_network."""
+    nets = []
+    for t in _split_items(text):
+        try:
+            nets.append(ipaddress.ip_network(t, strict=False))
+        except ValueError:
+            raise ValueError(f"IP/CIDR no válida: {t}")
+    return nets
+
+def _parse_ranges(text: str, what: str, top: int) -> List[Tuple[int, int]]:
+    """'80, 443, 8000-8100' -> [(80,80), (443,443), (8000,8100)]."""
+    out = []
+    for t in _split_items(text):
+        lo, sep, hi = t.partition("-")
+        try:
+            lo_i = int(lo)
+            hi_i = int(hi) if sep else lo_i
+        except ValueError:
+            raise ValueError(f"{what} no válido: {t}")
+        if not (0 <= lo_i <= hi_i <= top):
+            raise ValueError(f"{what} fuera de rango: {t}")
+        out.append((lo_i, hi_i))
+    return out
+
+def _in_ranges(v: int, ranges: List[Tuple[int, int]]) -> bool:
+    for lo, hi in ranges:
+        if lo <= v <= hi:
+            return True
+    return False
+
+def _df_nets(nets: list, side: str) -> str:
+    parts = [f"{'ip' if n.version == 4 else 'ipv6'}.{side} == {n.with_prefixlen if n.num_addresses > 1 else n.network_address}"
+             for n in nets]
+    return " || ".join(parts)
+
+def _df_ranges(field: str, ranges: List[Tuple[int, int]]) -> str:
+    parts = [f"{field} == {lo}" if lo == hi else f"({field} >= {lo} && {field} <= {hi})" for lo, hi in ranges]
+    return " || ".join(parts)
+
+class Filters:
+    """
+    Filtros de red + modo/motor. IPs admiten listas y CIDR, puertos y
+    streams admiten listas y rangos ('80,443,8000-8100'). Se compilan a
+    display filter de tshark (-Y) o a un predicado previo al reensamblado
+    en el lector nativo.
+    """
+    def __init__(self, src_ip="", dst_ip="", src_port="", dst_port="", mode="AUTO", backend="TSHARK", streams="",
+                 workers=1):
+        self.src_ip = src_ip.strip()
+        self.dst_ip = dst_ip.strip()
+        self.src_port = src_port.strip()
+        self.dst_port = dst_port.strip()
+        self.streams = streams.strip()
+        self.mode = mode.upper()  # AUTO | WAMP | TCPJSON
+        self.backend = backend.upper()  # TSHARK | NATIVE
+        self.workers = max(1, int(workers or 1))  # procesos en modo paralelo
+        self.shard: Optional[Tuple[int, int]] = None  # (k, n): sólo streams con id % n == k
+        # formas compiladas (lanzan ValueError si el texto no es válido)
+        self._src_nets = _parse_nets(self.src_ip)
+        self._dst_nets = _parse_nets(self.dst_ip)
+        self._sports = _parse_ranges(self.src_port, "Puerto", 65535)
+        self._dports = _parse_ranges(self.dst_port, "Puerto", 65535)
+        self._streams = _parse_ranges(self.streams, "Stream", 2 ** 32)
+        self._ip_memo: Dict[Tuple[str, int], bool] = {}
+
+    def to_display(self):
+        return (f"src={self.src_ip or '*'} dst={self.dst_ip or '*'} sport={self.src_port or '*'} "
+                f"dport={self.dst_port or '*'} streams={self.streams or '*'} mode={self.mode} backend={self.backend}"
+                + (f" workers={self.workers}" if self.workers > 1 else ""))
+
+    def with_shard(self, k: int, n: int) -> "Filters":
+        """Copia restringida a los TCP streams con id % n == k."""
+        f = copy.copy(self)
+        f._ip_memo = {}
+        f.shard = (k, n)
+        return f
+
+    @property
+    def has_endpoint_filters(self) -> bool:
+        return bool(self._src_nets or self._dst_nets or self._sports or self._dports)
+
+    @property
+    def has_net_filters(self) -> bool:
+        return self.has_endpoint_filters or bool(self._streams) or self.shard is not None
+
+    def display_filter(self, base: str = "") -> str:
+        """Combina el filtro base del modo con los filtros de red en una expresión -Y."""
+        parts = [base] if base else []
+        for expr in (_df_nets(self._src_nets, "src"), _df_nets(self._dst_nets, "dst"),
+                     _df_ranges("tcp.srcport", self._sports), _df_ranges("tcp.dstport", self._dports),
+                     _df_ranges("tcp.stream", self._streams)):
+            if expr:
+                parts.append(expr)
+        if self.shard is not None:
+            # aritmética en display filters: requiere tshark >= 4.0 (lo comprueba iter_messages)
+            parts.append(f"tcp.stream % {self.shard[1]} == {self.shard[0]}")
+        if len(parts) <= 1:
+            return parts[0] if parts else ""
+        return " && ".join(f"({p})" for p in parts)
+
+    def _ip_in(self, ip: str, nets: list, side: int) -> bool:
+        key = (ip, side)
+        hit = self._ip_memo.get(key)
+        if hit is None:
+            try:
+                addr = ipaddress.ip_address(ip)
+                hit = any(addr in n for n in nets)
+            except ValueError:
+                hit = False
+            self._ip_memo[key] = hit
+        return hit
+
+    def match_endpoints(self, src: str, dst: str, sport: int, dport: int) -> bool:
+        """Predicado por paquete (equivalente a display_filter sin streams)."""
+        if self._src_nets and not self._ip_in(src, self._src_nets, 0):
+            return False
+        if self._dst_nets and not self._ip_in(dst, self._dst_nets, 1):
+            return False
+        if self._sports and not _in_ranges(sport, self._sports):
+            return False
+        if self._dports and not _in_ranges(dport, self._dports):
+            return False
+        return True
+
+    def match_stream(self, stream) -> bool:
+        sid = int(stream)
+        if self.shard is not None and sid % self.shard[1] != self.shard[0]:
+            return False
+        return not self._streams or _in_ranges(sid, self._streams)
+
+    def match(self, rec: Dict) -> bool:
+        """Aplica los filtros de red a un registro ya extraído."""
+        try:
+            sport = int(rec.get("src_port") or 0)
+            dport = int(rec.get("dst_port") or 0)
+            stream = int(rec.get("stream") or 0)
+        except (TypeError, ValueError):
+            return not self.has_net_filters
+        return (self.match_endpoints(rec.get("src", ""), rec.get("dst", ""), sport, dport)
+                and self.match_stream(stream))
+
+class Cancelled(Exception):
+    """La extracción se canceló desde fuera (p.ej. botón Cancelar)."""
+
+class CancelToken:
+    """
+    Señal de cancelación compartida entre la UI y la extracción.
+    Al cancelar se matan los procesos tshark registrados, de modo que
+    una lectura bloqueada en la tubería termina inmediatamente.
+    """
+    def __init__(self):
+        self._cancelled = False
+        self._procs: List["subprocess.Popen"] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def cancel(self):
+        with self._lock:
+            self._cancelled = True
+            procs = list(self._procs)
+        for p in procs:
+            _kill(p)
+
+    def check(self):
+        if self._cancelled:
+            raise Cancelled()
+
+    def register(self, proc: "subprocess.Popen"):
+        with self._lock:
+            self._procs.append(proc)
+            cancelled = self._cancelled
+        if cancelled:
+            _kill(proc)
+
+    def unregister(self, proc: "subprocess.Popen"):
+        with self._lock:
+            if proc in self._procs:
+                self._procs.remove(proc)
+
+def _kill(proc: "subprocess.Popen"):
+    if proc.poll() is None:
+        try:
+            proc.kill()
+        except OSError:
+            pass
@@ -0,0 +1,374 @@
+# src/core/flat_view.py
+from __future__ import annotations
+
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..util.flatten import ARRAYS_INDEX, flatten
+from .jsoncodec import dumps, loads
+from .schema_index import SchemaIndex
+
+JsonDict = Dict[str, Any]
+
+# ------------------------------------------------------------
+# JSON helpers
+# ------------------------------------------------------------
+def _find_largest_json_object(text: str) -> str | None:
+    """Devuelve el mayor bloque '{...}' balanceado en el texto, si existe."""
+    start_idx = []
+    best = None
+    best_len = 0
+    for i, ch in enumerate(text):
+        if ch == "{":
+            start_idx.append(i)
+        elif ch == "}" and start_idx:
+            s = start_idx.pop()
+            length = i - s + 1
+            if length > best_len:
+                best = text[s : i + 1]
+                best_len = length
+    return best
+
+
+def _try_parse_json_from_text(s: str) -> Any | None:
+    """Intenta parsear JSON desde una cadena que puede contener basura alrededor."""
+    if not s or not isinstance(s, str):
+        return None
+
+    # 1) intento directo
+    try:
+        return loads(s)
+    except Exception:
+        pass
+
+    # 2) si parece array WAMP, intenta sacar el primer objeto
+    #    formato típico: [16, 11, {}, "Topic", [{ ...obj... }]]
+    try:
+        arr = loads(s.strip())
+        if isinstance(arr, list):
+            # recorre buscando el primer dict
+            stack = list(arr)
+            while stack:
+                it = stack.pop(0)
+                if isinstance(it, dict):
+                    return it
+                if isinstance(it, list):
+                    stack = it + stack
+    except Exception:
+        pass
+
+    # 3) extrae el mayor bloque {...} y parsea
+    candidate = _find_largest_json_object(s)
+    if candidate:
+        try:
+            return loads(candidate)
+        except Exception:
+            return None
+    return None
+
+
+def _first_dict_in_nested(value: Any) -> JsonDict | None:
+    """Devuelve el primer dict que encuentre dentro de una estructura (list/tuple/dict)."""
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, (list, tuple)):
+        for it in value:
+            d = _first_dict_in_nested(it)
+            if d is not None:
+                return d
+    return None
+
+
+CAND_TEXT_KEYS = (
+    "json",
+    "payload",
+    "payload_text",
+    "raw_text",
+    "text",
+    "data",
+    "message",
+    "body",
+    "content",
+)
+
+RAW_KEYS = ("raw", "raw_text", "raw_payload", "payload", "json")
+
+
+def extract_json_object(rec: JsonDict) -> Tuple[JsonDict | None, str | None]:
+    """
+    Intenta obtener un objeto JSON 'útil' desde el registro:
+      - Si hay un dict ya en 'json' u otras claves, úsalo.
+      - Si hay texto con JSON, parsea.
+      - Si es array WAMP, extrae el dict interior.
+    Devuelve (obj_dict, raw_text_detected).
+    """
+    # 1) dict directo
+    for k in ("json_obj", "json", "obj", "object", "payload_obj"):
+        if isinstance(rec.get(k), dict):
+            return rec[k], dumps(rec[k])
+
+    # 2) texto con JSON
+    for k in CAND_TEXT_KEYS:
+        v = rec.get(k)
+        if isinstance(v, str) and v:
+            parsed = _try_parse_json_from_text(v)
+            if isinstance(parsed, dict):
+                return parsed, v
+            # si parsed es lista WAMP, coge el primer dict
+            d = _first_dict_in_nested(parsed)
+            if isinstance(d, dict):
+                return d, v
+
+    # 3) a veces args/kwargs esconden el objeto
+    args = rec.get("args")
+    kwargs = rec.get("kwargs")
+    if isinstance(kwargs, dict) and kwargs:
+        return kwargs, dumps(kwargs)
+    d = _first_dict_in_nested(args)
+    if isinstance(d, dict):
+        return d, dumps(args)
+
+    # nada encontrado
+    raw_example = None
+    for k in RAW_KEYS:
+        if isinstance(rec.get(k), str):
+            raw_example = rec[k]
+            break
+    return None, raw_example
+
+
+# ------------------------------------------------------------
+# Flatten
+# ------------------------------------------------------------
+def _is_scalar(x: Any) -> bool:
+    return isinstance(x, (int, float, str, bool)) or x is None
+
+
+def flatten_json(obj: Any, prefix: str = "", **opts) -> Dict[str, Any]:
+    """
+    Aplana dict/list a par clave->valor.
+    - dict -> 'prefix.key' (claves ordenadas)
+    - list escalar -> 'prefix[0]', 'prefix[1]'
+    - list de dicts -> idem (indexada)
+    opts: arrays/max_items de util.flatten.flatten (por defecto, indexada).
+    """
+    return flatten(obj, prefix, sort_keys=True, seq_types=(list,), **opts)
+
+
+def json_cell(v: Any) -> Any:
+    """Listas/dicts restantes a JSON compacto."""
+    if _is_scalar(v):
+        return v
+    try:
+        return dumps(v, compact=True)
+    except Exception:
+        return str(v)
+
+
+# ------------------------------------------------------------
+# Vista aplanada memoizada, compartida por exportadores y tabla
+# ------------------------------------------------------------
+def flatten_kv(rec: JsonDict) -> Dict[str, Any]:
+    """Aplanado de kwargs/args con prefijos 'kw.' y 'args[i]' (convención del CSV)."""
+    flat: Dict[str, Any] = {}
+    if isinstance(rec.get("kwargs"), dict):
+        flatten(rec["kwargs"], "kw", out=flat)
+    if isinstance(rec.get("args"), (list, tuple)):
+        flatten(rec["args"], "args", out=flat)
+    return flat
+
+
+# raw_text aún no calculado (None es un valor válido)
+_UNSET = object()
+
+
+def ndjson_payload(rec: JsonDict) -> Any:
+    # guardamos raw si lo hay; si no, kwargs
+    return rec["raw"] if rec.get("raw") else rec.get("kwargs", {})
+
+
+class FlatEntry:
+    """
+    Resultados derivados de un registro; cada uno se calcula la primera vez
+    que se pide y vive lo que viva la entrada (ver FlatViews). Se memoizan
+    los aplanados y el texto crudo detectado (raw_text, de la misma
+    extracción que flat), que la hoja Raw usaría de nuevo. El objeto JSON
+    extraído no se guarda (json lo vuelve a obtener del registro), para no
+    retener otra copia del payload decodificado.
+    """
+    __slots__ = ("rec", "opts", "_flat", "_kv", "_line", "_rawtxt")
+
+    def __init__(self, rec: JsonDict, opts: Optional[Dict[str, Any]] = None):
+        self.rec = rec
+        self.opts = opts or {}
+        self._flat = None
+        self._kv = None
+        self._line = None
+        self._rawtxt: Any = _UNSET
+
+    @property
+    def json(self) -> Tuple[JsonDict | None, str | None, Dict[str, Any]]:
+        """(objeto JSON extraído, texto crudo detectado, objeto aplanado)."""
+        obj, rawtxt = extract_json_object(self.rec)
+        if self._flat is None:
+            self._flat = flatten_json(obj, **self.opts) if isinstance(obj, dict) else {}
+        self._rawtxt = rawtxt
+        return obj, rawtxt, self._flat
+
+    @property
+    def flat(self) -> Dict[str, Any]:
+        """Objeto JSON extraído, aplanado (columnas de Mensajes)."""
+        if self._flat is None:
+            self.json
+        return self._flat
+
+    @property
+    def raw_text(self) -> str | None:
+        """Texto crudo del que sale el objeto JSON (columna raw_detected_json_text)."""
+        if self._rawtxt is _UNSET:
+            self.json
+        return self._rawtxt
+
+    @property
+    def kv(self) -> Dict[str, Any]:
+        if self._kv is None:
+            self._kv = flatten_kv(self.rec)
+        return self._kv
+
+    def keys(self, flat: bool = True, kv: bool = True) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        """Claves aplanadas (JSON, kwargs/args): lo único que necesita el SchemaIndex."""
+        return tuple(self.flat) if flat else (), tuple(self.kv) if kv else ()
+
+    @property
+    def ndjson_line(self) -> str:
+        if self._line is None:
+            self._line = dumps(ndjson_payload(self.rec)) + "\n"
+        return self._line
+
+
+# entradas (vistas aplanadas) que se guardan; las menos usadas se recalculan
+FLAT_CACHE_ROWS = int(os.environ.get("WAMP_EXTRACTOR_FLAT_CACHE_ROWS", "20000"))
+
+Keys = Tuple[Tuple[str, ...], Tuple[str, ...]]
+
+
+class FlatViews:
+    """
+    Caché de vistas aplanadas por registro. La usan los exportadores
+    (CSV, XLSX, NDJSON) y la tabla, de modo que un registro no se vuelve
+    a extraer y aplanar mientras su entrada siga en la caché.
+
+    Las entradas se indexan por identidad del registro, así que reordenar o
+    ampliar la lista no invalida nada. Se guardan como mucho `max_entries`
+    (FLAT_CACHE_ROWS, `WAMP_EXTRACTOR_FLAT_CACHE_ROWS`) y se descartan
+    primero las usadas hace más tiempo: las filas que se miran en la tabla
+    quedan a mano y una exportación de muchos registros no las retiene
+    todas. Las cabeceras salen del SchemaIndex, que sólo guarda claves y se
+    alimenta con add() según llegan los registros; si no, se construye en
+    una pasada al pedir cabeceras. Con keep=False no se guarda ninguna
+    entrada (exportaciones sueltas con memoria constante).
+    `arrays`/`max_items` controlan cómo se aplanan las listas del JSON
+    (ver util.flatten): 'index', 'cap' o 'json'.
+    """
+
+    def __init__(self, records: Optional[Sequence[JsonDict]] = None, keep: bool = True,
+                 arrays: str = ARRAYS_INDEX, max_items: int = 0, max_entries: int = FLAT_CACHE_ROWS):
+        self.keep = keep
+        self.max_entries = max(1, max_entries)
+        self.flatten_opts = {"arrays": arrays, "max_items": max_items}
+        self.reset(records)
+
+    def set_array_mode(self, arrays: str, max_items: int = 0) -> None:
+        """Cambia el tratamiento de listas; invalida las vistas ya calculadas."""
+        self.flatten_opts = {"arrays": arrays, "max_items": max_items}
+        self.reset(self.records)
+
+    def reset(self, records: Optional[Sequence[JsonDict]] = None) -> None:
+        """Invalida todo; llamar cuando se sustituyen los registros."""
+        self.records = records if records is not None else []
+        self._entries: "OrderedDict[int, FlatEntry]" = OrderedDict()
+        self.schema = SchemaIndex()
+
+    def entry(self, rec: JsonDict) -> FlatEntry:
+        entries = self._entries
+        e = entries.get(id(rec))
+        # se comprueba la identidad: un id puede reutilizarse tras liberar el registro
+        if e is not None and e.rec is rec:
+            entries.move_to_end(id(rec))
+            return e
+        e = FlatEntry(rec, self.flatten_opts)
+        if self.keep:
+            entries[id(rec)] = e
+            entries.move_to_end(id(rec))
+            if len(entries) > self.max_entries:
+                entries.popitem(last=False)
+        return e
+
+    def __iter__(self) -> Iterable[FlatEntry]:
+        return (self.entry(r) for r in self.records)
+
+    def prepare(self, records: Sequence[JsonDict]) -> List[Keys]:
+        """
+        Claves aplanadas de unos registros, sin tocar la caché; pensado para
+        el hilo de extracción. Los aplanados no se guardan. Luego se
+        registran con add().
+        """
+        opts = self.flatten_opts
+        return [FlatEntry(r, opts).keys() for r in records]
+
+    def add(self, records: Sequence[JsonDict], keys: Optional[Sequence[Keys]] = None) -> None:
+        """Indexa en el esquema registros recién añadidos a self.records."""
+        if keys is None:
+            opts = self.flatten_opts
+            keys = (FlatEntry(r, opts).keys() for r in records)
+        schema = self.schema
+        for r, (flat, kv) in zip(records, keys):
+            schema.add(r, flat, kv)
+
+    def discard(self, records: Sequence[JsonDict]) -> None:
+        """
+        Olvida las vistas de registros que ya no están en self.records
+        (seguimiento en vivo). El esquema no se reduce: las columnas y
+        recuentos de los registros descartados se mantienen.
+        """
+        entries = self._entries
+        for r in records:
+            e = entries.get(id(r))
+            if e is not None and e.rec is r:
+                del entries[id(r)]
+
+    def sync(self, flat: bool = True, kv: bool = True) -> SchemaIndex:
+        """Esquema que cubre todos los registros (lo construye si faltan registros por indexar)."""
+        if not self.keep:
+            # exportación suelta: calcula sólo la parte que se pide
+            schema = SchemaIndex()
+            opts = self.flatten_opts
+            for r in self.records:
+                schema.add(r, *FlatEntry(r, opts).keys(flat, kv))
+            self.schema = schema
+        elif self.schema.count < len(self.records):
+            # registros que no pasaron por add() (caché de sesión, NDJSON)
+            self.schema = SchemaIndex()
+            self.add(self.records)
+        return self.schema
+
+    def flat_keys(self) -> List[str]:
+        """Claves del JSON aplanado en orden de primera aparición (cabecera XLSX)."""
+        return list(self.sync(kv=False).total.flat.keys)
+
+    def kv_keys(self) -> List[str]:
+        """Claves kw./args. presentes en algún registro, ordenadas (cabecera CSV)."""
+        return sorted(self.sync(flat=False).total.kv.keys)
+
+    def record_keys(self) -> set:
+        """Unión de las claves de primer nivel de los registros."""
+        return set(self.sync(flat=False, kv=False).total.rec.keys)
+
+    def preview(self, rec: JsonDict, limit: int = 20) -> str:
+        """Texto corto 'clave = valor' del JSON aplanado (tooltip de la tabla)."""
+        flat = self.entry(rec).flat
+        lines = [f"{k} = {json_cell(v)}" for k, v in list(flat.items())[:limit]]
+        if len(flat) > limit:
+            lines.append(f"… (+{len(flat) - limit})")
+        return "\n".join(lines)
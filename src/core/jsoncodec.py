@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Codificación/decodificación JSON del extractor, con motor rápido opcional.
+
+Todo el parseo (arrays WAMP, objetos TCP-JSON, args/kwargs bajo demanda,
+NDJSON, caché de sesión) y los exportadores pasan por loads()/dumps() de
+este módulo. Si está instalado se usa orjson (o, sin él, simdjson para
+decodificar); si no, la biblioteca estándar. El resultado es idéntico en
+los tres casos:
+
+  - loads: orjson/simdjson rechazan NaN/Infinity, floats fuera de rango
+    (1e400) y surrogates sueltos, que json acepta; ante cualquier error se
+    reintenta con json, que devuelve lo mismo de siempre o lanza su misma
+    excepción. Los enteros de más de 64 bits, en cambio, los convierten a
+    float sin avisar: un texto con 19 o más dígitos seguidos va directo a
+    json.
+  - dumps compacto (separators=(",", ":"), ensure_ascii=False): orjson
+    escribe los floats con otro exponente (1e16 frente a 1e+16, 1e-05
+    frente a 0.00001) y NaN/inf como null, y no admite claves no str ni
+    enteros grandes. Si la salida contiene un exponente, '0.0000' o null,
+    o orjson lanza TypeError, se vuelve a codificar con json.
+  - dumps con los separadores por defecto (', ' y ': ', los de la hoja
+    Raw, el NDJSON y la columna raw): orjson no sabe escribirlos y
+    reescribir su salida cuesta más que lo que ahorra, así que usan json
+    con el codificador ya construido (json.dumps crea uno en cada llamada
+    cuando se le pasan opciones).
+
+WAMP_EXTRACTOR_JSON=stdlib|orjson|simdjson fuerza el motor (p. ej. para
+comparar salidas); un motor no instalado equivale a stdlib.
+"""
+import json
+import os
+import re
+from typing import Any, Callable, Optional
+
+STDLIB, ORJSON, SIMDJSON = "stdlib", "orjson", "simdjson"
+
+_std_loads = json.loads
+_std_spaced = json.JSONEncoder(ensure_ascii=False).encode
+_std_compact = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+# salida de orjson que json escribiría distinto (exponentes, floats pequeños, NaN/inf)
+_ORJSON_DIVERGES = re.compile(rb"\de|0\.0000|null").search
+# números que pueden no caber en 64 bits (hasta 18 dígitos siempre caben):
+# dígitos -> '0', resto -> ' ' y se busca la racha (más barato que una regex)
+_DIGITS = bytes(0x30 if 0x30 <= i <= 0x39 else 0x20 for i in range(256))
+_LONG_NUMBER = b"0" * 19
+
+
+def _select(wanted: str):
+    """(nombre del motor, loads rápido o None, dumps compacto rápido o None)."""
+    if wanted in ("", "auto", ORJSON):
+        try:
+            import orjson
+            return ORJSON, orjson.loads, orjson.dumps
+        except ImportError:
+            pass
+    if wanted in ("", "auto", SIMDJSON):
+        try:
+            import simdjson
+            return SIMDJSON, simdjson.loads, None
+        except (ImportError, AttributeError):
+            pass
+    return STDLIB, None, None
+
+
+BACKEND, _fast_loads, _fast_dumps = _select(os.environ.get("WAMP_EXTRACTOR_JSON", "auto").strip().lower())
+
+
+def loads(s: Any) -> Any:
+    """Como json.loads (str o bytes); mismas excepciones si no es JSON."""
+    if _fast_loads is not None:
+        try:
+            b = s.encode("utf-8") if isinstance(s, str) else s
+            if _LONG_NUMBER not in b.translate(_DIGITS):
+                return _fast_loads(b)
+        except Exception:
+            pass  # también str con surrogates sueltos (no se codifican en UTF-8)
+    return _std_loads(s)
+
+
+def dumps(obj: Any, compact: bool = False, default: Optional[Callable[[Any], Any]] = None) -> str:
+    """
+    json.dumps(obj, ensure_ascii=False), con separators=(",", ":") si
+    compact. `default` como en json.dumps (siempre por la vía estándar).
+    """
+    if default is not None:
+        seps = (",", ":") if compact else None
+        return json.dumps(obj, ensure_ascii=False, separators=seps, default=default)
+    if not compact:
+        return _std_spaced(obj)
+    if _fast_dumps is not None:
+        try:
+            out = _fast_dumps(obj)
+        except TypeError:
+            pass
+        else:
+            if not _ORJSON_DIVERGES(out):
+                return out.decode("utf-8")
+    return _std_compact(obj)
@@ -0,0 +1,736 @@
+
+# -*- coding: utf-8 -*-
+"""
+Lector pcap/pcapng en proceso (sin tshark).
+
+Mapea el fichero en memoria, recorre cabeceras Ethernet/IPv4/IPv6/TCP,
+reensambla cada conexión TCP (equivalente a tcp.stream) y parsea los
+frames WebSocket directamente desde los bytes. También sigue capturas
+en curso (fichero que crece, FIFO o stdin) con follow_messages().
+"""
+import mmap, os, select, socket, stat, struct, sys, time
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+from .reassembly import BufferBudget
+from .utils import ws_unmask
+
+# ------------------------------------------------------------
+# Lectura de bloques pcap / pcapng
+# ------------------------------------------------------------
+PCAP_MAGICS = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1e-6),
+    b"\xa1\xb2\xc3\xd4": (">", 1e-6),
+    b"\x4d\x3c\xb2\xa1": ("<", 1e-9),
+    b"\xa1\xb2\x3c\x4d": (">", 1e-9),
+}
+PCAPNG_SHB = b"\x0a\x0d\x0d\x0a"
+
+class CaptureFormatError(ValueError):
+    pass
+
+def open_capture(path: str):
+    """Devuelve un mmap de solo lectura (o b"" si el fichero está vacío)."""
+    with open(path, "rb") as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return b""
+
+def iter_packets(buf) -> Iterator[Tuple[float, int, memoryview, int]]:
+    """Itera (epoch, linktype, datos, offset fin de registro) sobre un buffer pcap o pcapng."""
+    head = bytes(buf[:4])
+    if head in PCAP_MAGICS:
+        return _iter_pcap(buf)
+    if head == PCAPNG_SHB:
+        return _iter_pcapng(buf)
+    if not head:
+        return iter(())
+    raise CaptureFormatError("Formato de captura no reconocido (ni pcap ni pcapng)")
+
+def _iter_pcap(buf) -> Iterator[Tuple[float, int, memoryview, int]]:
+    endian, res = PCAP_MAGICS[bytes(buf[:4])]
+    if len(buf) < 24:
+        return
+    linktype = struct.unpack_from(endian + "I", buf, 20)[0] & 0x0FFFFFFF
+    rec = struct.Struct(endian + "IIII")
+    mv = memoryview(buf)
+    off, n = 24, len(buf)
+    while off + 16 <= n:
+        sec, frac, incl, _orig = rec.unpack_from(buf, off)
+        off += 16
+        if off + incl > n:
+            break  # registro truncado al final del fichero
+        yield sec + frac * res, linktype, mv[off:off + incl], off + incl
+        off += incl
+
+def _tsresol(opts: memoryview, endian: str) -> float:
+    o, n = 0, len(opts)
+    while o + 4 <= n:
+        code, ln = struct.unpack_from(endian + "HH", opts, o)
+        if code == 0:
+            break
+        if code == 9 and ln >= 1:
+            v = opts[o + 4]
+            return 2.0 ** -(v & 0x7F) if v & 0x80 else 10.0 ** -v
+        o += 4 + ((ln + 3) & ~3)
+    return 1e-6
+
+def _iter_pcapng(buf) -> Iterator[Tuple[float, int, memoryview, int]]:
+    mv = memoryview(buf)
+    off, n = 0, len(buf)
+    endian = "<"
+    ifaces: List[Tuple[int, float]] = []
+    while off + 12 <= n:
+        if bytes(buf[off:off + 4]) == PCAPNG_SHB:
+            bom = bytes(buf[off + 8:off + 12])
+            endian = "<" if bom == b"\x4d\x3c\x2b\x1a" else ">"
+            ifaces = []
+        btype, blen = struct.unpack_from(endian + "II", buf, off)
+        if blen < 12 or off + blen > n:
+            break
+        pkt = _pcapng_block(btype, mv[off + 8:off + blen - 4], endian, ifaces)
+        if pkt is not None:
+            yield pkt[0], pkt[1], pkt[2], off + blen
+        off += blen
+
+def _pcapng_block(btype: int, body: memoryview, endian: str,
+                  ifaces: List[Tuple[int, float]]) -> Optional[Tuple[float, int, memoryview]]:
+    """Cuerpo de un bloque pcapng -> (epoch, linktype, datos) si es un paquete; registra los IDB."""
+    if btype == 1:      # Interface Description Block
+        linktype = struct.unpack_from(endian + "H", body, 0)[0]
+        ifaces.append((linktype, _tsresol(body[8:], endian)))
+    elif btype == 6:    # Enhanced Packet Block
+        iid, hi, lo, caplen, _orig = struct.unpack_from(endian + "IIIII", body, 0)
+        if iid < len(ifaces):
+            linktype, res = ifaces[iid]
+            return ((hi << 32) | lo) * res, linktype, body[20:20 + caplen]
+    elif btype == 3:    # Simple Packet Block (sin timestamp)
+        if ifaces:
+            orig = struct.unpack_from(endian + "I", body, 0)[0]
+            return 0.0, ifaces[0][0], body[4:4 + min(orig, len(body) - 4)]
+    elif btype == 2:    # Packet Block (obsoleto)
+        iid, _drops, hi, lo, caplen, _orig = struct.unpack_from(endian + "HHIIII", body, 0)
+        if iid < len(ifaces):
+            linktype, res = ifaces[iid]
+            return ((hi << 32) | lo) * res, linktype, body[20:20 + caplen]
+    return None
+
+class CaptureStream:
+    """
+    Lector incremental pcap/pcapng para capturas que llegan por partes
+    (fichero que crece, FIFO, stdin): feed() devuelve los paquetes
+    completos y guarda el resto hasta el siguiente trozo.
+    """
+    def __init__(self):
+        self.buf = bytearray()
+        self.kind = ""              # "" (aún no se sabe) | pcap | pcapng
+        self.endian = "<"
+        self.res = 1e-6
+        self.linktype = 0
+        self.ifaces: List[Tuple[int, float]] = []
+        self.consumed = 0           # bytes ya procesados (progreso)
+
+    def feed(self, data: bytes) -> List[Tuple[float, int, bytes, int]]:
+        """(epoch, linktype, datos, bytes consumidos) de cada paquete completo."""
+        self.buf += data
+        buf = self.buf
+        n = len(buf)
+        off = 0
+        if not self.kind:
+            head = bytes(buf[:4])
+            if head in PCAP_MAGICS:
+                if n < 24:
+                    return []
+                self.endian, self.res = PCAP_MAGICS[head]
+                self.linktype = struct.unpack_from(self.endian + "I", buf, 20)[0] & 0x0FFFFFFF
+                self.kind, off = "pcap", 24
+            elif head == PCAPNG_SHB:
+                self.kind = "pcapng"
+            elif len(head) == 4 or not (PCAPNG_SHB.startswith(head) or any(m.startswith(head) for m in PCAP_MAGICS)):
+                raise CaptureFormatError("Formato de captura no reconocido (ni pcap ni pcapng)")
+            else:
+                return []
+        out = []
+        if self.kind == "pcap":
+            rec = struct.Struct(self.endian + "IIII")
+            while off + 16 <= n:
+                sec, frac, incl, _orig = rec.unpack_from(buf, off)
+                if off + 16 + incl > n:
+                    break
+                out.append((sec + frac * self.res, self.linktype, bytes(buf[off + 16:off + 16 + incl]),
+                            self.consumed + off + 16 + incl))
+                off += 16 + incl
+        else:
+            while off + 12 <= n:
+                if bytes(buf[off:off + 4]) == PCAPNG_SHB:
+                    bom = bytes(buf[off + 8:off + 12])
+                    self.endian = "<" if bom == b"\x4d\x3c\x2b\x1a" else ">"
+                    self.ifaces = []
+                btype, blen = struct.unpack_from(self.endian + "II", buf, off)
+                if blen < 12:
+                    raise CaptureFormatError("Bloque pcapng no válido")
+                if off + blen > n:
+                    break
+                # copia del cuerpo: una vista viva impediría recortar self.buf
+                body = memoryview(bytes(buf[off + 8:off + blen - 4]))
+                pkt = _pcapng_block(btype, body, self.endian, self.ifaces)
+                if pkt is not None:
+                    out.append((pkt[0], pkt[1], bytes(pkt[2]), self.consumed + off + blen))
+                off += blen
+        if off:
+            del buf[:off]
+            self.consumed += off
+        return out
+
+# ------------------------------------------------------------
+# Decodificación enlace / IP / TCP
+# ------------------------------------------------------------
+LINKTYPE_NULL, LINKTYPE_ETHERNET, LINKTYPE_RAW = 0, 1, 101
+LINKTYPE_LOOP, LINKTYPE_LINUX_SLL, LINKTYPE_LINUX_SLL2 = 108, 113, 276
+RAW_LINKTYPES = (LINKTYPE_RAW, 12, 14, 228, 229)
+
+# direcciones ya formateadas; se vacía al llegar al tope (seguimientos largos)
+IP_CACHE_MAX = 65536
+_ip_cache: Dict[bytes, str] = {}
+
+def _ip_str(raw: bytes) -> str:
+    s = _ip_cache.get(raw)
+    if s is None:
+        if len(_ip_cache) >= IP_CACHE_MAX:
+            _ip_cache.clear()
+        fam = socket.AF_INET if len(raw) == 4 else socket.AF_INET6
+        s = _ip_cache[raw] = socket.inet_ntop(fam, raw)
+    return s
+
+def _l3(linktype: int, data: memoryview) -> Optional[Tuple[int, memoryview]]:
+    """Devuelve (ethertype, payload L3) o None si el enlace no es IP."""
+    if linktype == LINKTYPE_ETHERNET:
+        if len(data) < 14:
+            return None
+        et = (data[12] << 8) | data[13]
+        off = 14
+        while et in (0x8100, 0x88A8, 0x9100) and len(data) >= off + 4:
+            et = (data[off + 2] << 8) | data[off + 3]
+            off += 4
+        return et, data[off:]
+    if linktype in RAW_LINKTYPES:
+        if not data:
+            return None
+        return (0x0800 if data[0] >> 4 == 4 else 0x86DD), data
+    if linktype == LINKTYPE_LINUX_SLL:
+        if len(data) < 16:
+            return None
+        return (data[14] << 8) | data[15], data[16:]
+    if linktype == LINKTYPE_LINUX_SLL2:
+        if len(data) < 20:
+            return None
+        return (data[0] << 8) | data[1], data[20:]
+    if linktype in (LINKTYPE_NULL, LINKTYPE_LOOP):
+        if len(data) < 5:
+            return None
+        return (0x0800 if data[4] >> 4 == 4 else 0x86DD), data[4:]
+    return None
+
+_IPV6_EXT = (0, 43, 60)
+
+def decode_tcp(linktype: int, data: memoryview):
+    """
+    Devuelve (src, dst, sport, dport, seq, flags, payload) de un paquete
+    TCP/IP, o None si el paquete no es TCP o es un fragmento IP no inicial.
+    """
+    l3 = _l3(linktype, data)
+    if l3 is None:
+        return None
+    et, ip = l3
+    if et == 0x0800:
+        if len(ip) < 20 or ip[9] != 6:
+            return None
+        ihl = (ip[0] & 0x0F) * 4
+        if (((ip[6] & 0x1F) << 8) | ip[7]) != 0:
+            return None  # fragmento no inicial
+        total = (ip[2] << 8) | ip[3]
+        tcp = ip[ihl:total] if total >= ihl else ip[ihl:]
+        src, dst = bytes(ip[12:16]), bytes(ip[16:20])
+    elif et == 0x86DD:
+        if len(ip) < 40:
+            return None
+        nxt = ip[6]
+        plen = (ip[4] << 8) | ip[5]
+        src, dst = bytes(ip[8:24]), bytes(ip[24:40])
+        body = ip[40:40 + plen] if plen else ip[40:]
+        while nxt in _IPV6_EXT or nxt == 44:
+            if len(body) < 8:
+                return None
+            if nxt == 44:
+                if (((body[2] << 8) | body[3]) & 0xFFF8) != 0:
+                    return None
+                nxt, body = body[0], body[8:]
+            else:
+                nxt, body = body[0], body[(body[1] + 1) * 8:]
+        if nxt != 6:
+            return None
+        tcp = body
+    else:
+        return None
+    if len(tcp) < 20:
+        return None
+    sport, dport, seq = struct.unpack_from("!HHI", tcp, 0)
+    doff = (tcp[12] >> 4) * 4
+    return _ip_str(src), _ip_str(dst), sport, dport, seq, tcp[13], tcp[doff:]
+
+# ------------------------------------------------------------
+# Reensamblado TCP
+# ------------------------------------------------------------
+TCP_FIN, TCP_SYN, TCP_RST, TCP_ACK = 0x01, 0x02, 0x04, 0x10
+# huecos que no se rellenan (paquetes perdidos en la captura): a partir de
+# aquí se salta el hueco y se descarta el estado del consumidor
+MAX_OOO_SEGMENTS = 256
+# estado por conexión (reensamblado, sesión WS/WAMP, deflate): se libera tras
+# FIN/RST sin más paquetes durante CLOSED_LINGER_SECONDS, tras
+# CONN_IDLE_SECONDS sin paquetes, o la menos reciente al pasar de MAX_CONNS.
+# Tiempos de captura (epoch); con una captura en curso la memoria queda acotada
+CONN_IDLE_SECONDS = float(os.environ.get("WAMP_EXTRACTOR_CONN_IDLE_SECONDS", "1800"))
+CLOSED_LINGER_SECONDS = 60.0
+MAX_CONNS = int(os.environ.get("WAMP_EXTRACTOR_MAX_CONNS", "50000"))
+CONN_EXPIRE_EVERY = 1.0     # segundos de captura entre barridos
+
+def _seq_lt(a: int, b: int) -> bool:
+    return ((a - b) & 0xFFFFFFFF) > 0x7FFFFFFF
+
+class _Half:
+    """Un sentido de una conexión TCP."""
+    __slots__ = ("next_seq", "ooo", "src", "dst", "state", "probe", "ws", "lost")
+
+    def __init__(self, src: str, dst: str):
+        self.next_seq: Optional[int] = None
+        self.ooo: Dict[int, bytes] = {}
+        self.src, self.dst = src, dst
+        self.state = "probe"        # probe | ws | raw | drop
+        self.probe = bytearray()    # cabeceras HTTP mientras se decide
+        self.ws: Optional[WsFrameParser] = None
+        self.lost = False           # hubo un hueco irrecuperable
+
+    def evict(self, _key=None):
+        """Lo llama el BufferBudget al descartar el frame WS incompleto: no se puede resincronizar."""
+        if self.ws is not None:
+            self.ws.pending = []
+        self.state = "drop"
+
+    def push(self, seq: int, flags: int, payload) -> List[bytes]:
+        """Entrega los bytes contiguos que este segmento hace disponibles."""
+        if flags & TCP_SYN:
+            self.next_seq = (seq + 1) & 0xFFFFFFFF
+            seq = self.next_seq
+        if not payload:
+            return []
+        if self.next_seq is None:
+            self.next_seq = seq
+        out: List[bytes] = []
+        nxt = self.next_seq
+        if _seq_lt(nxt, seq):
+            self.ooo.setdefault(seq, bytes(payload))
+            if len(self.ooo) <= MAX_OOO_SEGMENTS:
+                return out
+            # hueco irrecuperable: saltar al primer segmento pendiente
+            nxt = min(self.ooo, key=lambda s: (s - nxt) & 0xFFFFFFFF)
+            self.lost = True
+        else:
+            skip = (nxt - seq) & 0xFFFFFFFF
+            if skip < len(payload):
+                out.append(bytes(payload[skip:]))
+                nxt = (seq + len(payload)) & 0xFFFFFFFF
+        while self.ooo:
+            ready = [s for s in self.ooo if not _seq_lt(nxt, s)]
+            if not ready:
+                break
+            for s in ready:
+                seg = self.ooo.pop(s)
+                skip = (nxt - s) & 0xFFFFFFFF
+                if skip < len(seg):
+                    out.append(seg[skip:])
+                    nxt = (s + len(seg)) & 0xFFFFFFFF
+        self.next_seq = nxt
+        return out
+
+class _Conn:
+    __slots__ = ("stream", "halves", "closing", "headers", "server", "response", "key", "last")
+
+    def __init__(self, stream: str, key: tuple):
+        self.stream = stream
+        self.key = key
+        self.last = 0.0                      # epoch del último paquete
+        self.halves: Dict[Tuple[str, int], _Half] = {}
+        self.closing = False
+        self.headers: Dict[str, str] = {}   # cabeceras del handshake WebSocket
+        self.server: Optional[_Half] = None  # sentido que respondió 101
+        self.response: Dict[str, str] = {}  # cabeceras de la respuesta 101 (extensiones, subprotocolo)
+
+class TcpReassembler:
+    """
+    Asigna ids de stream por 4-tupla (como tcp.stream) y reensambla cada
+    sentido. Las conexiones abiertas y las cerradas (FIN/RST) se guardan
+    en orden de último paquete; expire() y el tope MAX_CONNS las pasan a
+    `released`, que el consumidor vacía soltando su propio estado.
+    """
+    def __init__(self, idle_seconds: float = CONN_IDLE_SECONDS, linger_seconds: float = CLOSED_LINGER_SECONDS,
+                 max_conns: int = MAX_CONNS):
+        self.conns: "OrderedDict[tuple, _Conn]" = OrderedDict()
+        self.closed: "OrderedDict[tuple, _Conn]" = OrderedDict()
+        self.released: List[_Conn] = []
+        self.idle_seconds = idle_seconds
+        self.linger_seconds = linger_seconds
+        self.max_conns = max(1, max_conns)
+        self.next_expire = float("-inf")
+        self.next_stream = 0
+
+    def conn_for(self, src: str, dst: str, sport: int, dport: int, flags: int, ts: float = 0.0) -> _Conn:
+        """Conexión de la 4-tupla; se llama para todo paquete TCP para numerar igual que tshark."""
+        a, b = (src, sport), (dst, dport)
+        key = (a, b) if a <= b else (b, a)
+        conn = self.conns.get(key)
+        if conn is None:
+            conn = self.closed.get(key)
+            if conn is not None:
+                if flags & TCP_SYN and not flags & TCP_ACK:
+                    # reutilización de la 4-tupla: conexión nueva
+                    del self.closed[key]
+                    self.released.append(conn)
+                    conn = None
+                else:
+                    self.closed.move_to_end(key)
+        else:
+            self.conns.move_to_end(key)
+        if conn is None:
+            conn = self.conns[key] = _Conn(str(self.next_stream), key)
+            self.next_stream += 1
+            if len(self.conns) + len(self.closed) > self.max_conns:
+                oldest = self.closed if self.closed else self.conns
+                self.released.append(oldest.popitem(last=False)[1])
+        if flags & (TCP_FIN | TCP_RST) and not conn.closing:
+            conn.closing = True
+            self.closed[key] = self.conns.pop(key)
+        conn.last = ts
+        return conn
+
+    def expire(self, ts: float) -> None:
+        """Pasa a `released` las cerradas sin paquetes desde linger_seconds y las inactivas."""
+        self.next_expire = ts + CONN_EXPIRE_EVERY
+        for table, limit in ((self.closed, ts - self.linger_seconds), (self.conns, ts - self.idle_seconds)):
+            while table:
+                conn = next(iter(table.values()))
+                if conn.last >= limit:
+                    break
+                del table[conn.key]
+                self.released.append(conn)
+
+    def __len__(self) -> int:
+        return len(self.conns) + len(self.closed)
+
+    def push(self, conn: _Conn, src: str, dst: str, sport: int, seq: int, flags: int,
+             payload) -> Tuple[_Half, List[bytes]]:
+        half = conn.halves.get((src, sport))
+        if half is None:
+            half = conn.halves[(src, sport)] = _Half(src, dst)
+        return half, half.push(seq, flags, payload)
+
+# ------------------------------------------------------------
+# Frames WebSocket desde bytes
+# ------------------------------------------------------------
+class WsFrameParser:
+    """
+    Parser incremental de frames WebSocket (RFC 6455) para un sentido.
+    Un frame que ocupa varios segmentos se guarda como lista de segmentos y
+    se une una sola vez cuando ya hay bytes suficientes; el payload se toma
+    con memoryview, así que cada byte se copia como mucho dos veces.
+    """
+    def __init__(self):
+        self.pending: List[bytes] = []   # segmentos de un frame incompleto
+        self.pending_len = 0
+        self.need = 0                    # bytes necesarios para avanzar
+
+    def feed(self, data: bytes) -> List[Tuple[int, int, int, bytes]]:
+        """Devuelve los frames completos como (fin, rsv, opcode, payload sin máscara)."""
+        if self.pending:
+            self.pending.append(data)
+            self.pending_len += len(data)
+            if self.pending_len < self.need:
+                return []
+            data = b"".join(self.pending)
+            self.pending = []
+        mv = memoryview(data)
+        frames = []
+        off, n = 0, len(data)
+        need = 2
+        while n - off >= 2:
+            b0, b1 = data[off], data[off + 1]
+            ln = b1 & 0x7F
+            hdr = 2
+            if ln == 126:
+                if n - off < 4:
+                    need = 4
+                    break
+                ln = (data[off + 2] << 8) | data[off + 3]
+                hdr = 4
+            elif ln == 127:
+                if n - off < 10:
+                    need = 10
+                    break
+                ln = struct.unpack_from("!Q", data, off + 2)[0]
+                hdr = 10
+            masked = b1 & 0x80
+            if masked:
+                hdr += 4
+            if n - off < hdr + ln:
+                need = hdr + ln
+                break
+            body = mv[off + hdr:off + hdr + ln]
+            if masked:
+                payload = ws_unmask(body, mv[off + hdr - 4:off + hdr])
+            else:
+                payload = body.tobytes()
+            frames.append((b0 >> 7, (b0 >> 4) & 0x07, b0 & 0x0F, payload))
+            off += hdr + ln
+        if off < n:
+            tail = data[off:] if off else data
+            self.pending = [tail]
+            self.pending_len = len(tail)
+            self.need = need
+        return frames
+
+# ------------------------------------------------------------
+# Handshake HTTP
+# ------------------------------------------------------------
+MAX_HANDSHAKE = 16384
+
+def _parse_http_head(head: bytes) -> Tuple[str, Dict[str, str]]:
+    lines = head.decode("latin-1", errors="ignore").split("\r\n")
+    hdrs: Dict[str, str] = {}
+    for ln in lines[1:]:
+        k, sep, v = ln.partition(":")
+        if sep:
+            hdrs[k.strip().lower()] = v.strip()
+    return lines[0], hdrs
+
+def _probe(conn: _Conn, half: _Half, data: bytes) -> Optional[bytes]:
+    """
+    Acumula el inicio de un sentido hasta decidir si es un handshake
+    WebSocket. Devuelve los bytes posteriores a la cabecera (o todo lo
+    acumulado si el sentido resulta ser 'raw'); None si aún no se sabe.
+    """
+    half.probe.extend(data)
+    buf = half.probe
+    if len(buf) < 5 and (b"GET ".startswith(buf) or b"HTTP/".startswith(buf)):
+        return None
+    if buf.startswith(b"GET ") or buf.startswith(b"HTTP/"):
+        end = buf.find(b"\r\n\r\n")
+        if end < 0 and len(buf) <= MAX_HANDSHAKE:
+            return None
+        if end >= 0:
+            first, hdrs = _parse_http_head(bytes(buf[:end]))
+            upgrade = hdrs.get("upgrade", "").lower() == "websocket"
+            switching = first.split(" ")[1:2] == ["101"]
+            if (first.startswith("GET ") and upgrade) or switching:
+                conn.headers.update(hdrs)
+                if switching:
+                    conn.server = half
+                    conn.response = hdrs
+                half.state = "ws"
+                half.ws = WsFrameParser()
+                half.probe = bytearray()
+                return bytes(buf[end + 4:])
+    half.state = "raw"
+    half.probe = bytearray()
+    return bytes(buf)
+
+# ------------------------------------------------------------
+# Pipeline
+# ------------------------------------------------------------
+CANCEL_CHECK_EVERY = 4096
+
+def iter_messages(pcap: str, flt, cancel=None, ws: bool = True, tcpjson: bool = True,
+                  progress=None, stats=None) -> Iterator[Dict]:
+    """
+    Equivalente nativo de pcap_parser.iter_messages: misma forma de
+    registro, mismos reensambladores de mensajes. `progress(hecho, total)`
+    recibe bytes del fichero procesados; `stats["buffers"]`, los
+    descartes del BufferBudget.
+    """
+    buf = open_capture(pcap)
+    packets = iter_packets(buf)
+    messages = _packet_messages(packets, flt, cancel, ws, tcpjson, progress, len(buf), stats)
+    try:
+        yield from messages
+    finally:
+        # cerrar los generadores suelta sus vistas del mmap
+        messages.close()
+        packets.close()
+        if isinstance(buf, mmap.mmap):
+            try:
+                buf.close()
+            except BufferError:
+                pass  # quedan vistas vivas; lo cerrará el recolector
+
+def _packet_messages(packets, flt, cancel, ws: bool, tcpjson: bool, progress,
+                     total: int, stats=None) -> Iterator[Optional[Dict]]:
+    """
+    Paquetes (epoch, linktype, datos, offset) -> mensajes. Un None en la
+    entrada (seguimiento sin datos nuevos) se reenvía tal cual. Los
+    mensajes y frames a medio llegar comparten un BufferBudget.
+    """
+    from .pcap_parser import WebSocketReassembler, TcpJsonScanner
+
+    budget = BufferBudget()
+    if stats is not None:
+        stats["buffers"] = budget.stats
+    wsr = WebSocketReassembler(budget)
+    tjs = TcpJsonScanner(budget)
+    tcp = TcpReassembler()
+
+    def release():
+        # conexiones cerradas, inactivas o reutilizadas: fuera su estado
+        for old in tcp.released:
+            for h in old.halves.values():
+                budget.discard(h, None)
+            wsr.drop(old.stream)
+            tjs.drop(old.stream)
+        tcp.released.clear()
+
+    check = flt.has_net_filters
+    count = 0
+    offset = 0
+    for item in packets:
+        if item is None:
+            yield None
+            continue
+        ts, linktype, data, offset = item
+        count += 1
+        if ts >= budget.next_expire:
+            budget.expire(ts)
+        if ts >= tcp.next_expire:
+            tcp.expire(ts)
+        if count % CANCEL_CHECK_EVERY == 0:
+            if cancel is not None:
+                cancel.check()
+            if progress is not None:
+                progress(offset, total)
+        pkt = decode_tcp(linktype, data)
+        if pkt is None:
+            continue
+        src, dst, sport, dport, seq, flags, payload = pkt
+        conn = tcp.conn_for(src, dst, sport, dport, flags, ts)
+        if tcp.released:
+            release()
+        # filtro de lectura: se descarta antes de reensamblar
+        if check and not (flt.match_endpoints(src, dst, sport, dport) and flt.match_stream(conn.stream)):
+            continue
+        half, chunks = tcp.push(conn, src, dst, sport, seq, flags, payload)
+        if not chunks:
+            continue
+        if half.lost:
+            # tras un hueco no hay forma de resincronizar frames WS
+            half.lost = False
+            if half.state == "ws":
+                half.state = "drop"
+                budget.discard(half, None)
+            tjs.drop(conn.stream)
+        epoch = repr(ts)
+        for chunk in chunks:
+            if half.state == "probe":
+                if not ws:
+                    half.state = "raw"
+                else:
+                    chunk = _probe(conn, half, chunk)
+                    if chunk is None:
+                        continue
+                    if conn.server is half:
+                        # sólo la respuesta 101 fija extensiones (permessage-deflate) y subprotocolo
+                        wsr.handshake(conn.stream, src, sport, conn.response.get("sec-websocket-extensions", ""),
+                                      conn.response.get("sec-websocket-protocol", ""))
+            if half.state == "ws":
+                fp = half.ws
+                was_pending = bool(fp.pending)
+                for fin, rsv, opcode, frame in fp.feed(chunk):
+                    yield from wsr.feed(epoch, src, dst, sport, dport, conn.stream, str(opcode), str(fin), frame, rsv)
+                if was_pending or fp.pending:
+                    # frame a medio llegar; con 0 se suelta el que acaba de completarse
+                    budget.update(half, None, fp.pending_len if fp.pending else 0, ts)
+            elif half.state == "raw" and tcpjson:
+                yield from tjs.feed(epoch, src, dst, sport, dport, conn.stream, chunk)
+    if cancel is not None:
+        cancel.check()
+    if progress is not None:
+        progress(total or offset, total or offset)
+
+# ------------------------------------------------------------
+# Seguimiento de capturas en curso (dumpcap/tcpdump -w, FIFO, stdin)
+# ------------------------------------------------------------
+FOLLOW_POLL = 0.25      # segundos sin datos antes de reintentar (y de avisar con None)
+READ_CHUNK = 1 << 16
+
+def _follow_chunks(f, follow: bool, cancel, poll: float) -> Iterator[Optional[bytes]]:
+    """
+    Bytes de `f` según llegan; None tras `poll` segundos sin datos nuevos.
+    Un fichero normal se sigue leyendo al llegar al final (crece mientras
+    se captura); una tubería termina cuando el escritor la cierra.
+    """
+    fd = f.fileno()
+    regular = stat.S_ISREG(os.fstat(fd).st_mode)
+    # select() sobre tuberías no existe en Windows: ahí la lectura bloquea
+    selectable = not regular and os.name != "nt"
+    while True:
+        if cancel is not None:
+            cancel.check()
+        if selectable and not select.select([fd], [], [], poll)[0]:
+            yield None
+            continue
+        data = os.read(fd, READ_CHUNK)
+        if data:
+            if selectable and not os.get_blocking(fd):
+                os.set_blocking(fd, True)   # FIFO abierta sin escritor (_open_follow)
+            yield data
+        elif regular and follow:
+            yield None
+            time.sleep(poll)
+        else:
+            return
+
+def follow_packets(f, follow: bool = True, cancel=None,
+                   poll: float = FOLLOW_POLL) -> Iterator[Optional[Tuple[float, int, bytes, int]]]:
+    """Paquetes de una captura que llega por partes; None cuando no hay datos nuevos."""
+    stream = CaptureStream()
+    for data in _follow_chunks(f, follow, cancel, poll):
+        if data is None:
+            yield None
+        else:
+            yield from stream.feed(data)
+    if stream.buf:
+        raise CaptureFormatError(f"Captura truncada: {len(stream.buf)} bytes sin completar al final")
+
+def _open_follow(source: str):
+    """
+    Abre la fuente del seguimiento. Una FIFO se abre con O_NONBLOCK: open()
+    normal espera a que aparezca un escritor y no se puede cancelar; así la
+    espera queda en el select() de _follow_chunks, que comprueba `cancel`.
+    """
+    if source == "-":
+        return sys.stdin.buffer
+    if os.name != "nt" and stat.S_ISFIFO(os.stat(source).st_mode):
+        return open(os.open(source, os.O_RDONLY | os.O_NONBLOCK), "rb", buffering=0)
+    return open(source, "rb", buffering=0)
+
+def follow_messages(source: str, flt, cancel=None, ws: bool = True, tcpjson: bool = True,
+                    poll: float = FOLLOW_POLL, progress=None, stats=None) -> Iterator[Optional[Dict]]:
+    """
+    Mensajes de una captura en curso: fichero pcap/pcapng que crece, FIFO
+    o '-' (stdin). Sigue hasta que se cancela (o se cierra la tubería) y
+    produce None cada `poll` segundos sin datos, para que quien consume
+    pueda vaciar lo acumulado. `progress(bytes leídos, 0)`.
+    """
+    f = _open_follow(source)
+    messages = _packet_messages(follow_packets(f, True, cancel, poll), flt, cancel, ws, tcpjson, progress, 0, stats)
+    try:
+        yield from messages
+    finally:
+        messages.close()
+        if f is not sys.stdin.buffer:
+            f.close()
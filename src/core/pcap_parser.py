@@ -1,30 +1,20 @@
 
 # -*- coding: utf-8 -*-
-import os, subprocess, tempfile, re, json
-from typing import List, Dict, Optional
-from .utils import hex_to_bytes, maybe_inflate, largest_json_in_text
-from .wamp_parser import parse_wamp_array
+import os, io
+import datetime as _dt
+from typing import List, Dict, Optional, Iterator, Tuple, Callable
+from .filters import Filters, Cancelled, CancelToken, _kill  # noqa: F401  (reexportados)
+from .utils import hex_to_bytes, largest_json_in_text, JsonFramer, ws_unmask
+from .jsoncodec import loads
+from .ws_deflate import DeflateStreams, MessageTooLarge, RSV1
+from .wamp_parser import WampSessions
+from .record import Record
+from .reassembly import BufferBudget
+from .wamp_serializers import DEFAULT_PROTOCOL, parse_subprotocol, unpack_binary, dumps, split_json_batch
 
 TSHARK = os.environ.get("TSHARK", "tshark")
 
-class Filters:
-    def __init__(self, src_ip="", dst_ip="", src_port="", dst_port="", mode="AUTO"):
-        self.src_ip = src_ip.strip()
-        self.dst_ip = dst_ip.strip()
-        self.src_port = src_port.strip()
-        self.dst_port = dst_port.strip()
-        self.mode = mode.upper()  # AUTO | WAMP | TCPJSON
-
-    def to_display(self):
-        return f"src={self.src_ip or '*'} dst={self.dst_ip or '*'} sport={self.src_port or '*'} dport={self.dst_port or '*'} mode={self.mode}"
-
-def _ip_ok(ip: str, want: str) -> bool:
-    return (not want) or ip == want
-
-def _port_ok(port: str, want: str) -> bool:
-    return (not want) or port == want
-
-def run_tshark_fields(pcap: str, fields: List[str], display_filter: str) -> List[str]:
+def _tshark_cmd(pcap: str, fields: List[str], display_filter: str) -> List[str]:
     cmd = [
         TSHARK, "-r", pcap,
         "-o", "tcp.desegment_tcp_streams:true",
@@ -34,147 +24,394 @@ def run_tshark_fields(pcap: str, fields: List[str], display_filter: str) -> List
         cmd += ["-e", f]
     if display_filter:
         cmd += ["-Y", display_filter]
-    out = subprocess.check_output(cmd, stderr=subprocess.STDOUT)
-    return out.decode("utf-8", errors="ignore").splitlines()
-
-def extract_websocket_messages(pcap: str, flt: Filters) -> List[Dict]:
-    # Extraemos frames WS text/continuations
-    fields = [
-        "frame.time_epoch","ip.src","ip.dst","tcp.stream",
-        "websocket.opcode","websocket.fin","websocket.mask","websocket.masking_key",
-        "websocket.payload"
-    ]
-    df = "websocket && (websocket.opcode==1 || websocket.opcode==0)"
-    rows = run_tshark_fields(pcap, fields, df)
-    # Reensamblado por stream/opcode+fin
-    buffers = {}
-    messages = []
+    return cmd
 
-    for line in rows:
-        cols = line.split("\t")
-        if len(cols) < len(fields):
-            continue
-        epoch, src, dst, stream, opcode, fin, mask, mkey, payload_hex = cols
-        if not _ip_ok(src, flt.src_ip) or not _ip_ok(dst, flt.dst_ip):
-            continue
-        # convert payload
-        payload = b""
+# Tamaño del buffer de la tubería: acota la memoria independientemente del PCAP
+PIPE_BUFSIZE = 1 << 16
+
+def iter_tshark_fields(pcap: str, fields: List[str], display_filter: str,
+                       cancel: Optional[CancelToken] = None) -> Iterator[str]:
+    """
+    Lanza tshark y devuelve sus líneas de salida a medida que llegan
+    (memoria constante). Si se cancela o el consumidor abandona el
+    generador, el proceso hijo se mata.
+    """
+    # subprocess/tempfile sólo hacen falta con tshark (no en el arranque de la GUI)
+    import subprocess, tempfile
+    cmd = _tshark_cmd(pcap, fields, display_filter)
+    # stderr a fichero temporal: una tubería sin leer podría bloquear a tshark
+    with tempfile.TemporaryFile() as err:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=err, bufsize=PIPE_BUFSIZE)
+        if cancel is not None:
+            cancel.register(proc)
         try:
-            payload = hex_to_bytes(payload_hex)
-        except Exception:
-            payload = b""
-        # mask
-        if mask == "1" and mkey:
-            k = bytes.fromhex(mkey.replace(":",""))
-            payload = bytes(b ^ k[i % 4] for i, b in enumerate(payload))
-        # acumula
-        buf = buffers.setdefault(stream, bytearray())
-        if opcode == "1":
-            buf.clear()
-        if opcode in ("1","0"):
-            buf.extend(payload)
-        if fin == "1" and (opcode in ("1","0")):
-            data = bytes(buf)
-            data = maybe_inflate(data)
-            text = data.decode("utf-8", errors="ignore")
-            # puede ser array WAMP o JSON directo
-            json_text = text.strip()
-            try:
-                msg_type, topic, args, kwargs = parse_wamp_array(json_text)
-            except Exception:
-                # intentar mayor JSON
-                j = largest_json_in_text(text)
-                msg_type, topic, args, kwargs = ("WAMP", "", [], {})
-                if j:
-                    try:
-                        kwargs = json.loads(j)
-                    except Exception:
-                        kwargs = {"raw_text": j}
-            messages.append({
-                "time": "", "ms": "", "epoch": float(epoch),
-                "stream": stream, "src": src, "dst": dst,
-                "opcode": msg_type, "topic": topic, "type": _root_key(kwargs),
-                "args": args, "kwargs": kwargs, "raw": json_text
-            })
-            buf.clear()
-    return messages
+            out = io.TextIOWrapper(proc.stdout, encoding="utf-8", errors="ignore", newline="\n")
+            for line in out:
+                if cancel is not None:
+                    cancel.check()
+                yield line.rstrip("\r\n")
+            if cancel is not None:
+                cancel.check()
+            rc = proc.wait()
+            if rc != 0:
+                err.seek(0)
+                raise subprocess.CalledProcessError(rc, cmd, output=err.read())
+        finally:
+            _kill(proc)
+            proc.wait()
+            proc.stdout.close()
+            if cancel is not None:
+                cancel.unregister(proc)
+
+_TSHARK_VERSION: Optional[Tuple[int, ...]] = None
+
+def tshark_version() -> Tuple[int, ...]:
+    """Versión de tshark ((4, 2, 2)…), () si no está instalado. Se consulta una vez por proceso."""
+    global _TSHARK_VERSION
+    if _TSHARK_VERSION is None:
+        import re, subprocess
+        try:
+            out = subprocess.run([TSHARK, "-v"], capture_output=True, text=True, timeout=30).stdout
+            m = re.search(r"(\d+)\.(\d+)\.(\d+)", out)
+            _TSHARK_VERSION = tuple(map(int, m.groups())) if m else ()
+        except (OSError, subprocess.SubprocessError):
+            _TSHARK_VERSION = ()
+    return _TSHARK_VERSION
+
+def run_tshark_fields(pcap: str, fields: List[str], display_filter: str) -> List[str]:
+    return list(iter_tshark_fields(pcap, fields, display_filter))
 
 def _root_key(d: Dict) -> str:
     if isinstance(d, dict) and d:
         return next(iter(d.keys()))
     return ""
 
-def extract_tcpjson_messages(pcap: str, flt: Filters) -> List[Dict]:
-    # Campos TCP (usamos payload para reensamblar nosotros por stream)
-    fields = [
-        "frame.time_epoch","ip.src","ip.dst","tcp.stream","tcp.payload"
-    ]
-    rows = run_tshark_fields(pcap, fields, "tcp")
-    buffers: Dict[str, bytearray] = {}
-    times: Dict[str, float] = {}
-    msgs: List[Dict] = []
+class WebSocketReassembler:
+    """
+    Reensambla frames WS text/binary/continuation por stream y sentido y
+    emite mensajes completos. Los mensajes con RSV1 en su primer frame se
+    descomprimen con permessage-deflate (contexto por sentido); los
+    binarios se decodifican con el serializador WAMP negociado (msgpack o
+    CBOR) y las variantes .batched dan varios registros por mensaje.
+    Los fragmentos pendientes cuentan en `budget`; si se descartan, el
+    resto de ese mensaje se ignora hasta su FIN.
+    """
+    def __init__(self, budget: Optional[BufferBudget] = None):
+        # fragmentos pendientes por (stream, ip, puerto) emisor; se unen una sola vez al llegar FIN
+        self.fragments: Dict[Tuple[str, str, int], List[bytes]] = {}
+        self.pending_bytes: Dict[Tuple[str, str, int], int] = {}
+        # mensajes cuyos fragmentos se descartaron: se saltan sus continuaciones
+        self.skipping: set = set()
+        self.budget = budget if budget is not None else BufferBudget()
+        # (binario, comprimido) del primer frame de cada mensaje fragmentado en curso
+        self.kinds: Dict[Tuple[str, str, int], Tuple[bool, bool]] = {}
+        # lo descomprimido de cada mensaje tiene el mismo tope que un búfer de stream
+        self.deflate = DeflateStreams(self.budget.stream_bytes)
+        # subprotocolo WAMP por stream: (serializador, batched)
+        self.protocols: Dict[str, Tuple[str, bool]] = {}
+        # mapas WAMP por sesión (subscription -> topic, petición -> procedure…)
+        self.wamp = WampSessions()
 
-    for line in rows:
-        cols = line.split("\t")
-        if len(cols) < 5: 
-            continue
-        epoch, src, dst, stream, payload_hex = cols
-        if not (_ip_ok(src, flt.src_ip) and _ip_ok(dst, flt.dst_ip)):
-            continue
+    def handshake(self, stream: str, server_ip: str, server_port: int, extensions: str, protocol: str = ""):
+        """Respuesta 101 vista: extensiones (Sec-WebSocket-Extensions) y subprotocolo negociados."""
+        self.deflate.handshake(stream, server_ip, server_port, extensions)
+        self.protocols[stream] = parse_subprotocol(protocol)
+
+    def feed(self, epoch: str, src: str, dst: str, sport: int, dport: int, stream: str,
+             opcode: str, fin: str, payload: bytes, rsv: int = 0) -> List[Dict]:
+        if opcode not in ("1", "2", "0"):
+            return []
+        key = (stream, src, sport)
+        if opcode != "0":
+            kind = (opcode == "2", bool(rsv & RSV1))
+            if self.skipping:
+                self.skipping.discard(key)
+            if fin == "1":
+                # caso habitual: mensaje en un solo frame, sin copias
+                if self.fragments.pop(key, None) is not None:
+                    self.kinds.pop(key, None)
+                    self._release(key)
+                return self._message(epoch, src, dst, sport, dport, stream, payload, *kind)
+            self.fragments[key] = [payload]
+            self.kinds[key] = kind
+            self.pending_bytes[key] = len(payload)
+            self.budget.update(self, key, len(payload), float(epoch))
+            return []
+        if key in self.skipping:
+            if fin == "1":
+                self.skipping.discard(key)
+            return []
+        parts = self.fragments.get(key)
+        if parts is None:
+            parts = self.fragments[key] = []
+        parts.append(payload)
+        if fin != "1":
+            size = self.pending_bytes[key] = self.pending_bytes.get(key, 0) + len(payload)
+            self.budget.update(self, key, size, float(epoch))
+            return []
+        del self.fragments[key]
+        self._release(key)
+        binary, deflated = self.kinds.pop(key, (False, False))
+        return self._message(epoch, src, dst, sport, dport, stream, b"".join(parts), binary, deflated)
+
+    def _release(self, key: Tuple[str, str, int]):
+        if self.pending_bytes.pop(key, None) is not None:
+            self.budget.discard(self, key)
+
+    def evict(self, key: Tuple[str, str, int]):
+        """Lo llama el BufferBudget: se pierde el mensaje fragmentado en curso."""
+        self.fragments.pop(key, None)
+        self.kinds.pop(key, None)
+        self.pending_bytes.pop(key, None)
+        self.skipping.add(key)
+
+    def _message(self, epoch: str, src: str, dst: str, sport: int, dport: int, stream: str,
+                 data: bytes, binary: bool = False, deflated: bool = False) -> List[Dict]:
+        if deflated:
+            try:
+                inflated = self.deflate.inflate(stream, src, sport, data)
+            except MessageTooLarge as e:
+                self.budget.drop(e.size)
+                return []
+            if inflated is not None:
+                data = inflated
+        serializer, batched = self.protocols.get(stream, DEFAULT_PROTOCOL)
+        head = (float(epoch), stream, src, dst, sport, dport)
+        if binary:
+            try:
+                used, objs = unpack_binary(serializer, batched, data)
+            except ValueError:
+                return []
+            out = []
+            for obj in objs:
+                rec = _ws_record(head, self.wamp.decode_obj(stream, obj), dumps(obj))
+                rec["proto"] = used
+                out.append(rec)
+            return out
+        text = data.decode("utf-8", errors="ignore")
+        if batched:
+            return [self._text_record(head, part) for part in split_json_batch(text)]
+        return [self._text_record(head, text)]
+
+    def _text_record(self, head: tuple, text: str) -> Dict:
+        # puede ser array WAMP o JSON directo
+        json_text = text.strip()
         try:
-            data = hex_to_bytes(payload_hex)
+            decoded = self.wamp.decode(head[1], json_text)
         except Exception:
-            data = b""
-        if not data:
-            continue
-        buf = buffers.setdefault(stream, bytearray())
-        buf.extend(data)
-        if stream not in times:
-            times[stream] = float(epoch)
-
-        # Buscar JSON en el buffer
-        text = buf.decode("utf-8", errors="ignore")
-        while True:
+            # intentar mayor JSON
             j = largest_json_in_text(text)
-            if not j:
-                break
-            # Emitir y recortar desde el final del JSON
-            end_idx = text.find(j) + len(j)
-            remaining = text[end_idx:]
-            # actualizar buffer con lo no consumido
-            buf[:] = remaining.encode("utf-8", errors="ignore")
-            # construir record
+            kwargs = {}
+            if j:
+                try:
+                    kwargs = loads(j)
+                except Exception:
+                    kwargs = {"raw_text": j}
+            decoded = ("WAMP", "", [], kwargs, None)
+        return _ws_record(head, decoded, json_text)
+
+    def drop(self, stream: str):
+        for key in [k for k in self.fragments if k[0] == stream]:
+            del self.fragments[key]
+            self.kinds.pop(key, None)
+            self._release(key)
+        self.skipping = {k for k in self.skipping if k[0] != stream}
+        self.deflate.drop(stream)
+        self.protocols.pop(stream, None)
+        self.wamp.drop(stream)
+
+def _ws_record(head: tuple, decoded: tuple, raw: str) -> Record:
+    # args/kwargs no se guardan: Record los vuelve a sacar de raw al pedirlos
+    epoch, stream, src, dst, sport, dport = head
+    msg_type, topic, args, kwargs, extra = decoded
+    return Record(epoch, stream, src, dst, sport, dport, msg_type, topic, _root_key(kwargs), raw, extra)
+
+class TcpJsonScanner:
+    """
+    Delimita objetos JSON en el payload TCP de cada stream con un
+    JsonFramer incremental (coste lineal en bytes recibidos). El objeto
+    en curso de cada stream cuenta en `budget`.
+
+    Emite todos los objetos de nivel superior en orden, también los que
+    van dentro de un array JSON (el framer sólo sigue llaves), salvo los
+    '{}' vacíos. La búsqueda anterior (largest_json_in_text sobre el
+    búfer) emitía sólo el mayor objeto de lo recibido hasta cada paquete
+    y descartaba los anteriores a él, así que el resultado dependía de
+    cómo se partiera el stream en paquetes; sí emitía '{}' cuando era el
+    único objeto.
+    """
+    def __init__(self, budget: Optional[BufferBudget] = None):
+        self.framers: Dict[str, JsonFramer] = {}
+        self.starts: Dict[str, float] = {}   # epoch del paquete donde empezó el objeto en curso
+        self.budget = budget if budget is not None else BufferBudget()
+
+    def feed(self, epoch: str, src: str, dst: str, sport: int, dport: int, stream: str, data: bytes) -> List[Dict]:
+        msgs: List[Dict] = []
+        if not data:
+            return msgs
+        fr = self.framers.get(stream)
+        if fr is None:
+            fr = self.framers[stream] = JsonFramer()
+        now = float(epoch)
+        was_pending = fr.pending
+        first_epoch = self.starts.get(stream, now) if was_pending else now
+        emitted = fr.feed(data)
+        for i, obj in enumerate(emitted):
+            j = obj.decode("utf-8", errors="ignore")
             kwargs = {}
             try:
-                kwargs = json.loads(j)
+                kwargs = loads(j)
             except Exception:
                 kwargs = {"raw_text": j}
-            epoch0 = times.get(stream, float(epoch))
-            msgs.append({
-                "time": "", "ms": "", "epoch": epoch0,
-                "stream": stream, "src": src, "dst": dst,
-                "opcode": "TCPJSON", "topic": "", "type": _root_key(kwargs),
-                "args": [], "kwargs": kwargs, "raw": j
-            })
-            text = remaining
-    return msgs
+            if not kwargs:
+                # '{}' sueltos (p.ej. Options/Details de un array WAMP) no aportan nada
+                continue
+            msgs.append(Record(first_epoch if i == 0 else now, stream, src, dst, sport, dport,
+                               "TCPJSON", "", _root_key(kwargs), j))
+        if fr.pending:
+            self.starts[stream] = first_epoch if not emitted else now
+        if was_pending or fr.pending:
+            # al final: el presupuesto puede descartar este mismo framer
+            self.budget.update(self, stream, len(fr.buf), now)
+        return msgs
+
+    def evict(self, stream: str):
+        """Lo llama el BufferBudget: se pierde el objeto en curso; se sigue por la siguiente '{'."""
+        self.framers.pop(stream, None)
+        self.starts.pop(stream, None)
+
+    def drop(self, stream: str):
+        self.framers.pop(stream, None)
+        self.starts.pop(stream, None)
+        self.budget.discard(self, stream)
+
+# Unión de campos: una única pasada de tshark alimenta ambos reensambladores
+FIELDS = [
+    "frame.time_epoch","ip.src","ip.dst","ipv6.src","ipv6.dst",
+    "tcp.srcport","tcp.dstport","tcp.stream",
+    "websocket.opcode","websocket.fin","websocket.mask","websocket.masking_key",
+    "websocket.payload","tcp.payload",
+    "websocket.rsv","http.response.code","http.sec_websocket_extensions",
+    "http.sec_websocket_protocol"
+]
+
+# la respuesta 101 trae las extensiones negociadas (permessage-deflate)
+WS_FILTER = ("(websocket && (websocket.opcode==1 || websocket.opcode==2 || websocket.opcode==0))"
+             " || http.response.code==101")
+
+def _int(v: str) -> int:
+    try:
+        return int(v)
+    except ValueError:
+        return 0
+
+def _rsv(v: str) -> int:
+    """websocket.rsv de tshark ('4', '0x4'…) -> bits RSV1..3 (RSV1 = 4)."""
+    v = v.split(",", 1)[0].strip()
+    if not v:
+        return 0
+    try:
+        return int(v, 0)
+    except ValueError:
+        return 0
+
+# cada cuántas filas/paquetes se llama a progress(hecho, total)
+PROGRESS_EVERY = 4096
+# cada cuántas filas de tshark se caducan los búferes de reensamblado inactivos
+EXPIRE_EVERY = 256
+
+def iter_messages(pcap: str, flt: Filters, cancel: Optional[CancelToken] = None,
+                  ws: bool = True, tcpjson: bool = True,
+                  progress: Optional[Callable[[int, int], None]] = None,
+                  stats: Optional[Dict] = None) -> Iterator[Dict]:
+    """
+    Una sola pasada de tshark (o del lector nativo si backend=NATIVE). Cada fila
+    va al reensamblador WebSocket (si trae campos websocket) o al escáner
+    TCP-JSON. En AUTO, un stream en el que ya se ha visto WebSocket deja de
+    alimentar al escáner TCP-JSON. Los filtros de red van dentro del -Y,
+    así que tshark descarta el tráfico irrelevante antes de volcarlo.
+    Los mensajes salen en orden de llegada, sin time/ms formateados.
+    `progress(hecho, total)` recibe bytes (nativo) o filas con total=0 (tshark).
+    Los mensajes a medio reensamblar comparten un BufferBudget; sus
+    descartes quedan en `stats["buffers"]` (se actualiza en vivo).
+    """
+    if flt.backend == "NATIVE":
+        from .pcap_native import iter_messages as native_iter_messages
+        yield from native_iter_messages(pcap, flt, cancel, ws=ws, tcpjson=tcpjson, progress=progress, stats=stats)
+        return
+    if flt.shard is not None and tshark_version() < (4, 0):
+        # el reparto usa aritmética en el display filter (tcp.stream % n)
+        raise ValueError("Repartir la captura por TCP stream con tshark requiere tshark >= 4.0; "
+                         "usa el motor NATIVE o un solo proceso")
+    display_filter = flt.display_filter("tcp" if tcpjson else WS_FILTER)
+    budget = BufferBudget()
+    if stats is not None:
+        stats["buffers"] = budget.stats
+    wsr = WebSocketReassembler(budget)
+    tjs = TcpJsonScanner(budget)
+    ws_streams = set()
+
+    for n, line in enumerate(iter_tshark_fields(pcap, FIELDS, display_filter, cancel), 1):
+        if progress is not None and n % PROGRESS_EVERY == 0:
+            progress(n, 0)
+        cols = line.split("\t")
+        if len(cols) < len(FIELDS):
+            continue
+        (epoch, src, dst, src6, dst6, sport, dport, stream,
+         opcode, fin, mask, mkey, ws_hex, tcp_hex, rsv, http_code, extensions, subprotocol) = cols
+        if n % EXPIRE_EVERY == 0 and budget and float(epoch) >= budget.next_expire:
+            # búferes inactivos: basta con mirarlo de vez en cuando
+            budget.expire(float(epoch))
+        src = src or src6
+        dst = dst or dst6
+        sport, dport = _int(sport), _int(dport)
+        if ws and http_code == "101":
+            wsr.handshake(stream, src, sport, extensions, subprotocol)
+        if ws and opcode:
+            if stream not in ws_streams:
+                ws_streams.add(stream)
+                tjs.drop(stream)
+            try:
+                payload = hex_to_bytes(ws_hex)
+            except Exception:
+                payload = b""
+            if mask == "1" and mkey:
+                payload = ws_unmask(payload, bytes.fromhex(mkey.replace(":","")))
+            yield from wsr.feed(epoch, src, dst, sport, dport, stream, opcode, fin, payload, _rsv(rsv))
+        elif tcpjson and stream not in ws_streams:
+            try:
+                data = hex_to_bytes(tcp_hex)
+            except Exception:
+                data = b""
+            yield from tjs.feed(epoch, src, dst, sport, dport, stream, data)
+
+def extract_websocket_messages(pcap: str, flt: Filters, cancel: Optional[CancelToken] = None) -> List[Dict]:
+    return list(iter_messages(pcap, flt, cancel, ws=True, tcpjson=False))
+
+def extract_tcpjson_messages(pcap: str, flt: Filters, cancel: Optional[CancelToken] = None) -> List[Dict]:
+    return list(iter_messages(pcap, flt, cancel, ws=False, tcpjson=True))
+
+def finalize_message(m: Dict) -> Dict:
+    """Agrega time/ms formateados a partir de epoch y normaliza type."""
+    if isinstance(m, Record):
+        return m  # time/ms se derivan de epoch; type ya sale de kwargs al crearlo
+    t = _dt.datetime.utcfromtimestamp(float(m["epoch"]))
+    m["time"] = t.strftime("%H:%M:%S")
+    m["ms"] = f"{t.microsecond:06d}"
+    # normaliza type si viene algo como MsgEP ya detectado en opcode
+    if not m.get("type") and isinstance(m.get("kwargs"), dict):
+        m["type"] = _root_key(m["kwargs"])
+    return m
+
+def mode_flags(flt: Filters) -> Dict[str, bool]:
+    return {"ws": flt.mode in ("AUTO","WAMP"), "tcpjson": flt.mode in ("AUTO","TCPJSON")}
 
-def extract_messages(pcap: str, flt: Filters) -> List[Dict]:
-    mode = flt.mode
-    msgs: List[Dict] = []
-    if mode in ("AUTO","WAMP"):
-        msgs.extend(extract_websocket_messages(pcap, flt))
-    if mode in ("AUTO","TCPJSON"):
-        msgs.extend(extract_tcpjson_messages(pcap, flt))
+def extract_messages(pcap: str, flt: Filters, cancel: Optional[CancelToken] = None,
+                     stats: Optional[Dict] = None) -> List[Dict]:
+    msgs = list(iter_messages(pcap, flt, cancel, stats=stats, **mode_flags(flt)))
 
     # Ordena por epoch y agrega time/ms formateados
     msgs.sort(key=lambda r: r.get("epoch", 0.0))
     for m in msgs:
-        import datetime as _dt
-        t = _dt.datetime.utcfromtimestamp(float(m["epoch"]))
-        m["time"] = t.strftime("%H:%M:%S")
-        m["ms"] = f"{t.microsecond:06d}"
-        # normaliza type si viene algo como MsgEP ya detectado en opcode
-        if not m.get("type") and isinstance(m.get("kwargs"), dict):
-            m["type"] = _root_key(m["kwargs"])
+        finalize_message(m)
     return msgs
@@ -1,7 +1,128 @@
 
 # -*- coding: utf-8 -*-
-from typing import List, Dict
-from .pcap_parser import Filters, extract_messages
+import heapq, multiprocessing, os, shutil, tempfile, time
+from typing import List, Dict, Optional, Tuple, Iterator, Callable
+from .pcap_parser import (Filters, CancelToken, Cancelled, extract_messages, iter_messages,
+                          finalize_message, mode_flags)
+from .reassembly import merge_stats
 
-def process_pcap_to_records(pcap_path: str, filters: Filters) -> List[Dict]:
-    return extract_messages(pcap_path, filters)
+def _extract_shard(pcap_path: str, filters: Filters, k: int, n: int) -> Tuple[int, List[Dict], float, Dict]:
+    t0 = time.perf_counter()
+    st: Dict = {}
+    msgs = extract_messages(pcap_path, filters.with_shard(k, n), stats=st)
+    return k, msgs, time.perf_counter() - t0, st["buffers"]
+
+def _spool_shard(pcap_path: str, filters: Filters, k: int, n: int, spool_path: str) -> Tuple[int, int, float, Dict]:
+    """Como _extract_shard, pero vuelca los registros a disco según salen (orden de llegada)."""
+    from ..io.spool import SpoolWriter
+    t0 = time.perf_counter()
+    st: Dict = {}
+    flt = filters.with_shard(k, n)
+    with SpoolWriter(spool_path) as w:
+        for m in iter_messages(pcap_path, flt, stats=st, **mode_flags(flt)):
+            w.write(finalize_message(m))
+        count = w.count
+    return k, count, time.perf_counter() - t0, st["buffers"]
+
+def _run_shards(func: Callable, args: List[Tuple], cancel: Optional[CancelToken]) -> List[Tuple]:
+    """Un proceso por shard; espera a todos y devuelve los resultados ordenados por shard."""
+    pool = multiprocessing.get_context("spawn").Pool(len(args))
+    try:
+        pending = [pool.apply_async(func, a) for a in args]
+        results = []
+        for res in pending:
+            while not res.ready():
+                if cancel is not None and cancel.cancelled:
+                    raise Cancelled()
+                res.wait(0.2)
+            results.append(res.get())
+        pool.close()
+    finally:
+        # los shards son del lector nativo: terminate no deja procesos hijos sueltos
+        pool.terminate()
+        pool.join()
+    results.sort(key=lambda r: r[0])
+    return results
+
+def shard_count(filters: Filters) -> int:
+    """
+    Procesos en los que se reparte una captura. Sólo con el lector nativo:
+    con tshark cada shard tendría que disecar y reensamblar la captura
+    entera para quedarse con sus streams (n veces el trabajo, casi sin
+    ganar tiempo), así que se usa un único tshark.
+    """
+    return filters.workers if filters.backend == "NATIVE" else 1
+
+def process_pcap_to_records(pcap_path: str, filters: Filters, cancel: Optional[CancelToken] = None,
+                            stats: Optional[Dict] = None) -> List[Dict]:
+    """
+    Extrae los mensajes del PCAP. Con shard_count(filters) > 1 reparte la
+    captura en shards por TCP stream (id % n), los procesa en un pool de
+    procesos y mezcla los resultados por epoch. Como un stream nunca se
+    parte entre shards, los mensajes fragmentados se reensamblan igual
+    que en modo secuencial. Si se pasa `stats`, se rellena con los
+    tiempos por shard y los descartes de búferes de reensamblado.
+    """
+    n = shard_count(filters)
+    t0 = time.perf_counter()
+    if n <= 1:
+        msgs = extract_messages(pcap_path, filters, cancel, stats)
+        if stats is not None:
+            stats["shards"] = [{"shard": 0, "messages": len(msgs), "seconds": time.perf_counter() - t0}]
+            stats["seconds"] = time.perf_counter() - t0
+        return msgs
+
+    results = _run_shards(_extract_shard, [(pcap_path, filters, k, n) for k in range(n)], cancel)
+    if stats is not None:
+        stats["shards"] = [{"shard": k, "messages": len(m), "seconds": secs} for k, m, secs, _ in results]
+        stats["buffers"] = merge_stats([b for _, _, _, b in results])
+    merged = list(heapq.merge(*(m for _, m, _, _ in results), key=lambda r: r.get("epoch", 0.0)))
+    if stats is not None:
+        stats["seconds"] = time.perf_counter() - t0
+    return merged
+
+def iter_pcap_records(pcap_path: str, filters: Filters, cancel: Optional[CancelToken] = None,
+                      progress: Optional[Callable[[int, int], None]] = None,
+                      stats: Optional[Dict] = None) -> Iterator[Dict]:
+    """
+    Versión incremental: produce registros ya formateados a medida que se
+    extraen (orden de llegada, casi siempre creciente en epoch). En modo
+    paralelo cada shard vuelca sus registros a un fichero temporal y, al
+    terminar todos, se mezclan por epoch leyéndolos de disco, así que la
+    memoria tampoco crece con el tamaño de la captura.
+    """
+    if shard_count(filters) > 1:
+        yield from _iter_shards(pcap_path, filters, cancel, stats)
+        return
+    for m in iter_messages(pcap_path, filters, cancel, progress=progress, stats=stats, **mode_flags(filters)):
+        yield finalize_message(m)
+
+def _iter_shards(pcap_path: str, filters: Filters, cancel: Optional[CancelToken],
+                 stats: Optional[Dict]) -> Iterator[Dict]:
+    from ..io.spool import read_part
+    n = shard_count(filters)
+    t0 = time.perf_counter()
+    tmp = tempfile.mkdtemp(prefix="wamp_extractor_shards_")
+    try:
+        paths = [os.path.join(tmp, f"{k}.spool") for k in range(n)]
+        results = _run_shards(_spool_shard, [(pcap_path, filters, k, n, paths[k]) for k in range(n)], cancel)
+        if stats is not None:
+            stats["shards"] = [{"shard": k, "messages": count, "seconds": secs} for k, count, secs, _ in results]
+            stats["buffers"] = merge_stats([b for _, _, _, b in results])
+        yield from heapq.merge(*map(read_part, paths), key=lambda r: r.get("epoch", 0.0))
+        if stats is not None:
+            stats["seconds"] = time.perf_counter() - t0
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def follow_records(source: str, filters: Filters, cancel: Optional[CancelToken] = None,
+                   progress: Optional[Callable[[int, int], None]] = None,
+                   stats: Optional[Dict] = None) -> Iterator[Optional[Dict]]:
+    """
+    Registros de una captura en curso (fichero que crece, FIFO o '-'),
+    siempre con el lector nativo y en un solo proceso: tshark no sigue
+    ficheros que crecen. Produce None cuando no llegan datos nuevos.
+    """
+    from .pcap_native import follow_messages
+    for m in follow_messages(source, filters, cancel, progress=progress, stats=stats, **mode_flags(filters)):
+        yield m if m is None else finalize_message(m)
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Presupuesto de memoria de los búferes de reensamblado.
+
+Los mensajes a medio llegar se guardan por stream (objeto JSON abierto en
+TcpJsonScanner, fragmentos WebSocket sin FIN, frame WS incompleto en el
+lector nativo). Un stream que nunca completa su mensaje (binario con una
+'{' suelta, captura cortada, TCP no JSON en AUTO) crecería sin límite, así
+que cada dueño de búfer informa a un BufferBudget del tamaño tras cada
+entrada y éste descarta:
+
+  - el búfer que supera el tope por stream (STREAM_MAX_BYTES),
+  - los que llevan IDLE_SECONDS de captura (epoch) sin recibir nada,
+  - los menos usados recientemente mientras el total supere TOTAL_MAX_BYTES.
+
+Descartar un búfer pierde sólo ese mensaje en curso; el dueño decide cómo
+seguir (ver los métodos evict()). Los recuentos quedan en `stats` y se
+muestran en la barra de estado, el log de la CLI y la hoja Resumen.
+"""
+import os
+from collections import OrderedDict
+from typing import Dict, List
+
+# límites por defecto; se cambian con variables de entorno (MB y segundos)
+TOTAL_MAX_BYTES = int(os.environ.get("WAMP_EXTRACTOR_REASSEMBLY_MB", "512")) * (1 << 20)
+STREAM_MAX_BYTES = int(os.environ.get("WAMP_EXTRACTOR_STREAM_MB", "64")) * (1 << 20)
+IDLE_SECONDS = float(os.environ.get("WAMP_EXTRACTOR_IDLE_SECONDS", "300"))
+
+# motivos de descarte -> clave en stats
+REASONS = {"cap": "evicted_cap", "budget": "evicted_budget", "idle": "evicted_idle"}
+LABELS = {"evicted_cap": "tope por stream", "evicted_budget": "presupuesto global",
+          "evicted_idle": "inactivos"}
+
+
+def empty_stats() -> Dict[str, int]:
+    return {"evicted_cap": 0, "evicted_budget": 0, "evicted_idle": 0, "dropped_bytes": 0, "peak_bytes": 0}
+
+
+class BufferBudget:
+    """
+    Contabilidad compartida de los búferes de un reensamblado. Cada búfer
+    se identifica por (dueño, clave); el dueño implementa evict(clave).
+    El orden LRU es el de la última actualización, que con epochs
+    crecientes es también el de inactividad: caducar mira sólo el primero.
+    """
+
+    def __init__(self, total_bytes: int = TOTAL_MAX_BYTES, stream_bytes: int = STREAM_MAX_BYTES,
+                 idle_seconds: float = IDLE_SECONDS):
+        self.total_bytes = total_bytes
+        self.stream_bytes = min(stream_bytes, total_bytes)
+        self.idle_seconds = idle_seconds
+        # (dueño, clave) -> [bytes, epoch de la última entrada]
+        self._lru: "OrderedDict[tuple, List]" = OrderedDict()
+        self.used = 0
+        # epoch antes del cual no puede caducar nada (el más antiguo + idle_seconds);
+        # los bucles de paquetes llaman a expire() al pasarlo
+        self.next_expire = float("inf")
+        # contadores en vivo (la GUI los lee durante el seguimiento)
+        self.stats = empty_stats()
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def update(self, owner, key, size: int, epoch: float) -> None:
+        """Tamaño del búfer `key` de `owner` tras alimentarlo con datos de `epoch` (0 = vacío)."""
+        k = (owner, key)
+        lru = self._lru
+        ent = lru.get(k)
+        if ent is not None:
+            self.used -= ent[0]
+            if size <= 0:
+                del lru[k]
+            else:
+                ent[0] = size
+                ent[1] = epoch
+                lru.move_to_end(k)
+        elif size > 0:
+            lru[k] = [size, epoch]
+            if epoch + self.idle_seconds < self.next_expire:
+                self.next_expire = epoch + self.idle_seconds
+        elif not lru:
+            return  # caso habitual: nada pendiente en ningún stream
+        if size > 0:
+            self.used += size
+            if self.used > self.stats["peak_bytes"]:
+                self.stats["peak_bytes"] = self.used
+            if size > self.stream_bytes:
+                self._evict(k, "cap")
+        if self.idle_seconds > 0 and epoch >= self.next_expire:
+            self.expire(epoch)
+        while self.used > self.total_bytes and lru:
+            self._evict(next(iter(lru)), "budget")
+
+    def expire(self, epoch: float) -> None:
+        """Descarta los búferes sin entradas desde hace idle_seconds de captura."""
+        lru = self._lru
+        limit = epoch - self.idle_seconds
+        while lru:
+            k, ent = next(iter(lru.items()))
+            if ent[1] >= limit:
+                self.next_expire = ent[1] + self.idle_seconds
+                return
+            self._evict(k, "idle")
+        self.next_expire = float("inf")
+
+    def discard(self, owner, key) -> None:
+        """El dueño ha soltado el búfer por su cuenta (stream cerrado o perdido): no cuenta como descarte."""
+        ent = self._lru.pop((owner, key), None)
+        if ent is not None:
+            self.used -= ent[0]
+
+    def drop(self, size: int, reason: str = "cap") -> None:
+        """Cuenta un mensaje que el dueño descarta sin haberlo guardado (p. ej. descomprimido pasa del tope)."""
+        self.stats[REASONS[reason]] += 1
+        self.stats["dropped_bytes"] += size
+
+    def _evict(self, k: tuple, reason: str) -> None:
+        ent = self._lru.pop(k)
+        self.used -= ent[0]
+        self.drop(ent[0], reason)
+        owner, key = k
+        owner.evict(key)
+
+
+def evicted(stats: Dict[str, int]) -> int:
+    return sum(stats.get(k, 0) for k in LABELS)
+
+
+def merge_stats(parts: List[Dict[str, int]]) -> Dict[str, int]:
+    """Suma los contadores de varios shards (el pico es la suma: corren a la vez)."""
+    out = empty_stats()
+    for p in parts:
+        for k in out:
+            out[k] += p.get(k, 0)
+    return out
+
+
+def describe(stats: Dict[str, int]) -> str:
+    """'3 búferes descartados (tope por stream 1, inactivos 2; 12.5 MB)' o '' si no hubo ninguno."""
+    n = evicted(stats)
+    if not n:
+        return ""
+    parts = [f"{LABELS[k]} {stats[k]}" for k in LABELS if stats.get(k)]
+    return f"{n} búferes descartados ({', '.join(parts)}; {stats.get('dropped_bytes', 0) / 1e6:.1f} MB)"
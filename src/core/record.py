@@ -0,0 +1,312 @@
+# src/core/record.py
+"""
+Registro compacto de un mensaje extraído (WebSocket o TCP-JSON).
+
+Se comporta como el dict de siempre (mismas claves y en el mismo orden:
+time, ms, epoch, stream, src, dst, src_port, dst_port, opcode, topic, type,
+args, kwargs, raw y después los campos WAMP extra), pero:
+  - guarda los metadatos en __slots__, con src/dst/stream/opcode/topic/type
+    internados y los puertos compartidos;
+  - time/ms se derivan de epoch al pedirlos;
+  - args/kwargs no se guardan: se vuelven a decodificar desde raw al
+    pedirlos, con una LRU acotada por bytes (decode_payload) para los
+    accesos seguidos;
+  - comparar dos Record compara lo guardado (raw incluido) sin decodificar.
+
+Los args/kwargs devueltos pueden estar compartidos con otros registros del
+mismo raw: no se deben modificar. Asignar rec["args"]/rec["kwargs"] fija
+valores propios para ese registro.
+"""
+from __future__ import annotations
+
+import datetime as _dt
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from operator import attrgetter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .jsoncodec import loads
+from .utils import largest_json_in_text
+from .wamp_parser import payload_fields
+
+JsonDict = Dict[str, Any]
+
+# args/kwargs decodificados que se conservan (LRU): tope de bytes de raw,
+# más PAYLOAD_ENTRY_BYTES por entrada; los raw de más de
+# PAYLOAD_MAX_RAW_BYTES no se guardan (se decodifican en cada acceso)
+PAYLOAD_CACHE_BYTES = 2 << 20
+PAYLOAD_ENTRY_BYTES = 256
+PAYLOAD_MAX_RAW_BYTES = 64 << 10
+TCPJSON = "TCPJSON"
+
+BASE_KEYS = ("time", "ms", "epoch", "stream", "src", "dst", "src_port", "dst_port",
+             "opcode", "topic", "type", "args", "kwargs", "raw")
+_BASE_SET = frozenset(BASE_KEYS)
+_INTERNED = frozenset(("stream", "src", "dst", "opcode", "topic", "type"))
+_PORTS = frozenset(("src_port", "dst_port"))
+# campos guardados en el registro (orden de los argumentos de Record)
+STORED_KEYS = ("epoch", "stream", "src", "dst", "src_port", "dst_port", "opcode", "topic", "type", "raw")
+
+# tuplas de claves extra compartidas entre registros con la misma forma
+_extra_shapes: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+_ports: Dict[int, int] = {}
+
+
+def _intern(v: Any) -> Any:
+    return sys.intern(v) if type(v) is str else v
+
+
+def _port(v: Any) -> Any:
+    if type(v) is not int:
+        return v
+    return _ports.setdefault(v, v)
+
+
+def stored_value(key: str, v: Any) -> Any:
+    """v tal como lo guarda Record en el campo `key` (internado, puerto compartido)."""
+    if key in _INTERNED:
+        return _intern(v)
+    if key in _PORTS:
+        return _port(v)
+    return v
+
+
+def _decode_payload(tcpjson: bool, raw: str) -> Tuple[List[Any], Any]:
+    if tcpjson:
+        try:
+            return [], loads(raw)
+        except Exception:
+            return [], {"raw_text": raw}
+    try:
+        arr = loads(raw)
+    except Exception:
+        # no es JSON: mayor objeto JSON del texto
+        j = largest_json_in_text(raw)
+        kwargs: Any = {}
+        if j:
+            try:
+                kwargs = loads(j)
+            except Exception:
+                kwargs = {"raw_text": j}
+        return [], kwargs
+    return payload_fields(arr)
+
+
+# (tcpjson, raw) -> (args, kwargs); la GUI lee desde el hilo principal y el worker
+_payloads: "OrderedDict[Tuple[bool, str], Tuple[List[Any], Any]]" = OrderedDict()
+_payload_bytes = 0
+_payload_lock = threading.Lock()
+
+
+def decode_payload(tcpjson: bool, raw: str) -> Tuple[List[Any], Any]:
+    """raw -> (args, kwargs), igual que al extraer el mensaje."""
+    global _payload_bytes
+    key = (tcpjson, raw)
+    with _payload_lock:
+        hit = _payloads.get(key)
+        if hit is not None:
+            _payloads.move_to_end(key)
+            return hit
+    value = _decode_payload(tcpjson, raw)
+    if len(raw) > PAYLOAD_MAX_RAW_BYTES:
+        return value
+    with _payload_lock:
+        if key not in _payloads:
+            _payloads[key] = value
+            _payload_bytes += len(raw) + PAYLOAD_ENTRY_BYTES
+            while _payload_bytes > PAYLOAD_CACHE_BYTES and _payloads:
+                (_, old), _ = _payloads.popitem(last=False)
+                _payload_bytes -= len(old) + PAYLOAD_ENTRY_BYTES
+    return value
+
+
+def clear_payload_cache() -> None:
+    global _payload_bytes
+    with _payload_lock:
+        _payloads.clear()
+        _payload_bytes = 0
+
+
+def _time_hms(r: "Record") -> str:
+    return _dt.datetime.utcfromtimestamp(float(r.epoch)).strftime("%H:%M:%S")
+
+
+def _time_ms(r: "Record") -> str:
+    return f"{_dt.datetime.utcfromtimestamp(float(r.epoch)).microsecond:06d}"
+
+
+_GETTERS = {k: attrgetter(k) for k in STORED_KEYS}
+_GETTERS.update({
+    "time": _time_hms,
+    "ms": _time_ms,
+    "args": lambda r: r.payload()[0],
+    "kwargs": lambda r: r.payload()[1],
+})
+
+
+class Record(MutableMapping):
+    """Mapping compacto con las claves del registro de un mensaje."""
+    __slots__ = STORED_KEYS + ("_parsed", "_xkeys", "_xvals")
+
+    def __init__(self, epoch: float, stream: str, src: str, dst: str, src_port: Any, dst_port: Any,
+                 opcode: str, topic: str, type: str, raw: str, extra: Optional[JsonDict] = None):
+        self.epoch = epoch
+        self.stream = _intern(stream)
+        self.src = _intern(src)
+        self.dst = _intern(dst)
+        self.src_port = _port(src_port)
+        self.dst_port = _port(dst_port)
+        self.opcode = _intern(opcode)
+        self.topic = _intern(topic)
+        self.type = _intern(type)
+        self.raw = raw
+        self._parsed: Optional[Tuple[Any, Any]] = None   # args/kwargs asignados a mano
+        self._xkeys: Tuple[str, ...] = ()
+        self._xvals: Tuple[Any, ...] = ()
+        if extra:
+            self._set_extra(tuple(extra), tuple(extra.values()))
+
+    def _set_extra(self, keys: Tuple[str, ...], values: Tuple[Any, ...]) -> None:
+        self._xkeys = _extra_shapes.setdefault(keys, keys)
+        self._xvals = values
+
+    def payload(self) -> Tuple[Any, Any]:
+        """(args, kwargs): los asignados o decodificados desde raw."""
+        if self._parsed is not None:
+            return self._parsed
+        return decode_payload(self.opcode == TCPJSON, self.raw)
+
+    @property
+    def pinned(self) -> bool:
+        """True si args/kwargs se asignaron y no salen de raw."""
+        return self._parsed is not None
+
+    def extra_items(self) -> Iterator[Tuple[str, Any]]:
+        return zip(self._xkeys, self._xvals)
+
+    def stored_items(self) -> Iterator[Tuple[str, Any]]:
+        """Lo que define el registro: STORED_KEYS y campos extra (sin derivados)."""
+        for k in STORED_KEYS:
+            yield k, getattr(self, k)
+        yield from zip(self._xkeys, self._xvals)
+
+    # --- Mapping ---
+    def __getitem__(self, key: str) -> Any:
+        getter = _GETTERS.get(key)
+        if getter is not None:
+            return getter(self)
+        try:
+            return self._xvals[self._xkeys.index(key)]
+        except ValueError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        getter = _GETTERS.get(key)
+        if getter is not None:
+            return getter(self)
+        if key in self._xkeys:
+            return self._xvals[self._xkeys.index(key)]
+        return default
+
+    def __contains__(self, key: object) -> bool:
+        return key in _BASE_SET or key in self._xkeys
+
+    def __iter__(self) -> Iterator[str]:
+        yield from BASE_KEYS
+        yield from self._xkeys
+
+    def __len__(self) -> int:
+        return len(BASE_KEYS) + len(self._xkeys)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in _INTERNED:
+            setattr(self, key, _intern(value))
+        elif key in _PORTS:
+            setattr(self, key, _port(value))
+        elif key in ("epoch", "raw"):
+            setattr(self, key, value)
+        elif key in ("args", "kwargs"):
+            args, kwargs = self.payload()
+            self._parsed = (value, kwargs) if key == "args" else (args, value)
+        elif key in ("time", "ms"):
+            raise KeyError(f"{key} se deriva de epoch")
+        elif key in self._xkeys:
+            vals = list(self._xvals)
+            vals[self._xkeys.index(key)] = value
+            self._xvals = tuple(vals)
+        else:
+            self._set_extra(self._xkeys + (key,), self._xvals + (value,))
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self._xkeys:
+            raise KeyError(key)
+        i = self._xkeys.index(key)
+        self._set_extra(self._xkeys[:i] + self._xkeys[i + 1:], self._xvals[:i] + self._xvals[i + 1:])
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not Record:
+            return super().__eq__(other)
+        if other is self:
+            return True
+        if (self.epoch, self.stream, self.src, self.dst, self.src_port, self.dst_port, self.opcode, self.topic,
+                self.type, self.raw) != (other.epoch, other.stream, other.src, other.dst, other.src_port,
+                                         other.dst_port, other.opcode, other.topic, other.type, other.raw):
+            return False
+        if self._xkeys is other._xkeys:
+            if self._xvals != other._xvals:
+                return False
+        elif dict(self.extra_items()) != dict(other.extra_items()):
+            return False
+        # mismo raw y opcode: mismos args/kwargs salvo si alguno los tiene asignados
+        return (self._parsed is None and other._parsed is None) or self.payload() == other.payload()
+
+    __hash__ = None  # mutable, como dict
+
+    def __repr__(self) -> str:
+        return f"Record({dict(self)!r})"
+
+    # --- pickle (pool de procesos) ---
+    def __reduce__(self):
+        return (_restore, (tuple(getattr(self, k) for k in STORED_KEYS), self._parsed, self._xkeys, self._xvals))
+
+
+def _restore(slots: tuple, parsed: Optional[Tuple[Any, Any]], xkeys: Tuple[str, ...],
+             xvals: Tuple[Any, ...]) -> Record:
+    rec = Record(*slots)
+    rec._parsed = parsed
+    if xkeys:
+        rec._set_extra(xkeys, xvals)
+    return rec
+
+
+def restore_columns(columns: Dict[str, List[Any]], xkeys: List[Tuple[str, ...]],
+                    xvals: List[Tuple[Any, ...]]) -> List[Record]:
+    """
+    Records a partir de columnas (caché de sesión): una lista por cada
+    clave de STORED_KEYS, más las claves y valores extra de cada registro.
+    Los valores deben venir ya internados (una vez por valor distinto, no
+    por registro), que es lo que evita pasar por __init__.
+    """
+    new = Record.__new__
+    shapes = _extra_shapes
+    out = []
+    for epoch, stream, src, dst, sport, dport, opcode, topic, type_, raw, xk, xv in zip(
+            *[columns[k] for k in STORED_KEYS], xkeys, xvals):
+        rec = new(Record)
+        rec.epoch = epoch
+        rec.stream = stream
+        rec.src = src
+        rec.dst = dst
+        rec.src_port = sport
+        rec.dst_port = dport
+        rec.opcode = opcode
+        rec.topic = topic
+        rec.type = type_
+        rec.raw = raw
+        rec._parsed = None
+        rec._xkeys = shapes.setdefault(xk, xk)
+        rec._xvals = xv
+        out.append(rec)
+    return out
@@ -0,0 +1,121 @@
+# src/core/schema_index.py
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+JsonDict = Dict[str, Any]
+
+# Campos por los que se agrupan los esquemas
+GROUP_FIELDS = ("type", "opcode", "topic")
+# firmas de esquema recordadas por grupo (evita recorrer claves ya vistas)
+MAX_SIGNATURES = 4096
+# al separar por tipo, grupos con salida propia; el resto va a OTHER_LABEL
+SPLIT_MAX = 64
+OTHER_LABEL = "otros"
+
+
+class KeySet:
+    """Conjunto de claves que conserva el orden de primera aparición."""
+    __slots__ = ("keys", "seen", "sigs")
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.seen = set()
+        self.sigs = set()
+
+    def add(self, keys: Tuple[str, ...]) -> None:
+        # los registros de un mismo tipo repiten la tupla de claves entera
+        if keys in self.sigs:
+            return
+        if len(self.sigs) < MAX_SIGNATURES:
+            self.sigs.add(keys)
+        seen = self.seen
+        for k in keys:
+            if k not in seen:
+                seen.add(k)
+                self.keys.append(k)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, k):
+        return k in self.seen
+
+
+class SchemaGroup:
+    """Esquema acumulado de un grupo de registros."""
+    __slots__ = ("count", "flat", "kv", "rec")
+
+    def __init__(self):
+        self.count = 0
+        self.flat = KeySet()   # JSON aplanado (Mensajes de Excel)
+        self.kv = KeySet()     # kwargs/args aplanados (CSV)
+        self.rec = KeySet()    # claves de primer nivel (hoja Raw)
+
+    def add(self, rec_keys: Tuple[str, ...], flat_keys: Tuple[str, ...], kv_keys: Tuple[str, ...]) -> None:
+        self.count += 1
+        self.rec.add(rec_keys)
+        self.flat.add(flat_keys)
+        self.kv.add(kv_keys)
+
+
+class SchemaIndex:
+    """
+    Índice incremental de columnas: para el total y para cada valor de
+    type/opcode/topic guarda las claves aplanadas vistas, en orden de
+    primera aparición. Se alimenta según llegan los registros, de modo que
+    los exportadores conocen las cabeceras sin recorrer todos los registros
+    y pueden escribir una hoja/fichero denso por tipo.
+    """
+
+    def __init__(self, fields: Iterable[str] = GROUP_FIELDS):
+        self.fields = tuple(fields)
+        self.total = SchemaGroup()
+        self.groups: Dict[str, Dict[Any, SchemaGroup]] = {f: {} for f in self.fields}
+
+    @property
+    def count(self) -> int:
+        return self.total.count
+
+    def add(self, rec: JsonDict, flat: Iterable[str], kv: Iterable[str]) -> None:
+        """Cuenta un registro con sus claves aplanadas (JSON y kwargs/args); no guarda valores."""
+        sig = (tuple(rec), tuple(flat), tuple(kv))
+        self.total.add(*sig)
+        for f in self.fields:
+            value = str(rec.get(f) or "")
+            g = self.groups[f].get(value)
+            if g is None:
+                g = self.groups[f][value] = SchemaGroup()
+            g.add(*sig)
+
+    def values(self, field: str) -> List[str]:
+        """Valores del campo en orden de primera aparición."""
+        return list(self.groups[field])
+
+    def group(self, field: str, value: Any) -> Optional[SchemaGroup]:
+        return self.groups[field].get(str(value or ""))
+
+    def summary(self, field: str = "type") -> List[Tuple[str, int, int]]:
+        """(valor, registros, columnas JSON) por valor del campo."""
+        return [(v, g.count, len(g.flat)) for v, g in self.groups[field].items()]
+
+    def split(self, field: str, max_groups: int = SPLIT_MAX) -> List[Tuple[str, List[str], SchemaGroup]]:
+        """
+        Reparto para exportar un fichero/hoja por valor de `field`:
+        [(etiqueta, valores, esquema combinado)]. Los grupos más pequeños a
+        partir de max_groups se juntan en uno llamado OTHER_LABEL.
+        """
+        groups = self.groups[field]
+        ranked = sorted(groups, key=lambda v: -groups[v].count)
+        own = set(ranked[:max_groups - 1] if len(ranked) > max_groups else ranked)
+        out: List[Tuple[str, List[str], SchemaGroup]] = [(v, [v], groups[v]) for v in groups if v in own]
+        rest = [v for v in groups if v not in own]
+        if rest:
+            merged = SchemaGroup()
+            for v in rest:
+                g = groups[v]
+                merged.count += g.count
+                for mine, theirs in ((merged.rec, g.rec), (merged.flat, g.flat), (merged.kv, g.kv)):
+                    mine.add(tuple(theirs.keys))
+            out.append((OTHER_LABEL, rest, merged))
+        return out
@@ -0,0 +1,421 @@
+# src/core/session_cache.py
+"""
+Caché en disco de sesiones extraídas, para reabrir una captura sin volver
+a lanzar tshark.
+
+Clave: ruta, tamaño y mtime del PCAP + modo, motor, filtros de red y lo
+demás que cambia el resultado de la extracción: límites de reensamblado
+(WAMP_EXTRACTOR_*), versión de tshark o límites de conexiones del lector
+nativo. Cada entrada es un fichero columnar (.wxc) que se lee con mmap:
+
+    b"WXC1" | uint32 longitud de cabecera | cabecera JSON | secciones
+
+Las columnas de metadatos (stream, src, dst, opcode, topic, type…) se
+guardan codificadas por diccionario (uint32 por registro + tabla de
+valores), epoch como float64 y el resto de cada registro (raw, ids
+WAMP…) como un objeto JSON por registro, con su desplazamiento en una
+columna uint64. time/ms se recalculan a partir de epoch y los Record
+vuelven como Record, con args/kwargs decodificados desde raw al pedirlos.
+Al leer sólo se decodifica el JSON de las filas que se cargan, por
+bloques, y los Record se montan por columnas (cada valor distinto se
+interna una sola vez).
+
+Si sólo cambia el filtro de TCP streams y existe la entrada de la misma
+captura sin él, se reutiliza cargando las filas de esos streams: cada
+stream se extrae igual con o sin el filtro, salvo si el presupuesto
+global de reensamblado descartó algo (entonces se vuelve a extraer). Con
+otros filtros de red no: quitar un sentido de la conexión cambia la
+resolución de topics y el reensamblado.
+El tamaño total está acotado: al guardar se borran las entradas usadas
+hace más tiempo.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import sys
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from . import jsoncodec, reassembly
+from .pcap_parser import Filters, finalize_message, tshark_version
+from .record import STORED_KEYS, Record, restore_columns, stored_value
+
+JsonDict = Dict[str, Any]
+
+# subir al cambiar la forma de los registros extraídos (invalida lo guardado)
+CACHE_VERSION = 4
+MAGIC = b"WXC1"
+SUFFIX = ".wxc"
+# tamaño máximo del directorio de caché (WAMP_EXTRACTOR_CACHE_MB; 0 desactiva)
+CACHE_MAX_BYTES = int(os.environ.get("WAMP_EXTRACTOR_CACHE_MB", "2048")) * (1 << 20)
+# columnas codificadas por diccionario; epoch va aparte como float64
+DICT_COLUMNS = ("stream", "src", "dst", "src_port", "dst_port", "opcode", "topic", "type",
+                "wamp_code", "proto")
+# se recalculan desde epoch al cargar
+DERIVED = ("time", "ms")
+ABSENT = 0xFFFFFFFF
+# hueco de una columna al leer: el valor está en el resto del registro
+_MISSING = object()
+# primera clave de la forma de un Record: se guarda sin args/kwargs (salen de raw)
+RECORD_MARK = "\0record"
+_ALIGN = 8
+# filas cuyo JSON se decodifica de una vez al leer
+DECODE_CHUNK = 8192
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "wamp_extractor", "sessions")
+
+
+def _net_key(flt: Filters, streams: bool = True) -> Dict[str, str]:
+    return {"src_ip": flt.src_ip, "dst_ip": flt.dst_ip, "src_port": flt.src_port,
+            "dst_port": flt.dst_port, "streams": flt.streams if streams else ""}
+
+
+def _extraction_key(flt: Filters) -> Dict[str, Any]:
+    """Ajustes que, aparte de los filtros, cambian lo que se extrae."""
+    key: Dict[str, Any] = {"stream_bytes": reassembly.STREAM_MAX_BYTES, "total_bytes": reassembly.TOTAL_MAX_BYTES,
+                           "idle_seconds": reassembly.IDLE_SECONDS}
+    if flt.backend == "NATIVE":
+        from . import pcap_native
+        key.update(max_conns=pcap_native.MAX_CONNS, conn_idle_seconds=pcap_native.CONN_IDLE_SECONDS)
+    else:
+        key["tshark"] = ".".join(map(str, tshark_version()))
+    return key
+
+
+def _base_key(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+            "version": CACHE_VERSION}
+
+
+def _pad(n: int) -> int:
+    return (-n) % _ALIGN
+
+
+class SessionCache:
+    def __init__(self, root: Optional[str] = None, max_bytes: int = CACHE_MAX_BYTES):
+        self.root = root or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    # --- claves ---
+    def key_for(self, path: str, flt: Filters, streams: bool = True) -> Optional[Dict[str, Any]]:
+        """Clave de la extracción; con streams=False, la de la misma sin filtro de TCP streams."""
+        key = _base_key(path)
+        if key is None:
+            return None
+        key.update(mode=flt.mode, backend=flt.backend, extraction=_extraction_key(flt))
+        key["net"] = _net_key(flt, streams)
+        return key
+
+    def _file(self, key: Dict[str, Any]) -> str:
+        import hashlib  # ~10 ms de import: sólo al abrir una captura
+        digest = hashlib.sha1(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+        return os.path.join(self.root, digest + SUFFIX)
+
+    # --- lectura ---
+    def load(self, path: str, flt: Filters) -> Optional[List[JsonDict]]:
+        """Registros de la caché (ya con time/ms), o None si no hay entrada utilizable."""
+        if not self.enabled:
+            return None
+        key = self.key_for(path, flt)
+        if key is None:
+            return None
+        recs = self._read(key)
+        if recs is not None:
+            return recs
+        if flt.streams:
+            # reutilización parcial: la entrada sin filtro de streams contiene
+            # los mismos registros de cada stream, si nada dependió del total
+            return self._read(self.key_for(path, flt, streams=False), streams=flt.match_stream)
+        return None
+
+    def _read(self, key: Dict[str, Any], streams: Optional[Callable[[str], bool]] = None
+              ) -> Optional[List[JsonDict]]:
+        fn = self._file(key)
+        try:
+            f = open(fn, "rb")
+        except OSError:
+            return None
+        try:
+            with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                recs = _decode(mm, key, streams)
+        except (OSError, ValueError, KeyError, IndexError, TypeError):
+            recs = None
+        if recs is _PARTIAL_UNSAFE:
+            return None
+        if recs is None:
+            self._remove(fn)
+            return None
+        try:
+            os.utime(fn)  # LRU: la fecha de modificación marca el último uso
+        except OSError:
+            pass
+        return recs
+
+    # --- escritura ---
+    def store(self, path: str, flt: Filters, records: List[JsonDict],
+              buffers: Optional[Dict[str, int]] = None) -> Optional[str]:
+        """
+        Guarda los registros (escritura atómica) y aplica el límite de
+        tamaño. `buffers` (stats["buffers"] de la extracción) decide si la
+        entrada sirve para otros filtros de streams.
+        """
+        if not self.enabled:
+            return None
+        key = self.key_for(path, flt)
+        if key is None:
+            return None
+        import tempfile
+        os.makedirs(self.root, exist_ok=True)
+        fn = self._file(key)
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=self.root)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                _encode(f, key, records, buffers)
+            os.replace(tmp, fn)
+        except BaseException:
+            self._remove(tmp)
+            raise
+        self.evict(keep=fn)
+        return fn
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Borra las entradas menos usadas hasta quedar por debajo de max_bytes."""
+        try:
+            names = [os.path.join(self.root, n) for n in os.listdir(self.root) if n.endswith(SUFFIX)]
+        except OSError:
+            return 0
+        entries = []
+        for fn in names:
+            try:
+                st = os.stat(fn)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, fn))
+        total = sum(e[1] for e in entries)
+        removed = 0
+        for _, size, fn in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if fn == keep:
+                continue
+            self._remove(fn)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self) -> int:
+        limit, self.max_bytes = self.max_bytes, 0
+        try:
+            return self.evict()
+        finally:
+            self.max_bytes = limit
+
+    @staticmethod
+    def _remove(fn: str) -> None:
+        try:
+            os.remove(fn)
+        except OSError:
+            pass
+
+
+# ------------------------------------------------------------
+# Formato
+# ------------------------------------------------------------
+def _encode(f, key: Dict[str, Any], records: List[JsonDict], buffers: Optional[Dict[str, int]] = None) -> None:
+    n = len(records)
+    epochs = array("d", bytes(8 * n))
+    codes = {c: array("I", bytes(4 * n)) for c in DICT_COLUMNS}
+    values: Dict[str, Dict[Any, int]] = {c: {} for c in DICT_COLUMNS}
+    shapes: Dict[Tuple[str, ...], int] = {}
+    shape_codes = array("I", bytes(4 * n))
+    # el objeto JSON de la fila i ocupa payload[offsets[i]:offsets[i + 1] - 1]
+    # (cada uno va seguido de una coma, así un tramo de filas es un array)
+    offsets = array("Q", bytes(8 * (n + 1)))
+    blob = bytearray()
+    plain = set(DICT_COLUMNS) | set(DERIVED) | {"epoch"}
+    for i, rec in enumerate(records):
+        if isinstance(rec, Record) and not rec.pinned:
+            items = list(rec.stored_items())
+            shape = (RECORD_MARK,) + tuple(k for k, _ in items)
+        else:
+            items = list(rec.items())
+            shape = tuple(rec)
+        sc = shapes.get(shape)
+        if sc is None:
+            sc = shapes[shape] = len(shapes)
+        shape_codes[i] = sc
+        epochs[i] = float(rec.get("epoch") or 0.0)
+        rest = {k: v for k, v in items if k not in plain}
+        for c in DICT_COLUMNS:
+            v = rec.get(c, rest)
+            if v is rest:
+                codes[c][i] = ABSENT
+            elif v is None or isinstance(v, (str, int, float)):
+                table = values[c]
+                code = table.get(v)
+                if code is None:
+                    code = table[v] = len(table)
+                codes[c][i] = code
+            else:
+                # valores no escalares van con el resto del registro
+                codes[c][i] = ABSENT
+                rest[c] = v
+        offsets[i] = len(blob)
+        blob += jsoncodec.dumps(rest, compact=True).encode("utf-8")
+        blob += b","
+    offsets[n] = len(blob)
+
+    sections: List[Tuple[str, bytes]] = [("epoch", epochs.tobytes()), ("shape", shape_codes.tobytes()),
+                                         ("offsets", offsets.tobytes())]
+    sections += [(c, codes[c].tobytes()) for c in DICT_COLUMNS]
+    sections.append(("payload", bytes(blob)))
+    layout = {}
+    pos = 0
+    for name, data in sections:
+        layout[name] = [pos, len(data)]
+        pos += len(data) + _pad(len(data))
+    header = jsoncodec.dumps({
+        "key": key, "count": n, "byteorder": sys.byteorder, "layout": layout,
+        "shapes": [list(s) for s in sorted(shapes, key=shapes.get)],
+        "values": {c: list(values[c]) for c in DICT_COLUMNS},
+        "buffers": dict(buffers or {}),
+    }).encode("utf-8")
+    head = MAGIC + len(header).to_bytes(4, "little") + header
+    f.write(head + b"\0" * _pad(len(head)))
+    for _, data in sections:
+        f.write(data)
+        f.write(b"\0" * _pad(len(data)))
+
+
+# _decode: la entrada es válida pero no sirve para filtrar por streams
+_PARTIAL_UNSAFE: Any = object()
+
+
+def _decode(mm: mmap.mmap, key: Dict[str, Any], streams: Optional[Callable[[str], bool]] = None):
+    """
+    Registros de la entrada (None si no es válida). Con `streams`, sólo
+    los de los streams que acepta, y _PARTIAL_UNSAFE si la extracción
+    descartó búferes por el presupuesto global.
+    """
+    if mm[:4] != MAGIC:
+        return None
+    hlen = int.from_bytes(mm[4:8], "little")
+    header = jsoncodec.loads(mm[8:8 + hlen])
+    if header["key"] != key or header["byteorder"] != sys.byteorder:
+        return None
+    if streams is not None and header["buffers"].get("evicted_budget"):
+        return _PARTIAL_UNSAFE
+    base = 8 + hlen + _pad(8 + hlen)
+    layout = header["layout"]
+    views: List[memoryview] = [memoryview(mm)]
+
+    def col(name: str, fmt: str = "B") -> memoryview:
+        off, size = layout[name]
+        v = views[0][base + off: base + off + size]
+        views.append(v)
+        if fmt != "B":
+            v = v.cast(fmt)
+            views.append(v)
+        return v
+
+    try:
+        n = header["count"]
+        epochs = col("epoch", "d").tolist()
+        shape_codes = col("shape", "I").tolist()
+        offsets = col("offsets", "Q").tolist()
+        if len(epochs) != n or len(shape_codes) != n or len(offsets) != n + 1:
+            return None
+        columns: Dict[str, List[Any]] = {"epoch": epochs}
+        for c in DICT_COLUMNS:
+            # código -> valor, construido una vez por valor distinto
+            lookup = {code: stored_value(c, v) for code, v in enumerate(header["values"][c])}
+            lookup[ABSENT] = _MISSING
+            columns[c] = list(map(lookup.__getitem__, col(c, "I")))
+        if streams is None:
+            rows: Sequence[int] = range(n)
+        else:
+            # el filtro se aplica a la columna: las demás filas no se decodifican
+            ok = {v: v is not _MISSING and streams(v) for v in set(columns["stream"])}
+            rows = [i for i, v in enumerate(columns["stream"]) if ok[v]]
+        payload = col("payload")
+        shapes = [tuple(s) for s in header["shapes"]]
+        recs: List[JsonDict] = []
+        for start in range(0, len(rows), DECODE_CHUNK):
+            chunk = rows[start:start + DECODE_CHUNK]
+            if isinstance(chunk, range):
+                # tramo contiguo: un solo array JSON
+                data = b"[" + payload[offsets[chunk.start]:offsets[chunk.stop] - 1].tobytes() + b"]"
+            else:
+                data = b"[" + b",".join(payload[offsets[i]:offsets[i + 1] - 1].tobytes() for i in chunk) + b"]"
+            rests = jsoncodec.loads(data)
+            if len(rests) != len(chunk):
+                return None
+            sub = {k: [v[i] for i in chunk] for k, v in columns.items()}
+            recs += _build(sub, [shape_codes[i] for i in chunk], rests, shapes)
+        return recs
+    finally:
+        # el mmap no se puede cerrar con vistas vivas
+        for v in reversed(views):
+            v.release()
+
+
+def _build(columns: Dict[str, List[Any]], shape_codes: List[int], rests: List[JsonDict],
+           shapes: List[Tuple[str, ...]]) -> List[JsonDict]:
+    """Registros de un bloque de filas a partir de sus columnas y su JSON ya decodificado."""
+    n = len(rests)
+    recs: List[Optional[JsonDict]] = [None] * n
+    compact = [i for i in range(n) if shapes[shape_codes[i]][0] == RECORD_MARK]
+    if compact:
+        if len(compact) < n:
+            sub = {k: [col[i] for i in compact] for k, col in columns.items()}
+        else:
+            sub = dict(columns)
+        crests = [rests[i] for i in compact]
+        # campos fijos: de su columna o, si no la tienen (raw) o el valor no era
+        # escalar, del resto del registro
+        for k in STORED_KEYS:
+            col = sub.get(k)
+            if col is None:
+                sub[k] = [r[k] for r in crests]
+            elif _MISSING in col:
+                sub[k] = [stored_value(k, r[k]) if v is _MISSING else v for v, r in zip(col, crests)]
+        # campos extra, en el orden de la forma
+        plans = {}
+        for sc in {shape_codes[i] for i in compact}:
+            xk = shapes[sc][1 + len(STORED_KEYS):]
+            plans[sc] = (xk, [(k, sub.get(k)) for k in xk])
+        xkeys, xvals = [], []
+        for j, i in enumerate(compact):
+            xk, plan = plans[shape_codes[i]]
+            r = crests[j]
+            xkeys.append(xk)
+            xvals.append(tuple([r[k] if c is None or c[j] is _MISSING else c[j] for k, c in plan]))
+        for i, rec in zip(compact, restore_columns(sub, xkeys, xvals)):
+            recs[i] = rec
+    for i in range(n):
+        if recs[i] is not None:
+            continue
+        rest = rests[i]
+        rec = {}
+        for k in shapes[shape_codes[i]]:
+            if k in rest:
+                rec[k] = rest[k]
+            elif k in columns:
+                rec[k] = columns[k][i]
+            else:
+                rec[k] = ""  # time/ms: los rellena finalize_message
+        recs[i] = finalize_message(rec) if "time" in rec else rec
+    return recs
@@ -1,7 +1,12 @@
 
 # -*- coding: utf-8 -*-
-import re, json, zlib
-from typing import Optional
+import re
+from typing import Optional, List
+
+try:  # opcional: XOR vectorizado para payloads grandes
+    import numpy as _np
+except ImportError:
+    _np = None
 
 HEX_RX = re.compile(r'^(?:[0-9A-Fa-f]{2}(?::[0-9A-Fa-f]{2})*)$')
 
@@ -42,17 +47,119 @@ def largest_json_in_text(s: str) -> Optional[str]:
         i = max(j, start+1)
     return best
 
-def maybe_inflate(raw: bytes) -> bytes:
-    """Intenta descomprimir DEFLATE raw o zlib. Si falla, devuelve raw."""
-    if not raw:
-        return raw
-    try:
-        # zlib
-        return zlib.decompress(raw)
-    except:
-        pass
-    try:
-        # raw DEFLATE necesita cabecera/cola zlib vacía
-        return zlib.decompress(raw + b"\x00\x00\xff\xff", -zlib.MAX_WBITS)
-    except:
-        return raw
+# a partir de este tamaño se usa numpy si está instalado
+UNMASK_NUMPY_MIN = 1 << 16
+# bloque del XOR sobre enteros (múltiplo de 4: conserva la alineación de la clave)
+UNMASK_BLOCK = 1 << 15
+
+def _xor_int(data, key: bytes) -> bytes:
+    n = len(data)
+    mask = (key * ((n + 3) // 4))[:n]
+    return (int.from_bytes(data, "little") ^ int.from_bytes(mask, "little")).to_bytes(n, "little")
+
+def ws_unmask(payload, key) -> bytes:
+    """
+    Aplica la máscara WebSocket de 4 bytes con XOR sobre enteros grandes
+    (por bloques en payloads grandes, o numpy si está instalado).
+    Acepta bytes o memoryview.
+    """
+    n = len(payload)
+    if not n:
+        return b""
+    key = bytes(key)
+    if n <= UNMASK_BLOCK:
+        return _xor_int(payload, key)
+    if _np is not None and n >= UNMASK_NUMPY_MIN:
+        data = _np.frombuffer(payload, dtype=_np.uint8)
+        return (data ^ _np.resize(_np.frombuffer(key, dtype=_np.uint8), n)).tobytes()
+    block = UNMASK_BLOCK
+    mask = int.from_bytes(key * (block // 4), "little")
+    mv = memoryview(payload)
+    full = n - n % block
+    out = [(int.from_bytes(mv[i:i + block], "little") ^ mask).to_bytes(block, "little")
+           for i in range(0, full, block)]
+    if full < n:
+        out.append(_xor_int(mv[full:], key))
+    return b"".join(out)
+
+_OBJ_SCAN_RX = re.compile(rb'[{}"]')
+_STR_SCAN_RX = re.compile(rb'[\\"]')
+
+class JsonFramer:
+    """
+    Delimitador incremental de objetos JSON sobre un flujo de bytes.
+    Conserva entre llamadas el desplazamiento, la profundidad y el estado
+    dentro-de-cadena/escape, así que cada byte se examina una sola vez y
+    cada objeto de nivel superior se emite al llegar su llave de cierre.
+    Los bytes fuera de un objeto se descartan.
+    """
+    def __init__(self):
+        self.buf = bytearray()
+        self.pos = 0          # siguiente byte por examinar en buf
+        self.start = -1       # inicio del objeto en curso, -1 si no hay
+        self.depth = 0
+        self.in_str = False
+        self.escape = False
+
+    @property
+    def pending(self) -> bool:
+        return self.start >= 0
+
+    def feed(self, data: bytes) -> List[bytes]:
+        out: List[bytes] = []
+        buf = self.buf
+        buf.extend(data)
+        n = len(buf)
+        pos = self.pos
+        while pos < n:
+            if self.depth == 0:
+                pos = buf.find(b"{", pos)
+                if pos < 0:
+                    pos = n
+                    break
+                self.start = pos
+                self.depth = 1
+                pos += 1
+                continue
+            if self.in_str:
+                if self.escape:
+                    self.escape = False
+                    pos += 1
+                    continue
+                m = _STR_SCAN_RX.search(buf, pos)
+                if m is None:
+                    pos = n
+                    break
+                pos = m.start()
+                if buf[pos] == 0x5C:  # '\\'
+                    self.escape = True
+                else:
+                    self.in_str = False
+                pos += 1
+                continue
+            m = _OBJ_SCAN_RX.search(buf, pos)
+            if m is None:
+                pos = n
+                break
+            pos = m.start()
+            ch = buf[pos]
+            if ch == 0x7B:    # '{'
+                self.depth += 1
+            elif ch == 0x7D:  # '}'
+                self.depth -= 1
+                if self.depth == 0:
+                    out.append(bytes(buf[self.start:pos + 1]))
+                    self.start = -1
+            else:             # '"'
+                self.in_str = True
+            pos += 1
+        # compacta: sólo se conserva el objeto en curso
+        if self.start < 0:
+            buf.clear()
+            pos = 0
+        elif self.start > 0:
+            del buf[:self.start]
+            pos -= self.start
+            self.start = 0
+        self.pos = pos
+        return out
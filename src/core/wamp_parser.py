@@ -1,38 +1,217 @@
 
 # -*- coding: utf-8 -*-
-import json
-from typing import Dict, Any, List, Tuple
+"""
+Decodificador WAMP v2 (serialización JSON).
 
-def parse_wamp_array(text: str) -> Tuple[str, Dict[str, Any], List[Any], Dict[str, Any]]:
-    """
-    text es el payload de texto del frame WebSocket (un array JSON WAMP).
-    Devuelve (topic_or_proc, args, kwargs) + 'msg_type'.
-    Acepta formatos: [type, ... ,'MsgEP', [ {..} ] ] o similar.
-    """
-    arr = json.loads(text)
+Cada mensaje es un array [código, ...] cuyo formato fija la tabla
+WAMP_MESSAGES. WampSessions guarda por sesión (TCP stream) los mapas
+subscription -> topic, registration -> procedure y petición pendiente ->
+topic/procedure, de modo que EVENT, RESULT, INVOCATION, YIELD y ERROR se
+resuelven a su topic o procedure con búsquedas en dict.
+"""
+from typing import Dict, Any, List, Optional, Tuple
+
+from .jsoncodec import loads
+
+# Tipos de campo: 'id' entero, 'uri' cadena, 'dict'/'args'/'kwargs' opcionales al final
+WAMP_MESSAGES: Dict[int, Tuple[str, Tuple[Tuple[str, str], ...]]] = {
+    1:  ("HELLO",        (("realm", "uri"), ("details", "dict"))),
+    2:  ("WELCOME",      (("session_id", "id"), ("details", "dict"))),
+    3:  ("ABORT",        (("details", "dict"), ("wamp_error", "uri"))),
+    4:  ("CHALLENGE",    (("auth_method", "uri"), ("extra", "dict"))),
+    5:  ("AUTHENTICATE", (("signature", "uri"), ("extra", "dict"))),
+    6:  ("GOODBYE",      (("details", "dict"), ("wamp_error", "uri"))),
+    8:  ("ERROR",        (("request_type", "id"), ("request_id", "id"), ("details", "dict"),
+                          ("wamp_error", "uri"), ("args", "args"), ("kwargs", "kwargs"))),
+    16: ("PUBLISH",      (("request_id", "id"), ("options", "dict"), ("topic", "uri"),
+                          ("args", "args"), ("kwargs", "kwargs"))),
+    17: ("PUBLISHED",    (("request_id", "id"), ("publication_id", "id"))),
+    32: ("SUBSCRIBE",    (("request_id", "id"), ("options", "dict"), ("topic", "uri"))),
+    33: ("SUBSCRIBED",   (("request_id", "id"), ("subscription_id", "id"))),
+    34: ("UNSUBSCRIBE",  (("request_id", "id"), ("subscription_id", "id"))),
+    35: ("UNSUBSCRIBED", (("request_id", "id"),)),
+    36: ("EVENT",        (("subscription_id", "id"), ("publication_id", "id"), ("details", "dict"),
+                          ("args", "args"), ("kwargs", "kwargs"))),
+    48: ("CALL",         (("request_id", "id"), ("options", "dict"), ("topic", "uri"),
+                          ("args", "args"), ("kwargs", "kwargs"))),
+    49: ("CANCEL",       (("request_id", "id"), ("options", "dict"))),
+    50: ("RESULT",       (("request_id", "id"), ("details", "dict"), ("args", "args"), ("kwargs", "kwargs"))),
+    64: ("REGISTER",     (("request_id", "id"), ("options", "dict"), ("topic", "uri"))),
+    65: ("REGISTERED",   (("request_id", "id"), ("registration_id", "id"))),
+    66: ("UNREGISTER",   (("request_id", "id"), ("registration_id", "id"))),
+    67: ("UNREGISTERED", (("request_id", "id"),)),
+    68: ("INVOCATION",   (("request_id", "id"), ("registration_id", "id"), ("details", "dict"),
+                          ("args", "args"), ("kwargs", "kwargs"))),
+    69: ("INTERRUPT",    (("request_id", "id"), ("options", "dict"))),
+    70: ("YIELD",        (("request_id", "id"), ("options", "dict"), ("args", "args"), ("kwargs", "kwargs"))),
+}
+WAMP_CODES: Dict[int, str] = {code: name for code, (name, _) in WAMP_MESSAGES.items()}
+
+# petición -> código cuyo request_id abrió la petición (RESULT responde a CALL…)
+_REPLY_TO = {17: 16, 33: 32, 35: 34, 49: 48, 50: 48, 65: 64, 67: 66, 69: 68, 70: 68}
+# campos que pasan al registro además de opcode/topic/args/kwargs
+RECORD_FIELDS = ("request_type", "request_id", "subscription_id", "publication_id", "registration_id",
+                 "session_id", "realm", "wamp_error")
+# entradas por mapa y sesión (capturas cortadas dejan peticiones sin respuesta)
+MAX_PENDING = 65536
+
+_OPTIONAL = ("args", "kwargs")
+
+def _check(v: Any, kind: str) -> bool:
+    if kind == "id":
+        return isinstance(v, int) and not isinstance(v, bool)
+    if kind == "uri":
+        return isinstance(v, str)
+    if kind in ("dict", "kwargs"):
+        return isinstance(v, dict)
+    return isinstance(v, list)
+
+def decode_fields(arr: Any) -> Optional[Tuple[int, Dict[str, Any]]]:
+    """[código, ...] -> (código, {campo: valor}) según WAMP_MESSAGES, o None si no es WAMP v2."""
+    if not isinstance(arr, list) or not arr:
+        return None
+    code = arr[0]
+    spec = WAMP_MESSAGES.get(code) if isinstance(code, int) and not isinstance(code, bool) else None
+    if spec is None:
+        return None
+    fields: Dict[str, Any] = {}
+    n = len(arr) - 1
+    for i, (name, kind) in enumerate(spec[1]):
+        if i >= n:
+            if kind in _OPTIONAL:
+                break
+            return None
+        v = arr[i + 1]
+        if not _check(v, kind):
+            return None
+        fields[name] = v
+    return code, fields
+
+def _legacy_fields(arr: Any) -> Tuple[str, List[Any], Dict[str, Any]]:
+    """Arrays que no son WAMP v2: cadena 'Msg…' como tipo y primera lista/dict como args/kwargs."""
     msg_type = None
-    topic = ""
     args: List[Any] = []
     kwargs: Dict[str, Any] = {}
-
-    # Heurística: buscar cadena tipo 'MsgEP' en posiciones típicas
     if isinstance(arr, list):
         for v in arr:
             if isinstance(v, str) and v.startswith("Msg"):
                 msg_type = v
                 break
-        # args/kwargs posibles:
         for v in arr:
             if isinstance(v, list) and not args:
                 args = v
             elif isinstance(v, dict) and not kwargs:
                 kwargs = v
+    return msg_type or "WAMP", args, kwargs
 
-    if not msg_type:
-        msg_type = "WAMP"
-
+def _payload(args: List[Any], kwargs: Dict[str, Any]) -> Tuple[List[Any], Dict[str, Any]]:
     # Si args es lista con un único dict, tratarlo como kwargs 'payload'
     if not kwargs and len(args) == 1 and isinstance(args[0], dict):
         kwargs = args[0]
+    return args, kwargs
 
-    return msg_type, topic, args, kwargs
+def payload_fields(arr: Any) -> Tuple[List[Any], Dict[str, Any]]:
+    """(args, kwargs) de un mensaje ya deserializado; no depende de la sesión."""
+    decoded = decode_fields(arr)
+    if decoded is None:
+        _, args, kwargs = _legacy_fields(arr)
+    else:
+        f = decoded[1]
+        args, kwargs = f.get("args", []), f.get("kwargs", {})
+    return _payload(args, kwargs)
+
+def _remember(d: Dict, key: Any, value: Any) -> None:
+    if key not in d and len(d) >= MAX_PENDING:
+        del d[next(iter(d))]  # la más antigua
+    d[key] = value
+
+class _Session:
+    __slots__ = ("pending", "subscriptions", "registrations")
+
+    def __init__(self):
+        self.pending: Dict[Tuple[int, int], str] = {}      # (código, request_id) -> uri
+        self.subscriptions: Dict[int, str] = {}            # subscription_id -> topic
+        self.registrations: Dict[int, str] = {}            # registration_id -> procedure
+
+class WampSessions:
+    """Decodifica mensajes WAMP y resuelve topic/procedure por sesión (stream)."""
+
+    def __init__(self):
+        self.sessions: Dict[str, _Session] = {}
+
+    def decode(self, stream: str, text: str) -> Tuple[str, str, List[Any], Dict[str, Any], Dict[str, Any]]:
+        """
+        text es el payload de texto del frame WebSocket (un array JSON WAMP).
+        Devuelve (opcode, topic_or_proc, args, kwargs, campos extra del registro).
+        Lanza ValueError si no es JSON.
+        """
+        return self.decode_obj(stream, loads(text))
+
+    def decode_obj(self, stream: str, arr: Any) -> Tuple[str, str, List[Any], Dict[str, Any], Dict[str, Any]]:
+        """Como decode, con el mensaje ya deserializado (JSON, msgpack o CBOR)."""
+        decoded = decode_fields(arr)
+        if decoded is None:
+            msg_type, args, kwargs = _legacy_fields(arr)
+            args, kwargs = _payload(args, kwargs)
+            return msg_type, "", args, kwargs, {}
+        code, f = decoded
+        s = self.sessions.get(stream)
+        if s is None:
+            s = self.sessions[stream] = _Session()
+        topic = self._resolve(s, code, f)
+        extra: Dict[str, Any] = {"wamp_code": code}
+        for k in RECORD_FIELDS:
+            if k in f:
+                extra[k] = f[k]
+        args, kwargs = _payload(f.get("args", []), f.get("kwargs", {}))
+        return WAMP_CODES[code], topic, args, kwargs, extra
+
+    @staticmethod
+    def _resolve(s: _Session, code: int, f: Dict[str, Any]) -> str:
+        req = f.get("request_id")
+        if code in (16, 32, 48, 64):             # PUBLISH, SUBSCRIBE, CALL, REGISTER
+            topic = f["topic"]
+            if code != 16 or f["options"].get("acknowledge"):
+                _remember(s.pending, (code, req), topic)
+            return topic
+        if code == 36:                           # EVENT (pattern-based: details.topic)
+            topic = f.get("details", {}).get("topic")
+            return topic if isinstance(topic, str) else s.subscriptions.get(f["subscription_id"], "")
+        if code == 68:                           # INVOCATION
+            proc = f.get("details", {}).get("procedure")
+            if not isinstance(proc, str):
+                proc = s.registrations.get(f["registration_id"], "")
+            _remember(s.pending, (68, req), proc)
+            return proc
+        if code in (34, 66):                     # UNSUBSCRIBE, UNREGISTER
+            uri = (s.subscriptions.get(f["subscription_id"], "") if code == 34
+                   else s.registrations.get(f["registration_id"], ""))
+            _remember(s.pending, (code, req), uri)
+            return uri
+        if code == 8:                            # ERROR [8, tipo de la petición, request_id, …]
+            return s.pending.pop((f["request_type"], req), "")
+        opened = _REPLY_TO.get(code)
+        if opened is None:
+            return ""
+        key = (opened, req)
+        if code in (49, 69):                     # CANCEL/INTERRUPT: la petición sigue abierta
+            return s.pending.get(key, "")
+        if code in (50, 70) and f.get("details" if code == 50 else "options", {}).get("progress"):
+            return s.pending.get(key, "")        # resultado progresivo: llegan más
+        uri = s.pending.pop(key, "")
+        if code == 33:
+            _remember(s.subscriptions, f["subscription_id"], uri)
+        elif code == 65:
+            _remember(s.registrations, f["registration_id"], uri)
+        return uri
+
+    def drop(self, stream: str) -> None:
+        self.sessions.pop(stream, None)
+
+def parse_wamp_array(text: str) -> Tuple[str, str, List[Any], Dict[str, Any]]:
+    """
+    Versión sin estado de WampSessions.decode: topic/procedure sólo cuando
+    el propio mensaje lo lleva (PUBLISH, SUBSCRIBE, CALL, REGISTER).
+    Devuelve (opcode, topic_or_proc, args, kwargs).
+    """
+    return WampSessions().decode("", text)[:4]
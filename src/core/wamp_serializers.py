@@ -0,0 +1,118 @@
+
+# -*- coding: utf-8 -*-
+"""
+Serializadores WAMP sobre WebSocket.
+
+El subprotocolo se negocia en el handshake (Sec-WebSocket-Protocol de la
+respuesta 101): wamp.2.json, wamp.2.msgpack, wamp.2.cbor y sus variantes
+.batched. JSON va en frames de texto; msgpack/CBOR en frames binarios
+(opcode 2). msgpack y cbor2 son opcionales: sin ellos esos mensajes se
+descartan como antes.
+"""
+import base64
+import importlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import jsoncodec
+
+JSON, MSGPACK, CBOR = "json", "msgpack", "cbor"
+# subprotocolo -> (serializador, batched)
+SUBPROTOCOLS = {
+    "wamp.2.json": (JSON, False),
+    "wamp.2.json.batched": (JSON, True),
+    "wamp.2.msgpack": (MSGPACK, False),
+    "wamp.2.msgpack.batched": (MSGPACK, True),
+    "wamp.2.cbor": (CBOR, False),
+    "wamp.2.cbor.batched": (CBOR, True),
+}
+# sin handshake visto: texto como JSON y binario probando msgpack y después CBOR
+DEFAULT_PROTOCOL = ("", False)
+# separador de wamp.2.json.batched (ASCII Record Separator)
+JSON_BATCH_SEP = "\x1e"
+
+def parse_subprotocol(header: str) -> Tuple[str, bool]:
+    """Sec-WebSocket-Protocol -> (serializador, batched); DEFAULT_PROTOCOL si no es WAMP."""
+    for p in (header or "").split(","):
+        proto = SUBPROTOCOLS.get(p.strip().lower())
+        if proto is not None:
+            return proto
+    return DEFAULT_PROTOCOL
+
+# opcionales, importados al ver el primer mensaje binario (no pesan en el arranque)
+_MODULES = {MSGPACK: "msgpack", CBOR: "cbor2"}
+_loaded: Dict[str, Optional[Any]] = {}
+
+def _module(serializer: str) -> Optional[Any]:
+    if serializer not in _loaded:
+        try:
+            _loaded[serializer] = importlib.import_module(_MODULES[serializer])
+        except ImportError:
+            _loaded[serializer] = None
+    return _loaded[serializer]
+
+def available(serializer: str) -> bool:
+    return serializer == JSON or (serializer in _MODULES and _module(serializer) is not None)
+
+def _loads(serializer: str, data: bytes) -> Any:
+    if serializer == MSGPACK:
+        mod = _module(MSGPACK)
+        if mod is None:
+            raise ValueError("msgpack no instalado")
+        return mod.unpackb(data, raw=False, strict_map_key=False)
+    if serializer == CBOR:
+        mod = _module(CBOR)
+        if mod is None:
+            raise ValueError("cbor2 no instalado")
+        return mod.loads(data)
+    raise ValueError(f"Serializador binario no soportado: {serializer}")
+
+def _split_length_prefixed(data: bytes) -> List[bytes]:
+    """Variante .batched binaria: cada mensaje lleva delante su longitud (uint32 big-endian)."""
+    out = []
+    mv = memoryview(data)
+    pos, n = 0, len(data)
+    while pos < n:
+        if pos + 4 > n:
+            raise ValueError("lote truncado")
+        size = int.from_bytes(mv[pos:pos + 4], "big")
+        pos += 4
+        if pos + size > n:
+            raise ValueError("lote truncado")
+        out.append(bytes(mv[pos:pos + size]))
+        pos += size
+    return out
+
+def unpack_binary(serializer: str, batched: bool, data: bytes) -> Tuple[str, List[Any]]:
+    """
+    Payload de un mensaje binario -> (serializador usado, mensajes WAMP decodificados).
+    Sin serializador conocido prueba msgpack y después CBOR.
+    Lanza ValueError si no se puede decodificar.
+    """
+    candidates = [serializer] if serializer in (MSGPACK, CBOR) else [s for s in (MSGPACK, CBOR) if available(s)]
+    for s in candidates:
+        try:
+            parts = _split_length_prefixed(data) if batched else [data]
+            return s, [to_jsonable(_loads(s, p)) for p in parts]
+        except Exception:
+            continue
+    raise ValueError("payload binario no decodificable")
+
+def to_jsonable(v: Any) -> Any:
+    """Tipos de msgpack/CBOR -> tipos JSON (bytes en base64, claves como str)."""
+    if v is None or isinstance(v, (str, bool, int, float)):
+        return v
+    if isinstance(v, (list, tuple)):
+        return [to_jsonable(x) for x in v]
+    if isinstance(v, dict):
+        return {k if isinstance(k, str) else str(k): to_jsonable(x) for k, x in v.items()}
+    if isinstance(v, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(v)).decode("ascii")
+    return str(v)
+
+def dumps(obj: Any) -> str:
+    """Texto para la columna raw de un mensaje binario."""
+    return jsoncodec.dumps(obj)
+
+def split_json_batch(text: str) -> List[str]:
+    """wamp.2.json.batched: mensajes terminados en \\x1e."""
+    return [t for t in text.split(JSON_BATCH_SEP) if t.strip()]
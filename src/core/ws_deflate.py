@@ -0,0 +1,145 @@
+
+# -*- coding: utf-8 -*-
+"""
+permessage-deflate (RFC 7692) para el reensamblado WebSocket.
+
+Los parámetros se leen de Sec-WebSocket-Extensions en la respuesta 101
+del handshake. Cada sentido de la conexión mantiene su propio
+decompressobj, así que los mensajes que reutilizan la ventana deslizante
+de los anteriores (context takeover) se descomprimen bien; con
+*_no_context_takeover el contexto se reinicia en cada mensaje.
+
+Lo descomprimido de un mensaje está acotado por el mismo tope por stream
+que los búferes de reensamblado (reassembly.STREAM_MAX_BYTES): un mensaje
+pequeño que se infla a gigas no llega a ocupar memoria.
+"""
+import zlib
+from typing import Dict, Optional, Tuple
+
+from . import reassembly
+
+# cola que el emisor quita de cada mensaje comprimido (RFC 7692 §7.2.2)
+DEFLATE_TAIL = b"\x00\x00\xff\xff"
+# RSV1 dentro de los 3 bits de reserva (b0 >> 4) & 7
+RSV1 = 0x4
+
+class MessageTooLarge(ValueError):
+    """El mensaje descomprimido pasa del tope; `size` son los bytes que ocupaba."""
+
+    def __init__(self, size: int):
+        super().__init__(f"mensaje descomprimido de más de {size} bytes")
+        self.size = size
+
+class DeflateParams:
+    """Parámetros negociados de permessage-deflate."""
+    __slots__ = ("server_no_context_takeover", "client_no_context_takeover",
+                 "server_max_window_bits", "client_max_window_bits")
+
+    def __init__(self):
+        self.server_no_context_takeover = False
+        self.client_no_context_takeover = False
+        self.server_max_window_bits = 15
+        self.client_max_window_bits = 15
+
+    def no_context_takeover(self, from_server: bool) -> bool:
+        return self.server_no_context_takeover if from_server else self.client_no_context_takeover
+
+def parse_extensions(header: str) -> Optional[DeflateParams]:
+    """
+    Sec-WebSocket-Extensions -> DeflateParams si se aceptó permessage-deflate.
+    Ej.: 'permessage-deflate; client_max_window_bits=12; server_no_context_takeover'
+    """
+    for ext in (header or "").split(","):
+        parts = [p.strip() for p in ext.split(";")]
+        if parts[0].lower() != "permessage-deflate":
+            continue
+        params = DeflateParams()
+        for p in parts[1:]:
+            name, _, value = p.partition("=")
+            name = name.strip().lower()
+            value = value.strip().strip('"')
+            if name in ("server_no_context_takeover", "client_no_context_takeover"):
+                setattr(params, name, True)
+            elif name in ("server_max_window_bits", "client_max_window_bits") and value.isdigit():
+                setattr(params, name, min(15, max(8, int(value))))
+        return params
+    return None
+
+class Inflater:
+    """
+    Descompresor de un sentido de la conexión. La ventana negociada
+    (*_max_window_bits) no hace falta aquí: una ventana de 15 bits
+    descomprime cualquier flujo hecho con una ventana menor.
+    """
+    __slots__ = ("no_context_takeover", "max_bytes", "_d", "errors", "oversized")
+
+    def __init__(self, no_context_takeover: bool = False, max_bytes: int = reassembly.STREAM_MAX_BYTES):
+        self.no_context_takeover = no_context_takeover
+        self.max_bytes = max_bytes
+        self._d = None
+        self.errors = 0
+        self.oversized = 0
+
+    def inflate(self, data: bytes) -> Optional[bytes]:
+        """
+        Mensaje descomprimido, o None si no se puede (p. ej. captura empezada
+        a mitad). Lanza MessageTooLarge si pasa de max_bytes.
+        """
+        if self._d is None or self.no_context_takeover:
+            self._d = zlib.decompressobj(-zlib.MAX_WBITS)
+        d = self._d
+        limit = self.max_bytes
+        try:
+            out = d.decompress(data + DEFLATE_TAIL, limit)
+            if len(out) < limit:
+                return out
+            chunk = d.decompress(d.unconsumed_tail, limit)
+            if not chunk:
+                return out  # justo el tope
+            # más grande que el tope: el resto se descomprime por tramos y se
+            # tira, para que la ventana siga sirviendo a los mensajes siguientes
+            size = len(out) + len(chunk)
+            del out
+            while chunk:
+                chunk = d.decompress(d.unconsumed_tail, limit)
+                size += len(chunk)
+        except zlib.error:
+            # contexto perdido: se reinicia para los mensajes siguientes
+            self._d = None
+            self.errors += 1
+            return None
+        self.oversized += 1
+        raise MessageTooLarge(size)
+
+class DeflateStreams:
+    """Estado permessage-deflate por stream y sentido."""
+
+    def __init__(self, max_bytes: int = reassembly.STREAM_MAX_BYTES):
+        self.max_bytes = max_bytes
+        # stream -> (extremo servidor (ip, puerto), parámetros o None si no se negoció)
+        self.negotiated: Dict[object, Tuple[Tuple[str, int], Optional[DeflateParams]]] = {}
+        # stream -> {(ip, puerto) emisor: Inflater}
+        self.inflaters: Dict[object, Dict[Tuple[str, int], Inflater]] = {}
+
+    def handshake(self, stream, server_ip: str, server_port: int, extensions: str) -> None:
+        """Registra la respuesta 101 de un stream (la envía el servidor)."""
+        self.negotiated[stream] = ((server_ip, server_port), parse_extensions(extensions))
+        self.inflaters.pop(stream, None)
+
+    def inflate(self, stream, src: str, sport: int, data: bytes) -> Optional[bytes]:
+        per_dir = self.inflaters.get(stream)
+        if per_dir is None:
+            per_dir = self.inflaters[stream] = {}
+        inf = per_dir.get((src, sport))
+        if inf is None:
+            server, params = self.negotiated.get(stream, (None, None))
+            if params is None:
+                # sin handshake visto: valores por defecto (context takeover)
+                params = DeflateParams()
+            inf = per_dir[(src, sport)] = Inflater(params.no_context_takeover(server == (src, sport)),
+                                                  self.max_bytes)
+        return inf.inflate(data)
+
+    def drop(self, stream) -> None:
+        self.inflaters.pop(stream, None)
+        self.negotiated.pop(stream, None)
@@ -0,0 +1,61 @@
+
+# -*- coding: utf-8 -*-
+import csv
+import os
+import re
+from contextlib import ExitStack
+from typing import List, Dict, Optional
+from ..core.flat_view import FlatViews
+
+BASE_COLS = ["time","ms","epoch","stream","src","dst","opcode","topic","type"]
+
+def split_path(path: str, label: str, used: set) -> str:
+    """'mensajes.csv' + 'EV' -> 'mensajes_EV.csv' (nombre saneado y único)."""
+    root, ext = os.path.splitext(path)
+    name = re.sub(r"[^\w.-]+", "_", label).strip("_")[:40] or "sin_valor"
+    out = f"{root}_{name}{ext}"
+    n = 2
+    while out in used:
+        out = f"{root}_{name}_{n}{ext}"
+        n += 1
+    used.add(out)
+    return out
+
+def write_csv(path: str, records: List[Dict], views: Optional[FlatViews] = None,
+              split_by: Optional[str] = None) -> List[str]:
+    """
+    Columnas base + kwargs/args aplanados ('kw.…', 'args[i]…').
+    Con split_by ('type', 'opcode' o 'topic') escribe un CSV por valor, cada
+    uno sólo con las columnas de su grupo según el SchemaIndex.
+    Devuelve las rutas escritas.
+    """
+    if views is None or views.records is not records:
+        views = FlatViews(records, keep=False)
+    if not split_by:
+        keys = views.kv_keys()
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(BASE_COLS + keys)
+            for r in records:
+                flat = views.entry(r).kv
+                w.writerow([r.get(c,"") for c in BASE_COLS] + [flat.get(k,"") for k in keys])
+        return [path]
+
+    schema = views.sync(flat=False)
+    paths: List[str] = []
+    route = {}
+    used = set()
+    with ExitStack() as stack:
+        for label, values, group in schema.split(split_by):
+            out = split_path(path, label, used)
+            paths.append(out)
+            w = csv.writer(stack.enter_context(open(out, "w", newline="", encoding="utf-8")))
+            keys = sorted(group.kv.keys)
+            w.writerow(BASE_COLS + keys)
+            for v in values:
+                route[v] = (w, keys)
+        for r in records:
+            w, keys = route[str(r.get(split_by) or "")]
+            flat = views.entry(r).kv
+            w.writerow([r.get(c,"") for c in BASE_COLS] + [flat.get(k,"") for k in keys])
+    return paths
@@ -1,7 +1,8 @@
 
 # -*- coding: utf-8 -*-
-import json
-from typing import List, Dict
+from typing import List, Dict, Optional
+from ..core.flat_view import FlatViews, ndjson_payload
+from ..core.jsoncodec import dumps, loads
 
 def read_ndjson(path: str) -> list:
     items = []
@@ -10,17 +11,16 @@ def read_ndjson(path: str) -> list:
             line = line.strip()
             if not line: continue
             try:
-                items.append(json.loads(line))
+                items.append(loads(line))
             except Exception:
                 items.append({"raw": line})
     return items
 
-def write_ndjson(path: str, records: List[Dict]):
+def write_ndjson(path: str, records: List[Dict], views: Optional[FlatViews] = None):
     with open(path, "w", encoding="utf-8") as f:
+        if views is not None and views.records is records:
+            # líneas ya serializadas en la caché compartida
+            f.writelines(views.entry(r).ndjson_line for r in records)
+            return
         for r in records:
-            # guardamos raw si lo hay; si no, kwargs
-            if r.get("raw"):
-                payload = r["raw"]
-            else:
-                payload = r.get("kwargs", {})
-            f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+            f.write(dumps(ndjson_payload(r)) + "\n")
@@ -0,0 +1,81 @@
+
+# -*- coding: utf-8 -*-
+"""
+Registros volcados a disco para exportar sin tenerlos todos en memoria.
+
+SpoolWriter escribe los registros uno a uno (pickle secuencial) y
+RecordSpool los vuelve a leer tantas veces como haga falta: write_csv y
+export_to_xlsx recorren los registros dos veces (esquema y filas), y con
+un RecordSpool en lugar de la lista la memoria no depende de su número.
+"""
+import os
+import pickle
+from itertools import islice
+from typing import Dict, Iterator, List, Tuple
+
+Part = Tuple[str, int]   # (fichero, registros)
+
+
+class SpoolWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._f = open(path, "wb")
+        self._pickler = pickle.Pickler(self._f, pickle.HIGHEST_PROTOCOL)
+
+    def write(self, rec: Dict) -> None:
+        self._pickler.dump(rec)
+        # sin memo entre registros: si no, el pickler retendría todos
+        self._pickler.clear_memo()
+        self.count += 1
+
+    def close(self) -> Part:
+        self._f.close()
+        return self.path, self.count
+
+    def __enter__(self) -> "SpoolWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._f.close()
+
+
+def read_part(path: str) -> Iterator[Dict]:
+    with open(path, "rb") as f:
+        up = pickle.Unpickler(f)
+        while True:
+            try:
+                yield up.load()
+            except EOFError:
+                return
+
+
+class RecordSpool:
+    """
+    Secuencia de sólo lectura sobre uno o varios ficheros de SpoolWriter,
+    en orden. Admite len(), iteración repetida y cortes desde el principio
+    (records[:n]), que es lo que usan los exportadores.
+    """
+
+    def __init__(self, parts: List[Part]):
+        self.parts = list(parts)
+
+    def __len__(self) -> int:
+        return sum(n for _, n in self.parts)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for path, _ in self.parts:
+            yield from read_part(path)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.start not in (None, 0) or key.step not in (None, 1):
+            raise TypeError("RecordSpool sólo admite cortes desde el principio: records[:n]")
+        return list(islice(iter(self), key.stop))
+
+    def remove(self) -> None:
+        for path, _ in self.parts:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.parts = []
@@ -1,12 +1,50 @@
-
 # -*- coding: utf-8 -*-
-import sys
-from PyQt5 import QtWidgets
-from .app import Controller
+import sys, time
+_T0 = time.perf_counter()   # inicio de las fases de --startup-exit
+
+# cierra la app tras el primer ciclo de eventos e imprime las fases (lo usa src.startup)
+EXIT_FLAG = "--startup-exit"
+
+def _startup_report(argv):
+    """--startup-report / --startup-budget [S] / --startup-runs N: ver src/startup.py."""
+    import argparse
+    from . import startup
+    ap = argparse.ArgumentParser(prog="python -m src.main")
+    ap.add_argument("--startup-report", action="store_true", help="informe del arranque en frío")
+    ap.add_argument("--startup-budget", type=float, nargs="?", const=startup.STARTUP_BUDGET,
+                    help=f"código 1 si la mediana supera S segundos (por defecto {startup.STARTUP_BUDGET})")
+    ap.add_argument("--startup-runs", type=int, default=startup.RUNS)
+    opts = ap.parse_args(argv)
+    return startup.run(opts.startup_budget, opts.startup_runs)
 
 def main():
-    app = QtWidgets.QApplication(sys.argv)
+    if getattr(sys, "frozen", False):
+        import multiprocessing
+        multiprocessing.freeze_support()  # pool de extracción paralela en ejecutables congelados
+    args = sys.argv[1:]
+    if any(a.startswith("--startup-") and a != EXIT_FLAG for a in args):
+        sys.exit(_startup_report(args))
+    timed = EXIT_FLAG in args
+    phases = {}
+    mark = [_T0]
+    def phase(name):
+        now = time.perf_counter()
+        phases[name] = now - mark[0]
+        mark[0] = now
+    from PyQt5 import QtWidgets, QtCore
+    from .app import Controller
+    phase("imports")
+    app = QtWidgets.QApplication([a for a in sys.argv if a != EXIT_FLAG])
+    phase("qapp")
     c = Controller(app)
+    phase("window")
+    if timed:
+        def done():
+            phase("event_loop")
+            import json
+            print(json.dumps(phases), flush=True)
+            app.quit()
+        QtCore.QTimer.singleShot(0, done)
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Informe del arranque en frío de la GUI.
+
+    python -m src.main --startup-report
+    python -m src.main --startup-budget 1.5     # código 1 si se pasa (CI)
+
+Lanza la aplicación en un intérprete nuevo con -X importtime y
+--startup-exit (se cierra tras el primer ciclo de eventos), varias veces,
+y muestra el tiempo total, las fases (imports, QApplication, ventana,
+primer ciclo de eventos) y los imports que más pesan. No importa PyQt5
+en este proceso.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from .main import EXIT_FLAG
+
+# presupuesto por defecto de --startup-budget (segundos, mediana de las ejecuciones)
+STARTUP_BUDGET = 1.5
+RUNS = 3
+TOP_IMPORTS = 15
+PHASES = (("imports", "imports de la app"), ("qapp", "QApplication"),
+          ("window", "Controller y ventana"), ("event_loop", "primer ciclo de eventos"))
+
+
+class ImportTime(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(text: str) -> List[ImportTime]:
+    """Líneas 'import time: self | cumulative | módulo' de -X importtime."""
+    out = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|", 2)
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cum_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # cabecera
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        out.append(ImportTime(name.strip(), self_us, cum_us, depth))
+    return out
+
+
+def _child_env() -> Dict[str, str]:
+    env = dict(os.environ)
+    # sin display (CI, servidores) se arranca con la plataforma offscreen de Qt
+    if sys.platform.startswith("linux") and not (env.get("DISPLAY") or env.get("WAYLAND_DISPLAY")):
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return env
+
+
+def measure_once() -> Dict:
+    """Un arranque en frío: tiempo total, fases y tabla de imports."""
+    cmd = [sys.executable, "-X", "importtime", "-m", "src.main", EXIT_FLAG]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=root, env=_child_env(), capture_output=True, text=True)
+    total = time.perf_counter() - t0
+    phases = {}
+    for line in proc.stdout.splitlines():
+        if line.startswith("{"):
+            phases = json.loads(line)
+    if proc.returncode != 0 or not phases:
+        tail = "\n".join(proc.stderr.splitlines()[-5:])
+        raise RuntimeError(f"El arranque falló (código {proc.returncode}):\n{tail}")
+    return {"total": total, "phases": phases, "imports": parse_importtime(proc.stderr)}
+
+
+def format_report(runs: List[Dict], budget: Optional[float] = None) -> str:
+    totals = [r["total"] for r in runs]
+    median = statistics.median(totals)
+    best = min(runs, key=lambda r: r["total"])
+    lines = [f"Arranque en frío: mediana {median:.3f} s, mínimo {min(totals):.3f} s ({len(runs)} ejecuciones)"
+             + (f" — presupuesto {budget:.3f} s" if budget is not None else "")]
+    # fases de la ejecución más rápida; lo que no cubren es el intérprete
+    phases = best["phases"]
+    accounted = sum(phases.get(k, 0.0) for k, _ in PHASES)
+    lines.append(f"  {'intérprete y site':26s} {best['total'] - accounted:7.3f} s")
+    for key, label in PHASES:
+        lines.append(f"  {label:26s} {phases.get(key, 0.0):7.3f} s")
+    imports = best["imports"]
+    lines.append("Imports de primer nivel (acumulado / propio, ms):")
+    roots = sorted((i for i in imports if i.depth == 0), key=lambda i: -i.cumulative_us)
+    for i in roots[:TOP_IMPORTS]:
+        lines.append(f"  {i.cumulative_us / 1000:8.1f} {i.self_us / 1000:8.1f}  {i.module}")
+    lines.append("Módulos más lentos por tiempo propio (ms):")
+    for i in sorted(imports, key=lambda i: -i.self_us)[:TOP_IMPORTS]:
+        lines.append(f"  {i.self_us / 1000:8.1f}  {i.module}")
+    return "\n".join(lines)
+
+
+def run(budget: Optional[float] = None, runs: int = RUNS) -> int:
+    """Informe por stdout; con budget devuelve 1 si la mediana lo supera."""
+    try:
+        results = [measure_once() for _ in range(max(1, runs))]
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 2
+    print(format_report(results, budget))
+    if budget is None:
+        return 0
+    median = statistics.median(r["total"] for r in results)
+    if median > budget:
+        print(f"FALLO: arranque {median:.3f} s > presupuesto {budget:.3f} s", file=sys.stderr)
+        return 1
+    return 0
@@ -1,5 +1,6 @@
 
 # -*- coding: utf-8 -*-
+import os
 from PyQt5 import QtWidgets, QtCore
 
 class FiltersDialog(QtWidgets.QDialog):
@@ -13,16 +14,36 @@ class FiltersDialog(QtWidgets.QDialog):
         self.edDst = QtWidgets.QLineEdit(current.dst_ip)
         self.edSport = QtWidgets.QLineEdit(current.src_port)
         self.edDport = QtWidgets.QLineEdit(current.dst_port)
+        self.edStreams = QtWidgets.QLineEdit(current.streams)
+        for ed in (self.edSrc, self.edDst):
+            ed.setPlaceholderText("10.0.0.1, 192.168.0.0/16")
+        for ed in (self.edSport, self.edDport):
+            ed.setPlaceholderText("8080, 9000-9010")
+        self.edStreams.setPlaceholderText("0, 5, 10-20")
         self.cbMode = QtWidgets.QComboBox()
         self.cbMode.addItems(["AUTO","WAMP","TCPJSON"])
         idx = self.cbMode.findText(current.mode)
         if idx >= 0: self.cbMode.setCurrentIndex(idx)
+        self.cbBackend = QtWidgets.QComboBox()
+        self.cbBackend.addItems(["TSHARK","NATIVE"])
+        self.cbBackend.setToolTip("NATIVE: lector pcap/pcapng interno, no necesita Wireshark")
+        idx = self.cbBackend.findText(current.backend)
+        if idx >= 0: self.cbBackend.setCurrentIndex(idx)
+        self.spWorkers = QtWidgets.QSpinBox()
+        self.spWorkers.setRange(1, max(1, os.cpu_count() or 1))
+        self.spWorkers.setValue(current.workers)
+        self.spWorkers.setToolTip("Procesos en paralelo: la captura se reparte por TCP stream (sólo motor NATIVE)")
+        self.cbBackend.currentTextChanged.connect(lambda b: self.spWorkers.setEnabled(b == "NATIVE"))
+        self.spWorkers.setEnabled(self.cbBackend.currentText() == "NATIVE")
 
         form.addRow("IP origen:", self.edSrc)
         form.addRow("IP destino:", self.edDst)
         form.addRow("Puerto origen:", self.edSport)
         form.addRow("Puerto destino:", self.edDport)
+        form.addRow("TCP streams:", self.edStreams)
         form.addRow("Modo:", self.cbMode)
+        form.addRow("Motor:", self.cbBackend)
+        form.addRow("Procesos:", self.spWorkers)
 
         btns = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel)
         btns.accepted.connect(self.accept)
@@ -35,5 +56,8 @@ class FiltersDialog(QtWidgets.QDialog):
             "dst_ip": self.edDst.text().strip(),
             "src_port": self.edSport.text().strip(),
             "dst_port": self.edDport.text().strip(),
-            "mode": self.cbMode.currentText()
+            "streams": self.edStreams.text().strip(),
+            "mode": self.cbMode.currentText(),
+            "backend": self.cbBackend.currentText(),
+            "workers": self.spWorkers.value()
         }
@@ -26,18 +26,44 @@ Permite filtrar por IP/puerto y exportar a <b>CSV</b>, <b>NDJSON</b> y <b>Excel<
 <li>Hoja <b>Mensajes</b>: columnas básicas + campos aplanados del JSON (sin args/kwargs crudos).</li>
 <li>Los encabezados anidados comparten <b>mismo color</b> de fondo para identificar el grupo.</li>
 <li>Hoja <b>Raw</b>: incluye <i>args</i>, <i>kwargs</i> y <i>raw</i>.</li>
-<li>Hoja <b>Resumen</b>: conteo por <i>type</i> y <i>topic</i>.</li>
+<li>Hoja <b>Resumen</b>: conteo por <i>type</i> y <i>topic</i> y columnas JSON por <i>type</i>.</li>
+<li>Hoja <b>Latencias</b>: p50/p95/p99/max de CALL→RESULT/ERROR por procedure y de PUBLISH→EVENT
+por topic (requiere publicaciones con <i>acknowledge</i>), más mensajes por ventana de 1 s.
+El mismo análisis está en el panel <b>Ver → Latencias</b> (Ctrl+L).</li>
+<li><b>Exportar → Excel (una hoja por type)</b> / <b>CSV (un fichero por type)</b>: columnas densas
+por tipo de mensaje en lugar de una tabla ancha con miles de columnas vacías.</li>
+<li>Se escribe en streaming; por encima de 1.048.576 filas continúa en <i>Mensajes (2)</i>, <i>Raw (2)</i>…</li>
 </ul>
 
 <h3>Requisitos de sistema</h3>
 <p>Necesitas <code>tshark</code> instalado y accesible en PATH. La app ya activa
 la reensamblación TCP mediante <code>-o tcp.desegment_tcp_streams:true</code>.</p>
+<p>Con <b>Motor: NATIVE</b> se usa un lector pcap/pcapng interno (Ethernet/IPv4/IPv6/TCP
+y WebSocket) que no necesita Wireshark y evita lanzar tshark.</p>
+<p>Cada extracción completa se guarda en una caché en disco (<code>~/.cache/wamp_extractor/sessions</code>):
+reabrir la misma captura con el mismo modo y motor no vuelve a leer el PCAP. Si sólo cambian los filtros
+de IP/puerto/stream se reutiliza la extracción sin filtros. Se vacía en <b>Herramientas → Vaciar caché de sesiones</b>.</p>
+<p><b>Archivo → Seguir captura en curso…</b> (Ctrl+Shift+O) lee un pcap/pcapng que se está escribiendo
+(<code>dumpcap -w</code>, <code>tcpdump -w</code>) o una FIFO y añade los mensajes según llegan, siempre con
+el lector interno. La tabla guarda los últimos 200.000 mensajes (variable <code>WAMP_EXTRACTOR_FOLLOW_ROWS</code>)
+y descarta los más antiguos; las latencias siguen acumulando todo. <b>Cancelar</b> detiene el seguimiento.</p>
+
+<p>Los mensajes a medio reensamblar tienen un presupuesto de memoria (64 MB por stream, 512 MB en total,
+300 s de captura sin datos; ver README). Si se descarta alguno se indica en la barra de estado y en la hoja
+<b>Resumen</b>: capturas enormes con streams que nunca cierran su mensaje no agotan la memoria.</p>
 
 <h3>Consejos</h3>
 <ul>
-<li>Si tus mensajes WAMP están comprimidos, intentamos inflarlos automáticamente.</li>
+<li>Los mensajes comprimidos con <i>permessage-deflate</i> (RSV1) se descomprimen con el contexto de cada sentido, usando los parámetros negociados en la respuesta 101 del handshake.</li>
+<li>Los subprotocolos binarios <code>wamp.2.msgpack</code> y <code>wamp.2.cbor</code> (y sus variantes
+<i>.batched</i>) se decodifican si están instalados <code>msgpack</code> / <code>cbor2</code>.</li>
 <li>Para tráfico no-WAMP con JSON incrustado, usa <b>TCP-JSON</b>.</li>
 <li>Puedes limitar el análisis a un <b>router WAMP concreto</b> poniendo su IP en SRC/DST.</li>
+<li>IPs admiten listas y CIDR (<code>10.0.0.1, 192.168.0.0/16</code>); puertos y TCP streams
+admiten listas y rangos (<code>8080, 9000-9010</code>). Los filtros se aplican dentro de tshark
+(o antes del reensamblado en el motor NATIVE), así que reducen mucho el trabajo.</li>
+<li>La barra sobre la tabla filtra lo ya cargado por <i>topic</i>, <i>type</i>, IP origen/destino
+o texto en <i>raw</i> (sin volver a leer el PCAP). Pulsa un encabezado para ordenar.</li>
 </ul>
 """
 
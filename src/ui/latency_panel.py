@@ -0,0 +1,67 @@
+
+# -*- coding: utf-8 -*-
+import datetime as _dt
+from PyQt5 import QtCore, QtWidgets
+
+LAT_COLS = ["count", "errores", "p50 ms", "p95 ms", "p99 ms", "max ms"]
+
+class LatencyPanel(QtWidgets.QDockWidget):
+    """Panel acoplable con latencias RPC, entrega pub/sub y throughput por ventana."""
+
+    def __init__(self, parent=None):
+        super().__init__("Latencias", parent)
+        self.setObjectName("LatencyPanel")
+        tabs = QtWidgets.QTabWidget(self)
+        self.tblRpc = self._table(["Procedure"] + LAT_COLS)
+        self.tblPub = self._table(["Topic"] + LAT_COLS)
+        # columnas por tipo de mensaje: al recibir las primeras latencias
+        # (core.analytics no se importa en el arranque)
+        self.tblWin = self._table(["Inicio"])
+        tabs.addTab(self.tblRpc, "RPC")
+        tabs.addTab(self.tblPub, "Pub/Sub (acknowledge)")
+        tabs.addTab(self.tblWin, "Throughput")
+        self.lblInfo = QtWidgets.QLabel(self)
+        box = QtWidgets.QWidget(self)
+        lay = QtWidgets.QVBoxLayout(box)
+        lay.setContentsMargins(2, 2, 2, 2)
+        lay.addWidget(tabs)
+        lay.addWidget(self.lblInfo)
+        self.setWidget(box)
+
+    def _table(self, header):
+        t = QtWidgets.QTableWidget(0, len(header), self)
+        t.setHorizontalHeaderLabels(header)
+        t.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        t.verticalHeader().setVisible(False)
+        t.setSortingEnabled(True)
+        return t
+
+    @staticmethod
+    def _fill(table: QtWidgets.QTableWidget, rows):
+        table.setSortingEnabled(False)
+        table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            for c, v in enumerate(row):
+                item = QtWidgets.QTableWidgetItem()
+                if isinstance(v, float):
+                    item.setData(QtCore.Qt.DisplayRole, round(v, 3))
+                else:
+                    item.setData(QtCore.Qt.DisplayRole, v)
+                table.setItem(r, c, item)
+        table.setSortingEnabled(True)
+        table.resizeColumnsToContents()
+
+    def set_analytics(self, a: "WampAnalytics"):
+        from ..core.analytics import WINDOW_COLUMNS
+        if self.tblWin.columnCount() == 1:
+            self.tblWin.setColumnCount(1 + len(WINDOW_COLUMNS))
+            self.tblWin.setHorizontalHeaderLabels(["Inicio"] + WINDOW_COLUMNS)
+        self._fill(self.tblRpc, a.rpc_rows())
+        self._fill(self.tblPub, a.pubsub_rows())
+        fmt = lambda t: _dt.datetime.utcfromtimestamp(t).strftime("%H:%M:%S")
+        self._fill(self.tblWin, [[fmt(start)] + counts for start, counts in a.window_rows()])
+        self.lblInfo.setText(f"CALL sin respuesta: {a.pending_calls} — respuestas sin CALL: {a.unanswered}"
+                             f" — PUBLISH sin acknowledge: {a.unacknowledged}"
+                             f" — EVENT sin PUBLISHED: {a.unmatched_events} — ventana {a.window:g} s")
+        self.lblInfo.setToolTip("Pub/Sub sólo mide publicaciones con acknowledge=True: sin PUBLISHED "
+                                "no hay publication_id con el que emparejar PUBLISH y EVENT.")
@@ -1,6 +1,7 @@
 
 # -*- coding: utf-8 -*-
 from PyQt5 import QtCore, QtWidgets, QtGui
+from .latency_panel import LatencyPanel
 
 class MessagesTable(QtWidgets.QTableView):
     def __init__(self, parent=None):
@@ -14,6 +15,10 @@ class MessagesTable(QtWidgets.QTableView):
         self.horizontalHeader().setDefaultAlignment(QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter)
         self.setShowGrid(False)
         self.setWordWrap(False)
+        # altura de fila fija: Qt no mide cada fila al desplazarse
+        vh = self.verticalHeader()
+        vh.setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
+        vh.setDefaultSectionSize(self.fontMetrics().height() + 6)
         self.setStyleSheet("""
             QTableView { gridline-color:#555; }
             QTableView::item:selected { background:#444; }
@@ -23,15 +28,67 @@ class MessagesTable(QtWidgets.QTableView):
             }
         """)
 
+class FilterBar(QtWidgets.QWidget):
+    """Filtros rápidos sobre la tabla; emite el spec tras una pausa al teclear."""
+    filterChanged = QtCore.pyqtSignal(dict)
+    DEBOUNCE_MS = 250
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        lay = QtWidgets.QHBoxLayout(self)
+        lay.setContentsMargins(4, 4, 4, 0)
+        self.edTopic = QtWidgets.QLineEdit(self)
+        self.edType = QtWidgets.QLineEdit(self)
+        self.edAddr = QtWidgets.QLineEdit(self)
+        self.edRaw = QtWidgets.QLineEdit(self)
+        self.edTopic.setPlaceholderText("Topic")
+        self.edType.setPlaceholderText("Type")
+        self.edAddr.setPlaceholderText("Src/Dst")
+        self.edRaw.setPlaceholderText("Texto en raw")
+        self.btnClear = QtWidgets.QPushButton("Limpiar", self)
+        for ed in (self.edTopic, self.edType, self.edAddr, self.edRaw):
+            lay.addWidget(ed)
+            ed.textChanged.connect(self._schedule)
+        lay.addWidget(self.btnClear)
+        self.btnClear.clicked.connect(self.clear)
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.DEBOUNCE_MS)
+        self._timer.timeout.connect(lambda: self.filterChanged.emit(self.spec()))
+
+    def _schedule(self, *_):
+        self._timer.start()
+
+    def spec(self) -> dict:
+        return {
+            "topic": self.edTopic.text().strip(),
+            "type": self.edType.text().strip(),
+            ("src", "dst"): self.edAddr.text().strip(),
+            "raw": self.edRaw.text(),
+        }
+
+    def clear(self):
+        for ed in (self.edTopic, self.edType, self.edAddr, self.edRaw):
+            ed.blockSignals(True)
+            ed.clear()
+            ed.blockSignals(False)
+        self._timer.stop()
+        self.filterChanged.emit(self.spec())
+
 class MainWindow(QtWidgets.QMainWindow):
     requestOpenPcap = QtCore.pyqtSignal()
     requestOpenNdjson = QtCore.pyqtSignal()
+    requestFollowCapture = QtCore.pyqtSignal()
     requestExportCsv = QtCore.pyqtSignal()
     requestExportNdjson = QtCore.pyqtSignal()
     requestExportXlsx = QtCore.pyqtSignal()
+    requestExportCsvByType = QtCore.pyqtSignal()
+    requestExportXlsxByType = QtCore.pyqtSignal()
     requestFilters = QtCore.pyqtSignal()
+    requestClearCache = QtCore.pyqtSignal()
     requestHelp = QtCore.pyqtSignal()
     requestAbout = QtCore.pyqtSignal()
+    requestCancel = QtCore.pyqtSignal()
 
     def __init__(self, controller, parent=None):
         super().__init__(parent)
@@ -39,60 +96,105 @@ class MainWindow(QtWidgets.QMainWindow):
         self.setWindowTitle("WAMP Extractor Pro — PyQt5")
         self.resize(1200, 700)
 
+        self.filterBar = FilterBar(self)
         self.table = MessagesTable(self)
-        self.setCentralWidget(self.table)
+        central = QtWidgets.QWidget(self)
+        lay = QtWidgets.QVBoxLayout(central)
+        lay.setContentsMargins(0, 0, 0, 0)
+        lay.setSpacing(2)
+        lay.addWidget(self.filterBar)
+        lay.addWidget(self.table)
+        self.setCentralWidget(central)
+
+        self.latencyPanel = LatencyPanel(self)
+        self.addDockWidget(QtCore.Qt.BottomDockWidgetArea, self.latencyPanel)
+        self.latencyPanel.hide()
 
         self._build_menu_toolbar()
         self._apply_dark_theme()
 
         self.status = self.statusBar()
         self.status.showMessage("Listo")
+        self.progress = QtWidgets.QProgressBar(self)
+        self.progress.setMaximumWidth(220)
+        self.progress.setTextVisible(True)
+        self.btnCancel = QtWidgets.QPushButton("Cancelar", self)
+        self.btnCancel.clicked.connect(self.requestCancel.emit)
+        self.status.addPermanentWidget(self.progress)
+        self.status.addPermanentWidget(self.btnCancel)
+        self.progress.hide()
+        self.btnCancel.hide()
 
         self.requestOpenPcap.connect(self.controller.open_pcap)
         self.requestOpenNdjson.connect(self.controller.open_ndjson)
+        self.requestFollowCapture.connect(self.controller.follow_capture)
         self.requestExportCsv.connect(self.controller.export_csv)
         self.requestExportNdjson.connect(self.controller.export_ndjson)
         self.requestExportXlsx.connect(self.controller.export_xlsx)
+        self.requestExportCsvByType.connect(self.controller.export_csv_by_type)
+        self.requestExportXlsxByType.connect(self.controller.export_xlsx_by_type)
         self.requestFilters.connect(self.controller.open_filters_dialog)
+        self.requestClearCache.connect(self.controller.clear_cache)
         self.requestHelp.connect(self.controller.show_help)
         self.requestAbout.connect(self.controller.show_about)
+        self.requestCancel.connect(self.controller.cancel_processing)
+        self.filterBar.filterChanged.connect(self.controller.apply_table_filter)
 
     def _build_menu_toolbar(self):
         menubar = self.menuBar()
         mArchivo = menubar.addMenu("&Archivo")
         mExport = menubar.addMenu("&Exportar")
         mHerr = menubar.addMenu("&Herramientas")
+        mVer = menubar.addMenu("&Ver")
         mAyuda = menubar.addMenu("&Ayuda")
 
         actOpenPcap = QtWidgets.QAction("Abrir PCAP/PCAPNG", self)
         actOpenNdjson = QtWidgets.QAction("Abrir NDJSON", self)
+        actFollow = QtWidgets.QAction("Seguir captura en curso…", self)
         actExportCSV = QtWidgets.QAction("Exportar CSV", self)
         actExportNDJ = QtWidgets.QAction("Exportar NDJSON", self)
         actExportXLSX = QtWidgets.QAction("Exportar Excel", self)
+        actExportCSVType = QtWidgets.QAction("Exportar CSV (un fichero por type)", self)
+        actExportXLSXType = QtWidgets.QAction("Exportar Excel (una hoja por type)", self)
         actFilters = QtWidgets.QAction("Filtros / Modo…", self)
+        actClearCache = QtWidgets.QAction("Vaciar caché de sesiones", self)
         actHelp = QtWidgets.QAction("Ver ayuda", self)
         actAbout = QtWidgets.QAction("Acerca de", self)
 
         actOpenPcap.setShortcut("Ctrl+O")
+        actFollow.setShortcut("Ctrl+Shift+O")
         actExportXLSX.setShortcut("Ctrl+E")
         actFilters.setShortcut("Ctrl+F")
         actHelp.setShortcut("F1")
 
         actOpenPcap.triggered.connect(self.requestOpenPcap.emit)
         actOpenNdjson.triggered.connect(self.requestOpenNdjson.emit)
+        actFollow.triggered.connect(self.requestFollowCapture.emit)
         actExportCSV.triggered.connect(self.requestExportCsv.emit)
         actExportNDJ.triggered.connect(self.requestExportNdjson.emit)
         actExportXLSX.triggered.connect(self.requestExportXlsx.emit)
+        actExportCSVType.triggered.connect(self.requestExportCsvByType.emit)
+        actExportXLSXType.triggered.connect(self.requestExportXlsxByType.emit)
         actFilters.triggered.connect(self.requestFilters.emit)
+        actClearCache.triggered.connect(self.requestClearCache.emit)
         actHelp.triggered.connect(self.requestHelp.emit)
         actAbout.triggered.connect(self.requestAbout.emit)
 
         mArchivo.addAction(actOpenPcap)
         mArchivo.addAction(actOpenNdjson)
+        mArchivo.addSeparator()
+        mArchivo.addAction(actFollow)
         mExport.addAction(actExportCSV)
         mExport.addAction(actExportNDJ)
         mExport.addAction(actExportXLSX)
+        mExport.addSeparator()
+        mExport.addAction(actExportCSVType)
+        mExport.addAction(actExportXLSXType)
         mHerr.addAction(actFilters)
+        mHerr.addAction(actClearCache)
+        actLatency = self.latencyPanel.toggleViewAction()
+        actLatency.setShortcut("Ctrl+L")
+        mVer.addAction(actLatency)
         mAyuda.addAction(actHelp)
         mAyuda.addAction(actAbout)
 
@@ -138,12 +240,58 @@ class MainWindow(QtWidgets.QMainWindow):
         pal.setColor(QtGui.QPalette.HighlightedText, QtCore.Qt.white)
         self.setPalette(pal)
 
+    # filas muestreadas para estimar el ancho de columna
+    WIDTH_SAMPLE = 200
+
     def set_model(self, model: QtCore.QAbstractItemModel):
         self.table.setModel(model)
         header = self.table.horizontalHeader()
-        # ajusta algunas columnas
-        for cid in range(model.columnCount()):
-            header.setSectionResizeMode(cid, QtWidgets.QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(QtWidgets.QHeaderView.Interactive)
+        model.modelReset.connect(self.autosize_columns)
+        model.rowsInserted.connect(self._on_rows_inserted)
+        self.autosize_columns()
+
+    def _on_rows_inserted(self, parent, first, last):
+        # sólo el primer lote: después los anchos ya están estimados
+        if first < self.WIDTH_SAMPLE:
+            self.autosize_columns()
+
+    def autosize_columns(self):
+        """Ancho por columna a partir de una muestra de filas (no de todas)."""
+        model = self.table.model()
+        if model is None:
+            return
+        fm = self.table.fontMetrics()
+        hfm = self.table.horizontalHeader().fontMetrics()
+        n = model.rowCount()
+        step = max(1, n // self.WIDTH_SAMPLE)
+        rows = range(0, n, step)
+        for c in range(model.columnCount()):
+            w = hfm.horizontalAdvance(str(model.headerData(c, QtCore.Qt.Horizontal)))
+            for r in rows:
+                w = max(w, fm.horizontalAdvance(model.data(model.index(r, c)) or ""))
+            self.table.setColumnWidth(c, min(w + 24, 400))
 
     def show_message(self, text, timeout_ms=3000):
         self.statusBar().showMessage(text, timeout_ms)
+
+    # ----------------- progreso -----------------
+
+    def start_progress(self):
+        self.progress.setRange(0, 0)
+        self.progress.show()
+        self.btnCancel.setEnabled(True)
+        self.btnCancel.show()
+
+    def show_progress(self, done: int, total: int):
+        if total > 0:
+            self.progress.setRange(0, 1000)
+            self.progress.setValue(int(done * 1000 // total))
+            self.progress.setFormat(f"{done * 100 // total}%")
+        else:
+            # tshark: no se conoce el total, se muestran tramas procesadas
+            self.statusBar().showMessage(f"Procesando PCAP… {done} tramas")
+
+    def stop_progress(self):
+        self.progress.hide()
+        self.btnCancel.hide()
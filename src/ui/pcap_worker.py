@@ -0,0 +1,85 @@
+
+# -*- coding: utf-8 -*-
+import time
+from typing import Optional
+from PyQt5 import QtCore
+from ..core.pcap_parser import Filters, CancelToken, Cancelled
+from ..core.pcap_processor import iter_pcap_records, follow_records
+from ..core.flat_view import FlatViews
+from ..core.session_cache import SessionCache
+
+# Un lote se emite al llegar a BATCH_MAX registros o tras BATCH_SECONDS
+BATCH_MAX = 5000
+BATCH_SECONDS = 0.25
+
+class PcapWorker(QtCore.QObject):
+    """
+    Extrae el PCAP fuera del hilo de la GUI y entrega los registros por
+    lotes, para que la tabla se vaya llenando mientras tshark sigue.
+    Con `views` también saca aquí las claves aplanadas de cada lote
+    (FlatViews.prepare), así el esquema de columnas está listo al terminar
+    sin pasadas en la GUI.
+    Con `cache` guarda la extracción completa (no cancelada) al terminar.
+    Con `follow` sigue una captura en curso (fichero que crece o FIFO)
+    hasta que se cancela; los lotes salen también cuando no llega nada.
+    """
+    batchReady = QtCore.pyqtSignal(list, list)          # registros, claves aplanadas (o [])
+    progress = QtCore.pyqtSignal("qint64", "qint64")   # hecho, total (0 = desconocido)
+    finished = QtCore.pyqtSignal(bool)                 # True si se canceló
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, path: str, filters: Filters, cancel: CancelToken, views: Optional[FlatViews] = None,
+                 cache: Optional[SessionCache] = None, follow: bool = False):
+        super().__init__()
+        self.path = path
+        self.filters = filters
+        self.cancel = cancel
+        self.views = views
+        self.cache = cache
+        self.follow = follow
+        self.stats = {}
+
+    def _emit(self, batch: list):
+        keys = self.views.prepare(batch) if self.views is not None else []
+        self.batchReady.emit(batch, keys)
+
+    def _on_progress(self, done: int, total: int):
+        self.progress.emit(done, total)
+
+    @QtCore.pyqtSlot()
+    def run(self):
+        batch = []
+        records = [] if self.cache is not None else None
+        last = time.monotonic()
+        cancelled = False
+        try:
+            if self.follow:
+                source = follow_records(self.path, self.filters, self.cancel, stats=self.stats)
+            else:
+                source = iter_pcap_records(self.path, self.filters, self.cancel, self._on_progress, self.stats)
+            for rec in source:
+                if rec is not None:      # None: seguimiento sin datos nuevos
+                    batch.append(rec)
+                    if records is not None:
+                        records.append(rec)
+                now = time.monotonic()
+                if batch and (len(batch) >= BATCH_MAX or now - last >= BATCH_SECONDS):
+                    self._emit(batch)
+                    batch = []
+                    last = now
+        except Cancelled:
+            cancelled = True
+        except Exception as e:
+            if batch:
+                self._emit(batch)
+            self.failed.emit(str(e))
+            return
+        # tras cancelar no sale nada más que finished: la GUI puede estar ya en otra sesión
+        if batch and not cancelled:
+            self._emit(batch)
+        if records is not None and not cancelled:
+            try:
+                self.cache.store(self.path, self.filters, records, self.stats.get("buffers"))
+            except OSError:
+                pass  # sin caché: la próxima apertura vuelve a extraer
+        self.finished.emit(cancelled)
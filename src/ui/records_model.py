@@ -0,0 +1,175 @@
+
+# -*- coding: utf-8 -*-
+import sys
+from array import array
+from typing import List, Dict, Any, Optional, Callable
+from PyQt5 import QtCore
+from .row_index import RowIndex
+
+def _to_float(v) -> float:
+    try:
+        return float(v or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+class RecordsModel(QtCore.QAbstractTableModel):
+    """
+    Modelo virtual de la tabla de mensajes. Guarda sólo las columnas
+    visibles en arrays compactos (epoch en array('d'), textos internados)
+    y formatea cada celda bajo demanda en data(): no hay un objeto Qt por
+    celda, así que memoria y tiempo de carga no dependen del tamaño.
+    Ordenación y filtrado se resuelven con RowIndex sobre esas columnas:
+    la vista es una lista de filas de origen.
+    """
+    COLS = ["time","ms","epoch","stream","src","dst","opcode","topic","type"]
+    NUMERIC = {"epoch"}
+    # columnas de pocos valores distintos: se internan para compartir cadenas
+    INTERNED = {"time","stream","src","dst","opcode","topic","type"}
+    # claves de ordenación numéricas (no lexicográficas)
+    SORT_NUMERIC = ("epoch","stream","ms")
+    # columnas no visibles que se guardan para filtrar (referencias, sin copia)
+    HIDDEN = ["raw"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cols: Dict[str, Any] = self._empty_cols()
+        self._rows = 0
+        self._index = RowIndex(self._cols, self.SORT_NUMERIC)
+        self._spec: Dict[object, str] = {}
+        self._sort_col: Optional[str] = None
+        self._descending = False
+        self._view: Optional[List[int]] = None   # filas de origen visibles; None = todas
+        self._tooltip: Optional[Callable[[int], str]] = None
+
+    def _empty_cols(self) -> Dict[str, Any]:
+        cols = {c: (array("d") if c in self.NUMERIC else []) for c in self.COLS}
+        for c in self.HIDDEN:
+            cols[c] = []
+        return cols
+
+    def _extend(self, items: List[Dict]):
+        intern = sys.intern
+        for c in self.COLS:
+            col = self._cols[c]
+            if c in self.NUMERIC:
+                try:
+                    col.extend([float(r.get(c) or 0.0) for r in items])
+                except (TypeError, ValueError):
+                    col.extend(_to_float(r.get(c)) for r in items)
+            elif c in self.INTERNED:
+                col.extend(map(intern, map(str, [r.get(c, "") for r in items])))
+            else:
+                col.extend(map(str, [r.get(c, "") for r in items]))
+        for c in self.HIDDEN:
+            self._cols[c].extend(map(str, [r.get(c, "") for r in items]))
+        self._rows += len(items)
+        self._index.invalidate()
+
+    def load(self, items: List[Dict]):
+        self.beginResetModel()
+        self._cols = self._empty_cols()
+        self._index = RowIndex(self._cols, self.SORT_NUMERIC)
+        self._rows = 0
+        self._extend(items)
+        self._rebuild_view()
+        self.endResetModel()
+
+    def append(self, items: List[Dict]):
+        if not items:
+            return
+        first = self._rows
+        if self._view is None:
+            self.beginInsertRows(QtCore.QModelIndex(), first, first + len(items) - 1)
+            self._extend(items)
+            self.endInsertRows()
+            return
+        self._extend(items)
+        # con orden/filtro activo las filas nuevas que pasan el filtro se
+        # añaden al final; el siguiente sort() las coloca en su sitio
+        new = list(range(first, self._rows))
+        if any(self._spec.values()):
+            sub = RowIndex({c: v[first:] for c, v in self._cols.items()}, self.SORT_NUMERIC)
+            new = [first + i for i in (sub.select(self._spec) or [])]
+        if new:
+            n = len(self._view)
+            self.beginInsertRows(QtCore.QModelIndex(), n, n + len(new) - 1)
+            self._view.extend(new)
+            self.endInsertRows()
+
+    def drop_first(self, n: int):
+        """Quita las n filas de origen más antiguas (búfer circular del seguimiento en vivo)."""
+        n = min(n, self._rows)
+        if n <= 0:
+            return
+        if self._view is None:
+            self.beginRemoveRows(QtCore.QModelIndex(), 0, n - 1)
+        else:
+            self.beginResetModel()
+        for col in self._cols.values():
+            del col[:n]
+        self._rows -= n
+        self._index.invalidate()
+        if self._view is None:
+            self.endRemoveRows()
+        else:
+            # las filas de origen se desplazan n posiciones; el orden se conserva
+            self._view = [r - n for r in self._view if r >= n]
+            self.endResetModel()
+
+    def _rebuild_view(self):
+        view = self._index.view(self._index.select(self._spec), self._sort_col, self._descending)
+        self._view = None if view is None else list(view)
+
+    def set_filter(self, spec: Dict[object, str]):
+        """spec: {columna | (col1, col2): texto}; 'raw' busca subcadena en el mensaje crudo."""
+        self.beginResetModel()
+        self._spec = dict(spec)
+        self._rebuild_view()
+        self.endResetModel()
+
+    def visible_count(self) -> int:
+        return self.rowCount()
+
+    def total_count(self) -> int:
+        return self._rows
+
+    def source_row(self, row: int) -> int:
+        return row if self._view is None else self._view[row]
+
+    def cell_text(self, row: int, col: int) -> str:
+        return str(self._cols[self.COLS[col]][self.source_row(row)])
+
+    # ----------------- QAbstractTableModel -----------------
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._rows if self._view is None else len(self._view)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLS)
+
+    def set_tooltip_provider(self, fn: Optional[Callable[[int], str]]):
+        """fn(fila de origen) -> texto del tooltip (p. ej. el JSON aplanado)."""
+        self._tooltip = fn
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == QtCore.Qt.DisplayRole:
+            return self.cell_text(index.row(), index.column())
+        if role == QtCore.Qt.ToolTipRole and self._tooltip is not None:
+            return self._tooltip(self.source_row(index.row())) or None
+        return None
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+            return self.COLS[section]
+        return None
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        self._sort_col = self.COLS[column] if 0 <= column < len(self.COLS) else None
+        self._descending = order == QtCore.Qt.DescendingOrder
+        self._rebuild_view()
+        self.layoutChanged.emit()
@@ -0,0 +1,148 @@
+
+# -*- coding: utf-8 -*-
+"""
+Índices de ordenación y filtrado para la tabla de mensajes (sin Qt).
+
+Por columna se calculan una sola vez, bajo demanda, el agrupamiento
+valor -> filas y la permutación ascendente con claves tipadas
+(epoch/stream/ms numéricos). Reordenar reutiliza la permutación y
+filtrar evalúa cada valor distinto una vez, no cada fila.
+"""
+from array import array
+from itertools import chain
+from typing import Callable, Dict, List, Optional, Sequence
+
+def _num_key(v) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return float("-inf")
+
+class RowIndex:
+    # por encima de esta proporción de valores distintos no compensa agrupar
+    GROUP_MAX_RATIO = 0.25
+
+    def __init__(self, columns: Dict[str, Sequence], numeric: Sequence[str] = ()):
+        self.columns = columns
+        self.numeric = set(numeric)
+        self._groups: Dict[str, Optional[Dict[object, array]]] = {}
+        self._order: Dict[str, array] = {}
+        self._rank: Dict[str, array] = {}
+
+    def invalidate(self):
+        self._groups.clear()
+        self._order.clear()
+        self._rank.clear()
+
+    def __len__(self):
+        col = next(iter(self.columns.values()), ())
+        return len(col)
+
+    def groups(self, col: str) -> Optional[Dict[object, array]]:
+        """valor -> filas (en orden), o None si la columna tiene demasiados valores distintos."""
+        if col not in self._groups:
+            values = self.columns[col]
+            limit = max(64, int(len(values) * self.GROUP_MAX_RATIO))
+            g: Dict[object, array] = {}
+            for i, v in enumerate(values):
+                rows = g.get(v)
+                if rows is None:
+                    if len(g) >= limit:
+                        g = None
+                        break
+                    rows = g[v] = array("l")
+                rows.append(i)
+            self._groups[col] = g
+        return self._groups[col]
+
+    def order(self, col: str) -> array:
+        """Permutación ascendente de filas según la columna (cacheada)."""
+        perm = self._order.get(col)
+        if perm is None:
+            values = self.columns[col]
+            n = len(values)
+            key: Callable = _num_key if col in self.numeric else str
+            g = self.groups(col)
+            if g is not None:
+                perm = array("l")
+                for v in sorted(g, key=key):
+                    perm.extend(g[v])
+            elif col in self.numeric:
+                keys = values if isinstance(values, array) else [_num_key(v) for v in values]
+                if all(keys[i] <= keys[i + 1] for i in range(n - 1)):
+                    perm = array("l", range(n))  # caso habitual: epoch ya ordenado
+                else:
+                    perm = array("l", sorted(range(n), key=keys.__getitem__))
+            else:
+                perm = array("l", sorted(range(n), key=values.__getitem__))
+            self._order[col] = perm
+        return perm
+
+    def rank(self, col: str) -> array:
+        r = self._rank.get(col)
+        if r is None:
+            perm = self.order(col)
+            r = array("l", [0]) * len(perm)
+            for pos, row in enumerate(perm):
+                r[row] = pos
+            self._rank[col] = r
+        return r
+
+    def _match_rows(self, cols: List[str], needle: str) -> List[int]:
+        """Filas (ordenadas) cuyo valor en alguna de cols contiene needle, sin distinguir mayúsculas."""
+        needle = needle.lower()
+        parts = []
+        for col in cols:
+            g = self.groups(col)
+            if g is not None:
+                parts.extend(rows for v, rows in g.items() if needle in str(v).lower())
+            else:
+                parts.append([i for i, v in enumerate(self.columns[col]) if needle in str(v).lower()])
+        if len(parts) == 1:
+            return list(parts[0])
+        rows = chain.from_iterable(parts)
+        # cada parte ya viene ordenada: timsort las mezcla casi en lineal
+        return sorted(set(rows)) if len(cols) > 1 else sorted(rows)
+
+    def select(self, spec: Dict[str, object]) -> Optional[List[int]]:
+        """
+        Filas que cumplen todos los criterios de spec, en orden de origen.
+        spec: {columna | (col1, col2): texto}; None si no hay filtros.
+        La columna 'raw' se busca sólo sobre las candidatas de las demás.
+        """
+        active = {k: v for k, v in spec.items() if v}
+        if not active:
+            return None
+        raw_needle = active.pop("raw", "")
+        matches = sorted((self._match_rows(list(c) if isinstance(c, tuple) else [c], v)
+                          for c, v in active.items()), key=len)
+        if matches:
+            rows = matches[0]
+            for other in matches[1:]:
+                keep = set(other)
+                rows = [i for i in rows if i in keep]
+        else:
+            rows = range(len(self))
+        if raw_needle:
+            raw = self.columns["raw"]
+            rows = [i for i in rows if raw_needle in raw[i]]
+        return list(rows)
+
+    def view(self, selected: Optional[List[int]], sort_col: Optional[str], descending: bool) -> Optional[Sequence[int]]:
+        """Combina filtrado y orden en una lista de filas de origen (None = identidad)."""
+        if sort_col is None:
+            if selected is None:
+                return None
+            return selected[::-1] if descending else selected
+        perm = self.order(sort_col)
+        if selected is None:
+            rows = perm
+        elif len(selected) * 8 < len(perm):
+            rank = self.rank(sort_col)
+            rows = sorted(selected, key=rank.__getitem__)
+        else:
+            keep = bytearray(len(perm))
+            for i in selected:
+                keep[i] = 1
+            rows = [i for i in perm if keep[i]]
+        return rows[::-1] if descending else rows
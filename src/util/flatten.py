@@ -1,21 +1,110 @@
 
 # -*- coding: utf-8 -*-
-from typing import Any, Dict, List, Union
+from itertools import chain
+from typing import Any, Dict, List, Optional, Tuple
 
-def flatten_dict(obj: Any, prefix: str = "") -> Dict[str, Any]:
+from ..core import jsoncodec
+
+# Tratamiento de listas al aplanar
+ARRAYS_INDEX = "index"   # 'p[0]', 'p[1]'…
+ARRAYS_CAP = "cap"       # como index hasta max_items; el resto como JSON en 'p[N:]'
+ARRAYS_JSON = "json"     # la lista entera como JSON compacto en 'p'
+ARRAY_MODES = (ARRAYS_INDEX, ARRAYS_CAP, ARRAYS_JSON)
+
+# Caché de rutas: padre -> {clave|índice -> ruta}. Los mensajes de un mismo
+# tipo repiten esquema, así que las rutas se construyen una vez y además se
+# comparten (misma cadena) entre todos los registros aplanados.
+PATH_CACHE_MAX = 50000       # padres distintos antes de vaciar la caché
+PATH_CHILDREN_MAX = 1000     # hijos por padre (dicts usados como mapas id->valor)
+_key_paths: Dict[str, Dict[Any, str]] = {}
+_idx_paths: Dict[str, Dict[int, str]] = {}
+_REST = object()
+
+def _children(cache: Dict[str, Dict], parent: str) -> Dict:
+    kids = cache.get(parent)
+    if kids is None:
+        if len(cache) >= PATH_CACHE_MAX:
+            cache.clear()
+        kids = cache[parent] = {}
+    return kids
+
+def _dumps(v: Any) -> str:
+    try:
+        return jsoncodec.dumps(v, compact=True)
+    except (TypeError, ValueError):
+        return str(v)
+
+def flatten(obj: Any, prefix: str = "", *, sort_keys: bool = False,
+            arrays: str = ARRAYS_INDEX, max_items: int = 0,
+            seq_types: Tuple[type, ...] = (list, tuple),
+            out: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
-    Aplana dict/list anidados a claves tipo 'kw.EP.common.campo1' o 'args[0]'
+    Aplana dict/list anidados a claves tipo 'kw.EP.common.campo1' o 'args[0]'.
+
+    Iterativo (pila de iteradores, sin recursión ni dicts intermedios):
+    escribe directamente en `out`. Dicts/listas vacíos no generan claves.
+      - sort_keys: recorre las claves de cada dict ordenadas.
+      - arrays: 'index' | 'cap' (con max_items) | 'json'.
+      - seq_types: tipos tratados como lista (el resto son escalares).
     """
-    out: Dict[str, Any] = {}
-
-    if isinstance(obj, dict):
-        for k, v in obj.items():
-            p = f"{prefix}.{k}" if prefix else str(k)
-            out.update(flatten_dict(v, p))
-    elif isinstance(obj, (list, tuple)):
-        for i, v in enumerate(obj):
-            p = f"{prefix}[{i}]"
-            out.update(flatten_dict(v, p))
-    else:
+    if arrays not in ARRAY_MODES:
+        raise ValueError(f"Modo de listas no válido: {arrays}")
+    if out is None:
+        out = {}
+    cap = max_items if arrays == ARRAYS_CAP and max_items >= 0 else -1
+
+    def open_(path: str, v: Any):
+        """Entrada de pila para un contenedor, o None si se resuelve aquí."""
+        if isinstance(v, dict):
+            if not v:
+                return None
+            # claves únicas: ordenar los items nunca compara valores
+            items = iter(sorted(v.items()) if sort_keys else v.items())
+            return path, items, _children(_key_paths, path), False
+        if arrays == ARRAYS_JSON:
+            if v:
+                out[path] = _dumps(v)
+            return None
+        if not v:
+            return None
+        if 0 <= cap < len(v):
+            items = chain(enumerate(v[:cap]), [(_REST, v[cap:])])
+            return path, items, _children(_idx_paths, path), True
+        return path, enumerate(v), _children(_idx_paths, path), True
+
+    if not isinstance(obj, dict) and not isinstance(obj, seq_types):
         out[prefix] = obj
+        return out
+    top = open_(prefix, obj)
+    stack: List[Tuple[str, Any, Dict, bool]] = [top] if top else []
+    while stack:
+        parent, it, kids, is_seq = stack[-1]
+        for k, v in it:
+            path = kids.get(k)
+            if path is None:
+                if k is _REST:
+                    out[f"{parent}[{cap}:]"] = _dumps(v)
+                    continue
+                if is_seq:
+                    path = f"{parent}[{k}]"
+                else:
+                    path = f"{parent}.{k}" if parent else str(k)
+                # sólo claves str: True y 1 colisionarían en la caché
+                if len(kids) < PATH_CHILDREN_MAX and (is_seq or type(k) is str):
+                    kids[k] = path
+            if isinstance(v, dict) or isinstance(v, seq_types):
+                entry = open_(path, v)
+                if entry is not None:
+                    stack.append(entry)
+                    break
+            else:
+                out[path] = v
+        else:
+            stack.pop()
     return out
+
+def flatten_dict(obj: Any, prefix: str = "") -> Dict[str, Any]:
+    """
+    Aplana dict/list anidados a claves tipo 'kw.EP.common.campo1' o 'args[0]'
+    """
+    return flatten(obj, prefix)
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Capturas pcap/pcapng construidas a mano para los tests (Ethernet, VLAN, IPv4/IPv6, TCP y frames WebSocket)."""
+import json
+import socket
+import struct
+from typing import List, Optional, Tuple
+
+Packet = Tuple[float, bytes]   # (epoch, trama Ethernet)
+
+T0 = 1700000000.0
+
+
+def _checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\0"
+    s = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    s = (s >> 16) + (s & 0xFFFF)
+    s += s >> 16
+    return ~s & 0xFFFF
+
+
+def tcp_packet(src: str, dst: str, sport: int, dport: int, seq: int, flags: int, payload: bytes = b"",
+               vlan: Optional[int] = None) -> bytes:
+    """Trama Ethernet con TCP sobre IPv4 o IPv6 (según las direcciones) y, opcionalmente, una etiqueta 802.1Q."""
+    tcp = struct.pack("!HHIIBBHHH", sport, dport, seq, 0, 5 << 4, flags, 65535, 0, 0) + payload
+    if ":" in src:
+        ip = (struct.pack("!IHBB", 6 << 28, len(tcp), 6, 64)
+              + socket.inet_pton(socket.AF_INET6, src) + socket.inet_pton(socket.AF_INET6, dst))
+        ethertype = 0x86DD
+    else:
+        ip = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 20 + len(tcp), 0, 0, 64, 6, 0,
+                         socket.inet_aton(src), socket.inet_aton(dst))
+        ip = ip[:10] + struct.pack("!H", _checksum(ip)) + ip[12:]
+        ethertype = 0x0800
+    eth = b"\x00" * 6 + b"\x11" * 6
+    if vlan is not None:
+        eth += struct.pack("!HH", 0x8100, vlan)
+    return eth + struct.pack("!H", ethertype) + ip + tcp
+
+
+def ws_frame(payload: bytes, opcode: int = 1, fin: bool = True, mask: Optional[bytes] = None,
+             rsv1: bool = False) -> bytes:
+    head = bytes([(0x80 if fin else 0) | (0x40 if rsv1 else 0) | opcode])
+    mbit = 0x80 if mask else 0
+    n = len(payload)
+    if n < 126:
+        head += bytes([mbit | n])
+    elif n < 65536:
+        head += bytes([mbit | 126]) + struct.pack("!H", n)
+    else:
+        head += bytes([mbit | 127]) + struct.pack("!Q", n)
+    if mask:
+        head += mask
+        payload = bytes(c ^ mask[i % 4] for i, c in enumerate(payload))
+    return head + payload
+
+
+class Flow:
+    """Una conexión TCP: handshake y datos en segmentos de `seg` bytes, con números de secuencia reales."""
+
+    def __init__(self, client: str, server: str, cport: int, sport: int, vlan: Optional[int] = None):
+        self.client, self.server, self.cport, self.sport = client, server, cport, sport
+        self.vlan = vlan
+        self.cseq, self.sseq = 1000, 5000
+
+    def packet(self, seq: int, flags: int, payload: bytes = b"", client: bool = True) -> bytes:
+        if client:
+            return tcp_packet(self.client, self.server, self.cport, self.sport, seq, flags, payload, self.vlan)
+        return tcp_packet(self.server, self.client, self.sport, self.cport, seq, flags, payload, self.vlan)
+
+    def syn(self, out: List[Packet], t: float) -> None:
+        out.append((t, self.packet(self.cseq - 1, 0x02)))
+        out.append((t, self.packet(self.sseq - 1, 0x12, client=False)))
+
+    def send(self, out: List[Packet], t: float, data: bytes, client: bool = True, seg: int = 1400) -> None:
+        for i in range(0, len(data), seg):
+            chunk = data[i:i + seg]
+            if client:
+                out.append((t, self.packet(self.cseq, 0x18, chunk)))
+                self.cseq += len(chunk)
+            else:
+                out.append((t, self.packet(self.sseq, 0x18, chunk, client=False)))
+                self.sseq += len(chunk)
+
+
+def wamp_session(out: List[Packet], flow: Flow, t: float, calls: int = 3) -> float:
+    """Handshake 101 (wamp.2.json), una suscripción y `calls` CALL/RESULT/EVENT. Devuelve el último epoch."""
+    flow.syn(out, t)
+    flow.send(out, t, b"GET /ws HTTP/1.1\r\nHost: x\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      b"Sec-WebSocket-Protocol: wamp.2.json\r\n\r\n")
+    flow.send(out, t, b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      b"Sec-WebSocket-Protocol: wamp.2.json\r\n\r\n", client=False)
+    flow.send(out, t, ws_frame(json.dumps([32, 1, {}, "com.topic"]).encode(), mask=b"\x01\x02\x03\x04"))
+    flow.send(out, t, ws_frame(json.dumps([33, 1, 555]).encode()), client=False)
+    for i in range(calls):
+        t += 0.01
+        flow.send(out, t, ws_frame(json.dumps([48, 100 + i, {}, "com.proc", [i]]).encode(), mask=b"\xaa\xbb\xcc\xdd"))
+        t += 0.005
+        flow.send(out, t, ws_frame(json.dumps([50, 100 + i, {}, [i * 2]]).encode()), client=False)
+        t += 0.001
+        flow.send(out, t, ws_frame(json.dumps([36, 555, 9000 + i, {}, [], {"n": i}]).encode()), client=False)
+    return t
+
+
+def write_pcap(path: str, packets: List[Packet], nanos: bool = False) -> None:
+    with open(path, "wb") as f:
+        f.write(struct.pack("<IHHiIII", 0xA1B23C4D if nanos else 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+        for t, p in packets:
+            sec = int(t)
+            frac = int(round((t - sec) * (1e9 if nanos else 1e6)))
+            f.write(struct.pack("<IIII", sec, frac, len(p), len(p)) + p)
+
+
+def write_pcapng(path: str, packets: List[Packet]) -> None:
+    def block(kind: int, body: bytes) -> bytes:
+        body += b"\0" * (-len(body) % 4)
+        size = len(body) + 12
+        return struct.pack("<II", kind, size) + body + struct.pack("<I", size)
+
+    with open(path, "wb") as f:
+        f.write(block(0x0A0D0D0A, struct.pack("<IHHq", 0x1A2B3C4D, 1, 0, -1)))
+        # IDB con if_tsresol = 9 (nanosegundos)
+        f.write(block(1, struct.pack("<HHI", 1, 0, 65535) + struct.pack("<HHB3x", 9, 1, 9) + struct.pack("<HH", 0, 0)))
+        for t, p in packets:
+            ts = int(round(t * 1e9))
+            f.write(block(6, struct.pack("<IIIII", 0, ts >> 32, ts & 0xFFFFFFFF, len(p), len(p)) + p))
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Latencias WAMP: histograma y percentiles, emparejado RPC/pub-sub, PUBLISH rechazados y ventanas acotadas."""
+import math
+import random
+
+import pytest
+
+from src.core.analytics import HIST_GROWTH, HIST_MIN, WINDOW_COLUMNS, LatencyHistogram, WampAnalytics, analyze
+
+T0 = 1700000000.0
+
+
+def _exact(samples, p):
+    s = sorted(samples)
+    return s[max(1, math.ceil(len(s) * p / 100.0)) - 1]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_percentiles_within_bucket_error(seed):
+    rnd = random.Random(seed)
+    samples = [rnd.lognormvariate(-6, 1.5) for _ in range(5000)] + [0.0, HIST_MIN / 10]
+    h = LatencyHistogram()
+    for x in samples:
+        h.add(x)
+    assert h.count == len(samples) and h.max == max(samples)
+    for p in (1, 50, 90, 95, 99, 99.9, 100):
+        exact = max(_exact(samples, p), HIST_MIN)
+        assert h.percentile(p) == pytest.approx(exact, rel=HIST_GROWTH - 1), p
+    assert h.percentile(100) <= h.max
+
+
+def test_histogram_edges():
+    h = LatencyHistogram()
+    assert h.percentile(50) == 0.0
+    h.add(0.25)
+    # una sola muestra: todos los percentiles son ella (sin pasar del máximo)
+    assert h.percentile(1) == h.percentile(99) == pytest.approx(0.25, rel=HIST_GROWTH - 1)
+    assert h.percentile(99) <= 0.25
+
+
+def _rec(t, code, **kw):
+    return dict(epoch=T0 + t, stream="1", wamp_code=code, **kw)
+
+
+def test_rpc_and_pubsub_latencies():
+    a = analyze([
+        _rec(0.000, 48, request_id=1, topic="com.p"),
+        _rec(0.010, 50, request_id=1, topic="com.p"),
+        _rec(0.020, 48, request_id=2, topic="com.p"),
+        _rec(0.050, 8, request_type=48, request_id=2, topic="com.p"),
+        _rec(0.060, 50, request_id=99),                             # sin CALL
+        _rec(0.100, 16, request_id=5, topic="com.t"),
+        _rec(0.102, 36, publication_id=700, topic="com.t"),           # antes que PUBLISHED
+        _rec(0.103, 17, request_id=5, publication_id=700),
+        _rec(0.105, 36, publication_id=700, topic="com.t"),
+        _rec(0.200, 48, request_id=3, topic="com.q"),
+    ])
+    (name, count, errors, p50, _, _, mx), = a.rpc_rows()
+    assert (name, count, errors) == ("com.p", 2, 1) and mx == pytest.approx(30.0, abs=1e-3)
+    (topic, deliveries, rejected, _, _, _, mx), = a.pubsub_rows()
+    assert (topic, deliveries, rejected) == ("com.t", 2, 0) and mx == pytest.approx(5.0, abs=1e-3)
+    assert (a.pending_calls, a.unanswered, a.unacknowledged, a.unmatched_events) == (1, 1, 0, 0)
+
+
+def test_rejected_publish_is_not_pending():
+    a = analyze([
+        _rec(0.0, 16, request_id=1, topic="com.t"),
+        _rec(0.1, 8, request_type=16, request_id=1, error="wamp.error.not_authorized", topic="com.t"),
+        _rec(0.2, 16, request_id=2, topic="com.t"),
+        _rec(0.3, 8, request_type=16, request_id=2, topic="com.t"),
+        _rec(0.4, 16, request_id=3, topic="com.u"),                   # sin acknowledge
+        _rec(0.5, 8, request_type=16, request_id=42),                  # PUBLISH no visto
+        _rec(0.6, 8, request_type=32, request_id=1),                   # SUBSCRIBE rechazado: no cuenta
+    ])
+    assert a.pubsub_rows() == [("com.t", 0, 2, 0.0, 0.0, 0.0, 0.0)]
+    assert a.unacknowledged == 1 and a.unanswered == 1 and a.pending_calls == 0
+    # las mismas peticiones por otro stream siguen pendientes
+    b = analyze([_rec(0.0, 16, request_id=1), dict(_rec(0.1, 8, request_type=16, request_id=1), stream="2")])
+    assert b.unacknowledged == 1
+
+
+def test_windows_are_bounded():
+    recs = [_rec(i * 0.5, 48 if i % 2 else 50, request_id=i) for i in range(200)]
+    ref = analyze(recs)
+    a = analyze(recs, max_windows=16)
+    assert len(ref.window_rows()) == 100 and ref.window == 1.0
+    rows = a.window_rows()
+    assert len(rows) <= 16 and a.window == 8.0
+    # mismos totales por columna; cada ventana empieza en un múltiplo de su duración
+    for i in range(len(WINDOW_COLUMNS)):
+        assert sum(c[i] for _, c in rows) == sum(c[i] for _, c in ref.window_rows())
+    assert all(start % a.window == 0 for start, _ in rows)
+    assert rows[0] == (T0, [16, 8, 8, 0, 0, 0])
+
+
+def test_feed_incrementally_like_analyze():
+    recs = [_rec(i * 0.01, 48 if i % 2 == 0 else 50, request_id=i // 2, topic=f"p{i % 3}") for i in range(100)]
+    a = WampAnalytics()
+    for i in range(0, len(recs), 7):
+        a.feed_many(recs[i:i + 7])
+    a.finish()
+    b = analyze(recs)
+    assert a.rpc_rows() == b.rpc_rows() and a.window_rows() == b.window_rows()
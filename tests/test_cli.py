@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""CLI: expansión de globs, salidas NDJSON/CSV y -j junto con --shards."""
+import csv
+import json
+import os
+
+import pytest
+
+from src.cli import expand_inputs, main
+from src.core import pcap_parser
+from src.core.filters import Filters
+from src.core.pcap_processor import shard_count
+
+from .pcapgen import T0, Flow, wamp_session, write_pcap, write_pcapng
+
+
+def _capture(path, sessions=3, calls=3, ng=False):
+    out = []
+    for i in range(sessions):
+        wamp_session(out, Flow("10.0.0.1", "10.0.0.2", 40000 + i, 8080), T0 + i, calls)
+    out.sort(key=lambda p: p[0])
+    (write_pcapng if ng else write_pcap)(str(path), out)
+    return str(path)
+
+
+def _ndjson(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_expand_inputs(tmp_path):
+    for name in ("b.pcap", "a.pcap", "sub/c.pcap", "notas.txt"):
+        os.makedirs(tmp_path / os.path.dirname(name), exist_ok=True)
+        (tmp_path / name).write_bytes(b"")
+    got = expand_inputs([str(tmp_path / "*.pcap"), str(tmp_path / "a.pcap"), str(tmp_path / "**" / "c.pcap")])
+    assert got == [str(tmp_path / n) for n in ("a.pcap", "b.pcap", "sub/c.pcap")]
+    with pytest.raises(ValueError):
+        expand_inputs([str(tmp_path / "*.pcapng")])
+    with pytest.raises(ValueError):
+        expand_inputs([str(tmp_path / "sub")])
+
+
+def test_ndjson_output_follows_input_order(tmp_path):
+    a = _capture(tmp_path / "a.pcap", sessions=1, calls=2)
+    b = _capture(tmp_path / "b.pcapng", sessions=2, calls=1, ng=True)
+    out = tmp_path / "todo.ndjson"
+    assert main([a, b, "--backend", "native", "-o", str(out), "-q"]) == 0
+    rows = _ndjson(out)
+    # por captura: SUBSCRIBE, SUBSCRIBED y CALL/RESULT/EVENT por llamada
+    assert len(rows) == (2 + 3 * 2) + 2 * (2 + 3 * 1)
+    full = tmp_path / "full.ndjson"
+    assert main([a, "--backend", "native", "--full", "-o", str(full), "-q"]) == 0
+    recs = _ndjson(full)
+    assert [r["opcode"] for r in recs][:5] == ["SUBSCRIBE", "SUBSCRIBED", "CALL", "RESULT", "EVENT"]
+    assert recs[2]["topic"] == recs[3]["topic"] == "com.proc"
+
+
+def test_csv_out_dir(tmp_path):
+    a = _capture(tmp_path / "x.pcap", sessions=1, calls=2)
+    os.makedirs(tmp_path / "sub")
+    b = _capture(tmp_path / "sub" / "x.pcap", sessions=1, calls=1)
+    out_dir = tmp_path / "salida"
+    assert main([a, b, "--backend", "native", "--out-dir", str(out_dir), "-f", "csv", "-q"]) == 0
+    assert sorted(os.listdir(out_dir)) == ["x.csv", "x_2.csv"]
+    for name, rows in (("x.csv", 8), ("x_2.csv", 5)):
+        with open(out_dir / name, newline="", encoding="utf-8-sig") as f:
+            data = list(csv.DictReader(f))
+        assert len(data) == rows, name
+        assert {"opcode", "topic", "stream"} <= set(data[0])
+
+
+def test_jobs_with_shards(tmp_path):
+    inputs = [_capture(tmp_path / f"{n}.pcap", sessions=4, calls=3) for n in "ab"]
+    seq, par = tmp_path / "seq.ndjson", tmp_path / "par.ndjson"
+    assert main(inputs + ["--backend", "native", "--full", "-o", str(seq), "-q"]) == 0
+    assert main(inputs + ["--backend", "native", "--full", "-o", str(par), "-q", "-j", "2", "--shards", "2"]) == 0
+    key = lambda r: (r["epoch"], r["stream"], r["raw"])
+    # mismos registros; dentro de cada captura, mezclados por epoch
+    a, b = _ndjson(seq), _ndjson(par)
+    assert len(a) == len(b) == 2 * 4 * (2 + 3 * 3)
+    half = len(a) // 2
+    assert sorted(a[:half], key=key) == sorted(b[:half], key=key)
+    assert sorted(a[half:], key=key) == sorted(b[half:], key=key)
+    assert [r["epoch"] for r in b[:half]] == sorted(r["epoch"] for r in b[:half])
+
+
+def test_shards_need_native_backend(tmp_path, capsys):
+    a = _capture(tmp_path / "a.pcap", sessions=1, calls=1)
+    with pytest.raises(SystemExit) as exc:
+        main([a, "--shards", "2", "-o", str(tmp_path / "a.ndjson")])
+    assert exc.value.code == 2
+    assert "--backend native" in capsys.readouterr().err
+    assert shard_count(Filters(workers=4)) == 1
+    assert shard_count(Filters(backend="NATIVE", workers=4)) == 4
+
+
+def test_tshark_shard_filter_needs_4_0(monkeypatch):
+    monkeypatch.setattr(pcap_parser, "_TSHARK_VERSION", (3, 6, 2))
+    with pytest.raises(ValueError, match="4.0"):
+        next(pcap_parser.iter_messages("no-se-abre.pcap", Filters().with_shard(0, 2)))
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Exportación a Excel: reparto en hojas de continuación al pasar del límite de filas, y su orden."""
+import json
+
+import pytest
+from openpyxl import load_workbook
+
+from src.core.export_excel import _excel_clean, export_to_xlsx
+from src.core.record import Record
+
+T0 = 1700000000.0
+
+
+def _records(n):
+    recs = []
+    for i in range(n):
+        if i % 3 == 2:
+            raw = json.dumps([50, i, {}, [{"MsgB": {"v": i}}]])
+            recs.append(Record(T0 + i, "1", "10.0.0.2", "10.0.0.1", 8080, 40000, "RESULT", "com.p", "MsgB", raw,
+                               extra={"wamp_code": 50, "request_id": i}))
+        else:
+            raw = json.dumps([36, 5, i, {}, [], {"MsgA": {"seq": i, "tags": ["x"]}}])
+            recs.append(Record(T0 + i, "1", "10.0.0.2", "10.0.0.1", 8080, 40000, "EVENT", "com.t", "MsgA", raw,
+                               extra={"wamp_code": 36, "subscription_id": 5, "publication_id": i}))
+    return recs
+
+
+def _sheets(path):
+    wb = load_workbook(path, read_only=True)
+    try:
+        return [(ws.title, [list(r) for r in ws.iter_rows(values_only=True)]) for ws in wb.worksheets]
+    finally:
+        wb.close()
+
+
+def test_rollover_past_row_limit(tmp_path):
+    recs = _records(25)
+    out = tmp_path / "x.xlsx"
+    export_to_xlsx(recs, str(out), max_rows=10)
+    sheets = _sheets(out)
+    names = [t for t, _ in sheets]
+    # 25 filas + cabecera por hoja, 9 por hoja: 3 de Mensajes y 3 de Raw, agrupadas y en orden
+    assert names[:6] == ["Mensajes", "Mensajes (2)", "Mensajes (3)", "Raw", "Raw (2)", "Raw (3)"]
+    assert names[6] == "Resumen" and names[-1].startswith("Latencias")
+    rows = dict(sheets)
+    assert [len(rows[n]) for n in names[:6]] == [10, 10, 8] * 2
+    # cada continuación repite la cabecera y sigue donde acabó la anterior
+    head = rows["Mensajes"][0]
+    assert rows["Mensajes (2)"][0] == rows["Mensajes (3)"][0] == head
+    epochs = [r[head.index("epoch")] for n in names[:3] for r in rows[n][1:]]
+    assert epochs == [r.epoch for r in recs]
+    raw_head = rows["Raw"][0]
+    raws = [r[raw_head.index("raw")] for n in names[3:6] for r in rows[n][1:]]
+    assert raws == [r.raw for r in recs]
+
+
+def test_rollover_with_split_sheets(tmp_path):
+    recs = _records(30)
+    out = tmp_path / "x.xlsx"
+    export_to_xlsx(recs, str(out), max_rows=8, split_by="type")
+    sheets = _sheets(out)
+    names = [t for t, _ in sheets]
+    # MsgA: 20 filas (3 hojas de 7), MsgB: 10 (2 hojas); Raw: 30 (5 hojas)
+    assert names[:5] == ["Mensajes MsgA", "Mensajes MsgA (2)", "Mensajes MsgA (3)",
+                         "Mensajes MsgB", "Mensajes MsgB (2)"]
+    assert names[5:10] == ["Raw"] + [f"Raw ({i})" for i in range(2, 6)]
+    rows = dict(sheets)
+    assert [len(rows[n]) - 1 for n in names[:5]] == [7, 7, 6, 7, 3]
+    assert sum(len(rows[n]) - 1 for n in names[5:10]) == 30
+    assert "MsgB.v" not in rows["Mensajes MsgA"][0] and "MsgB.v" in rows["Mensajes MsgB (2)"][0]
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, ""), (3, 3), (1.5, 1.5), ("limpio", "limpio"),
+    ("a\r\nb\rc", "a\nb\nc"), ("x\x00y\x1fz", "xyz"),
+])
+def test_excel_clean(value, expected):
+    assert _excel_clean(value) == expected
+
+
+def test_excel_clean_truncates():
+    s = _excel_clean("é" * 40000)
+    assert len(s) < 32000 and s.endswith("…(truncado)")
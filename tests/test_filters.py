@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Filters: listas, CIDR y rangos compilados a display filter y a Filters.match."""
+import ipaddress
+
+import pytest
+
+from src.core.filters import Filters
+
+
+def _rec(src="10.0.0.1", dst="10.0.0.2", sport=40000, dport=8080, stream="0"):
+    return {"src": src, "dst": dst, "src_port": sport, "dst_port": dport, "stream": stream}
+
+
+def test_no_filters_match_everything():
+    f = Filters()
+    assert not f.has_net_filters
+    assert f.display_filter() == ""
+    assert f.match(_rec(src="fe80::1", sport="", stream=""))
+
+
+def test_cidr_lists():
+    f = Filters(src_ip="10.0.0.0/8, 192.168.1.7", dst_ip="fe80::/10")
+    assert f.display_filter() == ("(ip.src == 10.0.0.0/8 || ip.src == 192.168.1.7) && (ipv6.dst == fe80::/10)")
+    assert f.match(_rec(src="10.200.3.4", dst="fe80::abcd"))
+    assert f.match(_rec(src="192.168.1.7", dst="fe80::1"))
+    assert not f.match(_rec(src="192.168.1.8", dst="fe80::1"))
+    assert not f.match(_rec(src="10.0.0.1", dst="10.0.0.2"))
+    assert not f.match(_rec(src="no-es-ip", dst="fe80::1"))
+
+
+def test_cidr_against_ipaddress():
+    nets = ["172.16.0.0/12", "10.1.2.0/24", "2001:db8::/32"]
+    f = Filters(dst_ip=" ; ".join(nets))
+    parsed = [ipaddress.ip_network(n) for n in nets]
+    for ip in ("172.31.255.255", "172.32.0.0", "10.1.2.200", "10.1.3.1", "2001:db8::5", "2001:db9::5"):
+        addr = ipaddress.ip_address(ip)
+        assert f.match(_rec(dst=ip)) == any(addr in n for n in parsed), ip
+
+
+def test_port_ranges():
+    f = Filters(dst_port="80, 443, 8000-8100")
+    assert f.display_filter("websocket") == (
+        "(websocket) && (tcp.dstport == 80 || tcp.dstport == 443 || (tcp.dstport >= 8000 && tcp.dstport <= 8100))")
+    for port, ok in ((80, True), (443, True), (8000, True), (8080, True), (8100, True),
+                     (8101, False), (81, False), (7999, False)):
+        assert f.match(_rec(dport=port)) is ok, port
+    # los puertos llegan como texto desde tshark
+    assert f.match(_rec(dport="8050"))
+
+
+def test_stream_ranges():
+    f = Filters(streams="3, 10-12")
+    assert f.display_filter() == "tcp.stream == 3 || (tcp.stream >= 10 && tcp.stream <= 12)"
+    assert [s for s in range(15) if f.match(_rec(stream=str(s)))] == [3, 10, 11, 12]
+
+
+def test_shards_partition_streams():
+    base = Filters(streams="0-99")
+    shards = [base.with_shard(k, 3) for k in range(3)]
+    for s in range(100):
+        assert sum(sh.match(_rec(stream=s)) for sh in shards) == 1
+    assert shards[1].display_filter().endswith("(tcp.stream % 3 == 1)")
+
+
+def test_unparseable_record_only_passes_without_filters():
+    bad = _rec(sport="x")
+    assert Filters().match(bad)
+    assert not Filters(streams="1").match(bad)
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"src_ip": "10.0.0.300"},
+    {"dst_port": "70000"},
+    {"src_port": "90-80"},
+    {"streams": "a-b"},
+])
+def test_invalid_input_raises(kwargs):
+    with pytest.raises(ValueError):
+        Filters(**kwargs)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""FlatViews: esquema con sólo claves, caché de vistas acotada y cabeceras de los exportadores."""
+from src.core.flat_view import FlatViews
+from src.core.schema_index import SchemaIndex
+
+
+def _recs(n):
+    out = []
+    for i in range(n):
+        kw = {"MsgA": {"i": i, "tags": ["x", "y"]}} if i % 2 else {"MsgB": {"j": i, "deep": {"k": 1}}}
+        out.append({"epoch": float(i), "type": next(iter(kw)), "opcode": "EVENT", "topic": f"t{i % 3}",
+                    "args": [i], "kwargs": kw, "raw": ""})
+    return out
+
+
+def test_add_indexes_keys_without_keeping_views():
+    recs = _recs(50)
+    fv = FlatViews(recs)
+    fv.add(recs, fv.prepare(recs))
+    assert not fv._entries
+    ref = FlatViews(recs, keep=False)
+    assert fv.flat_keys() == ref.flat_keys()
+    assert fv.kv_keys() == ref.kv_keys() == ["args[0]", "kw.MsgA.i", "kw.MsgA.tags[0]", "kw.MsgA.tags[1]",
+                                              "kw.MsgB.deep.k", "kw.MsgB.j"]
+    assert fv.schema.group("type", "MsgB").flat.keys == ["MsgB.deep.k", "MsgB.j"]
+    assert not fv._entries
+
+
+def test_schema_stores_keys_only():
+    s = SchemaIndex()
+    s.add({"type": "A"}, ("A.x", "A.y"), ("kw.A.x",))
+    s.add({"type": "A"}, iter(["A.x", "A.z"]), [])
+    assert s.group("type", "A").flat.keys == ["A.x", "A.y", "A.z"] and s.count == 2
+
+
+def test_entry_cache_is_bounded_lru():
+    recs = _recs(10)
+    fv = FlatViews(recs, max_entries=3)
+    first = fv.entry(recs[0])
+    assert fv.entry(recs[0]) is first
+    for r in recs[1:3]:
+        fv.entry(r)
+    fv.entry(recs[0])                 # la más reciente
+    fv.entry(recs[3])                 # expulsa recs[1]
+    assert [e.rec["epoch"] for e in fv._entries.values()] == [2.0, 0.0, 3.0]
+    assert fv.entry(recs[0]) is first
+    # las vistas recalculadas son iguales
+    assert fv.entry(recs[1]).flat == FlatViews([recs[1]], keep=False).entry(recs[1]).flat
+    assert len(fv._entries) == 3
+
+
+def test_sync_builds_schema_for_records_not_added():
+    recs = _recs(8)
+    fv = FlatViews(recs, max_entries=2)
+    assert fv.record_keys() == {"epoch", "type", "opcode", "topic", "args", "kwargs", "raw"}
+    assert fv.schema.count == 8 and len(fv._entries) == 0
+    recs.append(_recs(1)[0])
+    assert "MsgB.j" in fv.flat_keys() and fv.schema.count == 9
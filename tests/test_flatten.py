@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Aplanador iterativo: misma salida (claves, valores y orden) que las versiones recursivas anteriores."""
+import random
+import sys
+from typing import Any, Dict
+
+import pytest
+
+from src.core.flat_view import flatten_json
+from src.util import flatten as fl
+from src.util.flatten import flatten, flatten_dict
+
+
+# --- referencias: las implementaciones recursivas a las que sustituye ---
+def flatten_dict_rec(obj: Any, prefix: str = "") -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            p = f"{prefix}.{k}" if prefix else str(k)
+            out.update(flatten_dict_rec(v, p))
+    elif isinstance(obj, (list, tuple)):
+        for i, v in enumerate(obj):
+            out.update(flatten_dict_rec(v, f"{prefix}[{i}]"))
+    else:
+        out[prefix] = obj
+    return out
+
+
+def flatten_json_rec(obj: Any, prefix: str = "") -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    p = f"{prefix}." if prefix else ""
+    if isinstance(obj, dict):
+        for k in sorted(obj.keys()):
+            out.update(flatten_json_rec(obj[k], f"{p}{k}" if prefix else k))
+        return out
+    if isinstance(obj, list):
+        for i, it in enumerate(obj):
+            out.update(flatten_json_rec(it, f"{prefix}[{i}]"))
+        return out
+    out[prefix] = obj
+    return out
+
+
+SCALARS = [0, 1, -7, 2 ** 70, 1.5, "", "x", "ñ", True, False, None]
+
+
+def _random(rnd: random.Random, depth: int, str_keys: bool) -> Any:
+    r = rnd.random()
+    if depth <= 0 or r < 0.35:
+        return rnd.choice(SCALARS)
+    n = rnd.randrange(5)
+    if r < 0.65:
+        keys = [f"k{rnd.randrange(8)}" if str_keys or rnd.random() < 0.7 else rnd.randrange(5) for _ in range(n)]
+        return {k: _random(rnd, depth - 1, str_keys) for k in keys}
+    seq = [_random(rnd, depth - 1, str_keys) for _ in range(n)]
+    return tuple(seq) if not str_keys and rnd.random() < 0.3 else seq
+
+
+def _items(d):
+    return list(d.items())
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_same_output_as_recursive(seed):
+    rnd = random.Random(seed)
+    for _ in range(500):
+        obj = _random(rnd, 6, str_keys=False)
+        assert _items(flatten_dict(obj, "kw")) == _items(flatten_dict_rec(obj, "kw"))
+        assert _items(flatten_dict(obj)) == _items(flatten_dict_rec(obj))
+        obj = _random(rnd, 6, str_keys=True)
+        assert _items(flatten_json(obj)) == _items(flatten_json_rec(obj))
+        assert _items(flatten_json(obj, "p")) == _items(flatten_json_rec(obj, "p"))
+
+
+def test_deep_nesting_beyond_recursion_limit():
+    depth = sys.getrecursionlimit() + 500
+    obj: Any = {"hoja": [1, {"x": 2}]}
+    for d in range(depth):
+        obj = {f"n{d % 3}": obj} if d % 2 else [obj]
+    got = flatten_json(obj, "r")
+    # reconstruye la ruta a mano, de fuera hacia dentro
+    path = "r"
+    for d in reversed(range(depth)):
+        path = f"{path}.n{d % 3}" if d % 2 else f"{path}[0]"
+    assert got == {f"{path}.hoja[0]": 1, f"{path}.hoja[1].x": 2}
+    with pytest.raises(RecursionError):
+        flatten_json_rec(obj, "r")
+
+
+def test_path_cache_limits_do_not_change_output(monkeypatch):
+    rnd = random.Random(9)
+    objs = [_random(rnd, 5, str_keys=True) for _ in range(300)]
+    ref = [flatten_json_rec(o, "p") for o in objs]
+    monkeypatch.setattr(fl, "PATH_CACHE_MAX", 3)
+    monkeypatch.setattr(fl, "PATH_CHILDREN_MAX", 2)
+    fl._key_paths.clear()
+    fl._idx_paths.clear()
+    assert [flatten_json(o, "p") for o in objs] == ref
+    assert len(fl._key_paths) <= 3 and all(len(k) <= 2 for k in fl._key_paths.values())
+
+
+def test_non_str_keys_and_sequence_types():
+    # True y 1 dan la misma ruta pero no se confunden en la caché
+    assert flatten_dict({"a": {1: "uno"}}) == {"a.1": "uno"}
+    assert flatten_dict({"a": {True: "verdad"}}) == {"a.True": "verdad"}
+    assert flatten_dict({"a": {1: "uno"}}) == {"a.1": "uno"}
+    # flatten_dict trata las tuplas como listas; flatten_json no
+    assert flatten_dict({"t": (1, 2)}) == {"t[0]": 1, "t[1]": 2}
+    assert flatten_json({"t": (1, 2)}) == {"t": (1, 2)}
+    assert flatten_json({}) == {} and flatten_json({"a": {}, "b": []}) == {}
+    assert flatten_json(5, "p") == {"p": 5}
+
+
+def test_list_modes():
+    obj = {"b": [1, 2, 3], "a": [{"x": 1}, {"x": 2}]}
+    assert flatten(obj, arrays="cap", max_items=1, sort_keys=True) == {
+        "a[0].x": 1, "a[1:]": '[{"x":2}]', "b[0]": 1, "b[1:]": "[2,3]"}
+    assert flatten(obj, arrays="json") == {"b": "[1,2,3]", "a": '[{"x":1},{"x":2}]'}
+    # cap mayor que la lista: igual que index
+    assert flatten(obj, arrays="cap", max_items=5) == flatten(obj)
+    with pytest.raises(ValueError):
+        flatten(obj, arrays="otro")
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""JsonFramer: objetos JSON de nivel superior sobre un flujo de bytes troceado."""
+import json
+
+from src.core.utils import JsonFramer
+
+TRICKY = [
+    {"a": 1},
+    {"s": "llaves } y { dentro de la cadena"},
+    {"q": 'comillas \\" escapadas } {', "n": {"m": [1, {"k": "}"}]}},
+    {"bs": "barra final \\\\", "after": "}"},
+    {"u": "ñandú é ☃"},
+]
+
+
+def _stream(objs, junk=b"junk "):
+    return b"".join(junk + json.dumps(o, ensure_ascii=False).encode("utf-8") for o in objs) + junk
+
+
+def _frame(chunks):
+    f = JsonFramer()
+    out = []
+    for c in chunks:
+        out.extend(f.feed(c))
+    return f, [json.loads(b) for b in out]
+
+
+def test_braces_and_escapes_inside_strings():
+    f, objs = _frame([_stream(TRICKY)])
+    assert objs == TRICKY
+    assert not f.pending
+
+
+def test_objects_split_across_chunks():
+    data = _stream(TRICKY)
+    for size in (1, 2, 3, 7, 64):
+        f, objs = _frame([data[i:i + size] for i in range(0, len(data), size)])
+        assert objs == TRICKY, size
+        assert not f.pending
+
+
+def test_split_on_escape_backslash():
+    # el corte cae justo entre la barra y el carácter escapado
+    data = b'{"k": "a\\"}"}'
+    cut = data.index(b"\\") + 1
+    _, objs = _frame([data[:cut], data[cut:]])
+    assert objs == [{"k": 'a"}'}]
+
+
+def test_incomplete_object_stays_pending():
+    f = JsonFramer()
+    assert f.feed(b'xx {"a": {"b": "}') == []
+    assert f.pending
+    assert f.feed(b'"}}') == [b'{"a": {"b": "}"}}']
+    assert not f.pending
+    # lo que queda fuera de un objeto no se acumula
+    assert f.feed(b"basura sin llaves") == []
+    assert len(f.buf) == 0
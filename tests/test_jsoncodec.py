@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""jsoncodec: con orjson la salida es la misma que con la biblioteca estándar (NaN, enteros grandes, claves no str)."""
+import json
+import math
+import random
+
+import pytest
+
+from src.core import jsoncodec
+
+orjson = pytest.importorskip("orjson")
+
+
+@pytest.fixture(params=["stdlib", "orjson"])
+def backend(request, monkeypatch):
+    if request.param == "orjson":
+        monkeypatch.setattr(jsoncodec, "_fast_loads", orjson.loads)
+        monkeypatch.setattr(jsoncodec, "_fast_dumps", orjson.dumps)
+    else:
+        monkeypatch.setattr(jsoncodec, "_fast_loads", None)
+        monkeypatch.setattr(jsoncodec, "_fast_dumps", None)
+    return request.param
+
+
+def _same(a, b):
+    """Igualdad estructural en la que NaN == NaN y 1 != 1.0 != True."""
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return list(a) == list(b) and all(_same(a[k], b[k]) for k in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+TEXTS = [
+    '[36, 1, 2, {}, [NaN, Infinity, -Infinity]]',
+    '{"big": 18446744073709551616, "neg": -9223372036854775809, "max": 9223372036854775807}',
+    '[1234567890123456789, 12345678901234567, 1.5, 1e400, -1e400, 1e-400]',
+    '{"s": "1234567890123456789012"}',
+    '{"lone": "\\ud800", "pair": "\\ud83d\\ude00", "ñ": "ü"}',
+    '{"a": 1, "a": 2}',
+    '  [1.0, 0.1, 100, -0, -0.0, true, false, null] ',
+]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_loads_like_stdlib(backend, text):
+    ref = json.loads(text)
+    assert _same(jsoncodec.loads(text), ref)
+    if "\\ud800" not in text:
+        assert _same(jsoncodec.loads(text.encode("utf-8")), ref)
+
+
+@pytest.mark.parametrize("text", ["", "{", "[1,]", "{'a': 1}", "nan", "[1] x"])
+def test_loads_errors_like_stdlib(backend, text):
+    with pytest.raises(json.JSONDecodeError) as ref:
+        json.loads(text)
+    with pytest.raises(json.JSONDecodeError) as got:
+        jsoncodec.loads(text)
+    assert str(got.value) == str(ref.value)
+
+
+OBJECTS = [
+    [1e16, 1e-05, 0.1, 1.5e300, 123456789.0, 0.0001, 0.00001, -0.0, 2.5],
+    {"nan": float("nan"), "inf": float("inf"), "-inf": float("-inf")},
+    [2 ** 64, -2 ** 63 - 1, 2 ** 63 - 1, 10 ** 30],
+    {1: "int", 2.5: "float", None: "none", True: "bool", "s": "str"},
+    {"texto": "null 0.0000 1e5", "n": None, "u": "ñ😀 ", "esc": "\"\\\n\t"},
+    [[], {}, [[{}]], {"a": [1, {"b": None}]}],
+    "solo una cadena",
+]
+
+
+@pytest.mark.parametrize("obj", OBJECTS)
+def test_dumps_like_stdlib(backend, obj):
+    assert jsoncodec.dumps(obj, compact=True) == json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    assert jsoncodec.dumps(obj) == json.dumps(obj, ensure_ascii=False)
+
+
+def _random(rnd, depth):
+    r = rnd.random()
+    if depth <= 0 or r < 0.4:
+        return rnd.choice([0, -1, 2 ** 40, 2 ** 70, 0.5, 1e-7, 3.14e22, float("nan"), "", "a", "ñ", "null",
+                           True, False, None])
+    if r < 0.7:
+        return {rnd.choice(["k", "ü", "1", 1, None]) if rnd.random() < 0.2 else f"k{i}": _random(rnd, depth - 1)
+                for i in range(rnd.randrange(4))}
+    return [_random(rnd, depth - 1) for _ in range(rnd.randrange(4))]
+
+
+def test_random_round_trip(backend):
+    rnd = random.Random(25)
+    for _ in range(2000):
+        obj = _random(rnd, 4)
+        ref = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+        out = jsoncodec.dumps(obj, compact=True)
+        assert out == ref
+        assert _same(jsoncodec.loads(out), json.loads(ref))
+
+
+def test_default_goes_through_stdlib(backend):
+    obj = {"b": b"\x01", "set": {1}}
+    conv = lambda o: sorted(o) if isinstance(o, set) else o.hex()
+    assert jsoncodec.dumps(obj, compact=True, default=conv) == '{"b":"01","set":[1]}'
+    with pytest.raises(TypeError):
+        jsoncodec.dumps(obj, compact=True)
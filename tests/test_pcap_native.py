@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""Lector nativo: reensamblado TCP, frames WebSocket, handshake 101 y capturas pcap/pcapng hechas a mano."""
+import json
+import shutil
+
+import pytest
+
+from src.core import pcap_native
+from src.core.filters import Filters
+from src.core.pcap_native import (CaptureStream, TcpReassembler, WsFrameParser, _Conn, _Half, _probe,
+                                  iter_packets, open_capture)
+from src.core.pcap_parser import iter_messages
+
+from .pcapgen import T0, Flow, wamp_session, write_pcap, write_pcapng, ws_frame
+
+SYN, ACK, PSH, FIN = 0x02, 0x10, 0x08, 0x01
+DATA = bytes(range(48, 48 + 40))
+
+
+def _push(half, segments):
+    return b"".join(b"".join(half.push(seq, PSH | ACK, DATA[seq - 1000:seq - 1000 + n])) for seq, n in segments)
+
+
+def test_half_in_order_and_syn():
+    h = _Half("a", "b")
+    assert h.push(999, SYN, b"") == [] and h.next_seq == 1000
+    assert _push(h, [(1000, 10), (1010, 30)]) == DATA
+
+
+def test_half_out_of_order_retransmitted_and_overlapping():
+    h = _Half("a", "b")
+    h.push(999, SYN, b"")
+    # 1020 llega antes que 1000 y 1010; 1000 se retransmite y 1005+10 solapa lo ya entregado
+    got = _push(h, [(1020, 20), (1000, 10), (1000, 10), (1005, 10), (1010, 10), (1010, 10)])
+    assert got == DATA
+    assert not h.ooo and not h.lost
+    # un segmento viejo después de todo no entrega nada
+    assert _push(h, [(1030, 10)]) == b""
+
+
+def test_half_unrecoverable_gap(monkeypatch):
+    monkeypatch.setattr(pcap_native, "MAX_OOO_SEGMENTS", 2)
+    h = _Half("a", "b")
+    h.push(999, SYN, b"")
+    # falta 1000..1010: al pasar del tope se salta el hueco
+    assert _push(h, [(1010, 10), (1020, 10)]) == b""
+    assert _push(h, [(1030, 10)]) == DATA[10:]
+    assert h.lost
+
+
+def test_reassembler_streams_like_tshark():
+    r = TcpReassembler(idle_seconds=100, linger_seconds=10, max_conns=3)
+    a = r.conn_for("10.0.0.1", "10.0.0.2", 40000, 80, SYN)
+    assert r.conn_for("10.0.0.2", "10.0.0.1", 80, 40000, SYN | ACK) is a
+    b = r.conn_for("10.0.0.1", "10.0.0.2", 40001, 80, SYN)
+    assert (a.stream, b.stream) == ("0", "1")
+    # FIN: la conexión pasa a cerradas; un SYN nuevo con la misma 4-tupla es otro stream
+    r.conn_for("10.0.0.1", "10.0.0.2", 40000, 80, FIN | ACK, ts=1.0)
+    assert r.conn_for("10.0.0.2", "10.0.0.1", 80, 40000, ACK, ts=2.0) is a
+    c = r.conn_for("10.0.0.1", "10.0.0.2", 40000, 80, SYN, ts=3.0)
+    assert c.stream == "2" and r.released == [a]
+    # tope de conexiones vivas: se suelta la menos reciente
+    r.released.clear()
+    r.conn_for("10.0.0.3", "10.0.0.2", 1, 80, SYN, ts=4.0)
+    r.conn_for("10.0.0.4", "10.0.0.2", 1, 80, SYN, ts=5.0)
+    assert r.released == [b] and len(r) == 3
+    r.released.clear()
+    r.expire(200.0)
+    assert len(r) == 0 and len(r.released) == 3
+
+
+@pytest.mark.parametrize("size", [5, 300, 70000])
+def test_masked_frame_split_at_every_byte(size):
+    payload = bytes(i % 251 for i in range(size))
+    frame = ws_frame(payload, mask=b"\x9a\x01\xfe\x37")
+    cuts = range(1, len(frame)) if size < 1000 else (1, 2, 5, 9, 13, 14, 1000, len(frame) - 1)
+    for cut in cuts:
+        p = WsFrameParser()
+        assert p.feed(frame[:cut]) == []
+        assert p.feed(frame[cut:]) == [(1, 0, 1, payload)], cut
+        assert not p.pending
+
+
+def test_frames_in_one_chunk_and_a_partial_tail():
+    a, b = ws_frame(b'[1]', opcode=1, fin=False), ws_frame(b'{"x": 2}', opcode=0, mask=b"abcd")
+    p = WsFrameParser()
+    assert p.feed(a + b + b[:3]) == [(0, 0, 1, b'[1]'), (1, 0, 0, b'{"x": 2}')]
+    assert p.feed(b[3:]) == [(1, 0, 0, b'{"x": 2}')]
+
+
+def test_probe_101_handshake():
+    conn = _Conn("0", ())
+    client, server = _Half("c", "s"), _Half("s", "c")
+    req = b"GET /ws HTTP/1.1\r\nUpgrade: websocket\r\nSec-WebSocket-Extensions: permessage-deflate\r\n\r\n"
+    assert _probe(conn, client, req[:3]) is None
+    assert _probe(conn, client, req[3:20]) is None
+    assert _probe(conn, client, req[20:] + b"\x81\x03") == b"\x81\x03"
+    assert client.state == "ws" and conn.headers["sec-websocket-extensions"] == "permessage-deflate"
+    resp = b"HTTP/1.1 101 Switching Protocols\r\nSec-WebSocket-Protocol: wamp.2.json\r\n\r\n"
+    assert _probe(conn, server, resp) == b""
+    assert conn.server is server and conn.response["sec-websocket-protocol"] == "wamp.2.json"
+
+
+def test_probe_raw():
+    conn = _Conn("0", ())
+    h = _Half("c", "s")
+    assert _probe(conn, h, b'{"a": 1}') == b'{"a": 1}' and h.state == "raw"
+    h = _Half("c", "s")
+    assert _probe(conn, h, b"GET / HTTP/1.1\r\nHost: x\r\n\r\n{}") is not None and h.state == "raw"
+
+
+# ------------------------------------------------------------
+# Capturas completas
+# ------------------------------------------------------------
+def _packets():
+    """IPv4 con VLAN (frame partido, desordenado, retransmitido y solapado) e IPv6 sin etiqueta."""
+    out = []
+    a = Flow("10.0.0.1", "10.0.0.2", 40000, 8080, vlan=100)
+    t = wamp_session(out, a, T0, calls=1)
+    big = ws_frame(json.dumps([48, 7, {}, "com.split", ["x" * 60]]).encode(), mask=b"\x11\x22\x33\x44")
+    s = a.cseq
+    segs = [(s, big[:30]), (s + 30, big[30:60]), (s + 60, big[60:])]
+    t += 0.1
+    for seq, data in (segs[1], segs[0], segs[0], (s + 20, big[20:45]), segs[2]):
+        out.append((t, a.packet(seq, PSH | ACK, data)))
+    a.cseq += len(big)
+    b = Flow("2001:db8::1", "2001:db8::2", 50000, 9000)
+    wamp_session(out, b, T0 + 1, calls=2)
+    return out
+
+
+def _messages(path, backend="NATIVE"):
+    return [(m["stream"], m["src"], m["dst"], m["opcode"], m["topic"], m["raw"])
+            for m in iter_messages(str(path), Filters(backend=backend))]
+
+
+EXPECTED_A = ["SUBSCRIBE", "SUBSCRIBED", "CALL", "RESULT", "EVENT", "CALL"]
+EXPECTED_B = ["SUBSCRIBE", "SUBSCRIBED"] + ["CALL", "RESULT", "EVENT"] * 2
+
+
+@pytest.fixture()
+def captures(tmp_path):
+    pk = _packets()
+    paths = {"pcap": tmp_path / "c.pcap", "ns": tmp_path / "c_ns.pcap", "pcapng": tmp_path / "c.pcapng"}
+    write_pcap(str(paths["pcap"]), pk)
+    write_pcap(str(paths["ns"]), pk, nanos=True)
+    write_pcapng(str(paths["pcapng"]), pk)
+    return paths
+
+
+def test_vlan_ipv6_and_reordered_segments(captures):
+    msgs = _messages(captures["pcap"])
+    a = [m for m in msgs if m[0] == "0"]
+    b = [m for m in msgs if m[0] == "1"]
+    assert [m[3] for m in a] == EXPECTED_A
+    assert [m[3] for m in b] == EXPECTED_B
+    assert a[-1][4] == "com.split" and json.loads(a[-1][5])[4] == ["x" * 60]
+    assert b[0][1:3] == ("2001:db8::1", "2001:db8::2")
+    assert b[3][4] == "com.proc"   # RESULT resuelto por la sesión IPv6
+
+
+def test_pcap_and_pcapng_agree(captures):
+    ref = _messages(captures["pcap"])
+    assert _messages(captures["ns"]) == ref
+    assert _messages(captures["pcapng"]) == ref
+    epochs = [t for t, _, _, _ in iter_packets(open_capture(str(captures["pcapng"])))]
+    assert epochs[0] == pytest.approx(T0)
+
+
+@pytest.mark.parametrize("kind", ["pcap", "pcapng"])
+def test_truncated_final_record(captures, kind):
+    path = captures[kind]
+    ref = _messages(path)
+    data = path.read_bytes()
+    full = list(iter_packets(data))
+    path.write_bytes(data[:-7])
+    assert len(list(iter_packets(open_capture(str(path))))) == len(full) - 1
+    # sólo se pierde el último mensaje (el EVENT final del flujo IPv6)
+    assert _messages(path) == ref[:-1]
+
+
+@pytest.mark.parametrize("kind", ["pcap", "pcapng"])
+def test_capture_stream_matches_file_reader(captures, kind):
+    data = captures[kind].read_bytes()
+    ref = [(t, lt, bytes(d), end) for t, lt, d, end in iter_packets(data)]
+    for size in (1, 3, 64, 1500):
+        cs = CaptureStream()
+        got = []
+        for i in range(0, len(data), size):
+            got.extend(cs.feed(data[i:i + size]))
+        assert got == ref, size
+        assert not cs.buf
+    # registro final truncado: queda pendiente hasta que llegue el resto
+    cs = CaptureStream()
+    assert len(cs.feed(data[:-7])) == len(ref) - 1
+    assert cs.feed(data[-7:]) == ref[-1:]
+
+
+@pytest.mark.skipif(shutil.which("tshark") is None, reason="tshark no está instalado")
+def test_same_records_as_tshark(captures):
+    assert _messages(captures["pcap"]) == _messages(captures["pcap"], backend="TSHARK")
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""BufferBudget: descarte LRU por presupuesto global, tope por stream, inactividad y recuentos."""
+import json
+
+from src.core.pcap_parser import WebSocketReassembler
+from src.core.reassembly import BufferBudget, describe, empty_stats, evicted, merge_stats
+
+
+class Owner:
+    def __init__(self):
+        self.evicted = []
+
+    def evict(self, key):
+        self.evicted.append(key)
+
+
+def test_lru_eviction_order():
+    o = Owner()
+    b = BufferBudget(total_bytes=100, stream_bytes=100, idle_seconds=0)
+    b.update(o, "a", 30, 1.0)
+    b.update(o, "b", 30, 2.0)
+    b.update(o, "c", 30, 3.0)
+    b.update(o, "a", 35, 4.0)          # a pasa a ser el más reciente
+    assert o.evicted == [] and b.used == 95
+    b.update(o, "d", 30, 5.0)          # 125 > 100: sale b (el menos usado), luego basta
+    assert o.evicted == ["b"] and b.used == 95
+    b.update(o, "e", 60, 6.0)          # sale c y después a, por ese orden
+    assert o.evicted == ["b", "c", "a"] and b.used == 90 and len(b) == 2
+    assert b.stats == dict(empty_stats(), evicted_budget=3, dropped_bytes=30 + 30 + 35, peak_bytes=155)
+
+
+def test_stream_cap_idle_and_release():
+    o = Owner()
+    b = BufferBudget(total_bytes=1000, stream_bytes=50, idle_seconds=10)
+    assert b.stream_bytes == 50
+    b.update(o, "big", 40, 0.0)
+    b.update(o, "big", 51, 1.0)        # pasa del tope por stream
+    assert o.evicted == ["big"] and b.stats["evicted_cap"] == 1 and b.stats["dropped_bytes"] == 51
+    b.update(o, "old", 10, 2.0)
+    b.update(o, "new", 10, 8.0)
+    # cota inferior: puede quedar la del búfer ya descartado
+    assert b.next_expire <= 12.0
+    b.update(o, "new", 15, 11.0)
+    assert o.evicted == ["big"] and b.next_expire == 12.0
+    b.update(o, "new", 20, 12.5)       # old lleva 10.5 s sin entradas
+    assert o.evicted == ["big", "old"] and b.stats["evicted_idle"] == 1
+    assert b.next_expire == 22.5
+    # soltar el búfer (completo o cerrado) no cuenta como descarte
+    b.discard(o, "new")
+    b.update(o, "x", 5, 13.0)
+    b.update(o, "x", 0, 13.5)
+    assert len(b) == 0 and b.used == 0 and evicted(b.stats) == 2
+    b.expire(1000.0)
+    assert b.next_expire == float("inf")
+    # el tope por stream nunca pasa del total
+    assert BufferBudget(total_bytes=10, stream_bytes=50).stream_bytes == 10
+
+
+def test_owner_drop_and_reporting():
+    b = BufferBudget()
+    b.drop(300)
+    b.drop(200, "idle")
+    assert b.stats["evicted_cap"] == 1 and b.stats["evicted_idle"] == 1 and b.stats["dropped_bytes"] == 500
+    total = merge_stats([b.stats, dict(empty_stats(), evicted_budget=2, dropped_bytes=1_500_000, peak_bytes=7)])
+    assert total == {"evicted_cap": 1, "evicted_budget": 2, "evicted_idle": 1, "dropped_bytes": 1_500_500,
+                     "peak_bytes": 7}
+    assert describe(total) == "4 búferes descartados (tope por stream 1, presupuesto global 2, inactivos 1; 1.5 MB)"
+    assert describe(empty_stats()) == ""
+
+
+def test_websocket_fragments_evicted_then_skipped():
+    budget = BufferBudget(total_bytes=1 << 20, stream_bytes=64, idle_seconds=0)
+    ws = WebSocketReassembler(budget)
+    feed = lambda opcode, fin, data, t="1.0": ws.feed(t, "a", "b", 1, 2, "0", opcode, fin, data)
+    assert feed("1", "0", b'[36, 1, 2, {}, ["') == []
+    assert feed("0", "0", b"x" * 60) == []              # 77 bytes pendientes > 64
+    assert budget.stats["evicted_cap"] == 1 and not ws.fragments
+    # el resto de ese mensaje se ignora hasta su FIN
+    assert feed("0", "1", b'"]]') == []
+    # el siguiente mensaje sale entero
+    msg = json.dumps([36, 1, 3, {}, ["ok"]]).encode()
+    (rec,) = feed("1", "1", msg, "2.0")
+    assert rec["opcode"] == "EVENT" and rec["raw"] == msg.decode()
+    assert budget.used == 0
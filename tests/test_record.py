@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""Record: comportamiento de dict, args/kwargs desde raw (LRU por bytes), igualdad y pickle (pool de procesos)."""
+import pickle
+
+import pytest
+
+from src.core import record
+from src.core.record import (BASE_KEYS, STORED_KEYS, TCPJSON, Record, clear_payload_cache, decode_payload,
+                             restore_columns, stored_value)
+
+EPOCH = 1700000000.123456
+RAW = '[48, 7, {}, "com.proc", [1, 2], {"k": "v"}]'
+
+
+def _rec(**extra):
+    return Record(EPOCH, "3", "10.0.0.1", "10.0.0.2", 40000, 8080, "CALL", "com.proc", "CALL", RAW,
+                  extra=extra or None)
+
+
+def test_keys_and_values_like_a_dict():
+    r = _rec(wamp_code=48, request_id=7)
+    assert list(r) == list(BASE_KEYS) + ["wamp_code", "request_id"]
+    assert len(r) == len(BASE_KEYS) + 2
+    d = dict(r)
+    assert d["time"] == "22:13:20" and d["ms"] == "123456"
+    assert d["args"] == [1, 2] and d["kwargs"] == {"k": "v"}
+    assert (d["stream"], d["src_port"], d["request_id"], d["raw"]) == ("3", 40000, 7, RAW)
+    assert r == d and d == r
+    assert "wamp_code" in r and "args" in r and "nope" not in r
+    assert r.get("nope", 1) == 1
+    with pytest.raises(KeyError):
+        r["nope"]
+
+
+def test_tcpjson_payload_and_non_json_raw():
+    r = Record(EPOCH, "1", "a", "b", 1, 2, TCPJSON, "", "obj", '{"obj": {"k": 1}}')
+    assert r["args"] == [] and r["kwargs"] == {"obj": {"k": 1}}
+    r = Record(EPOCH, "1", "a", "b", 1, 2, TCPJSON, "", "", "no es json")
+    assert r["kwargs"] == {"raw_text": "no es json"}
+    r = Record(EPOCH, "1", "a", "b", 1, 2, "TEXT", "", "", 'basura {"k": 1} más')
+    assert r["kwargs"] == {"k": 1}
+
+
+def test_assignment():
+    r = _rec()
+    r["args"] = ["propios"]
+    assert r.pinned and r["args"] == ["propios"] and r["kwargs"] == {"k": "v"}
+    r["topic"] = "otro"
+    r["extra1"] = 1
+    r["extra2"] = 2
+    r["extra1"] = 10
+    assert (r["topic"], r["extra1"], r["extra2"]) == ("otro", 10, 2)
+    del r["extra1"]
+    assert list(r)[len(BASE_KEYS):] == ["extra2"]
+    with pytest.raises(KeyError):
+        r["time"] = "00:00:00"
+    with pytest.raises(KeyError):
+        del r["src"]
+
+
+def test_values_are_interned_and_shapes_shared():
+    a = Record(EPOCH, "".join(["1", "7"]), "h", "h", 50000, 50000, "EVENT", "t", "EVENT", "[]", extra={"x": 1})
+    b = Record(EPOCH, "".join(["1", "7"]), "h", "h", 50000, 50000, "EVENT", "t", "EVENT", "[]", extra={"x": 2})
+    assert a.stream is b.stream
+    assert a.src_port is b.src_port
+    assert a._xkeys is b._xkeys
+
+
+@pytest.mark.parametrize("protocol", range(2, pickle.HIGHEST_PROTOCOL + 1))
+def test_pickle_round_trip(protocol):
+    r = _rec(wamp_code=48, request_id=7)
+    r["kwargs"] = {"asignado": True}
+    back = pickle.loads(pickle.dumps(r, protocol))
+    assert type(back) is Record
+    assert back == r
+    assert list(back) == list(r)
+    assert back.pinned and back["kwargs"] == {"asignado": True}
+    # al volver del pool se internan de nuevo y comparten forma
+    assert back.src is r.src and back._xkeys is r._xkeys
+    plain = pickle.loads(pickle.dumps(_rec(), protocol))
+    assert not plain.pinned and plain["args"] == [1, 2]
+
+
+def test_restore_columns_matches_constructor():
+    recs = [_rec(wamp_code=48, request_id=i) for i in range(3)] + [_rec()]
+    columns = {k: [stored_value(k, getattr(r, k)) for r in recs] for k in STORED_KEYS}
+    xkeys = [tuple(k for k, _ in r.extra_items()) for r in recs]
+    xvals = [tuple(v for _, v in r.extra_items()) for r in recs]
+    back = restore_columns(columns, xkeys, xvals)
+    assert back == recs
+    assert [list(b) for b in back] == [list(r) for r in recs]
+    assert all(b._xkeys is r._xkeys for b, r in zip(back, recs))
+
+
+def test_payload_cache_bounded_by_bytes(monkeypatch):
+    monkeypatch.setattr(record, "PAYLOAD_CACHE_BYTES", 4 * (100 + record.PAYLOAD_ENTRY_BYTES))
+    monkeypatch.setattr(record, "PAYLOAD_MAX_RAW_BYTES", 200)
+    clear_payload_cache()
+    raws = [f'[48, {i}, {{}}, "p", ["{"x" * (100 - 21 - len(str(i)))}"]]' for i in range(6)]
+    assert {len(r) for r in raws} == {100}
+    first = [decode_payload(False, r) for r in raws]
+    # sólo quedan los 4 últimos; los primeros se vuelven a decodificar
+    assert list(k for _, k in record._payloads) == raws[2:]
+    assert record._payload_bytes == 4 * (100 + record.PAYLOAD_ENTRY_BYTES)
+    assert decode_payload(False, raws[5]) is first[5]
+    again = decode_payload(False, raws[0])
+    assert again == first[0] and again is not first[0]
+    assert list(k for _, k in record._payloads) == raws[3:5] + [raws[5], raws[0]]
+    # un raw grande no entra en la caché
+    big = '[48, 1, {}, "p", ["' + "y" * 300 + '"]]'
+    assert decode_payload(False, big)[0] == ["y" * 300]
+    assert (False, big) not in record._payloads
+    clear_payload_cache()
+    assert not record._payloads and record._payload_bytes == 0
+
+
+def test_equality_does_not_decode(monkeypatch):
+    a, b = _rec(wamp_code=48, request_id=7), _rec(wamp_code=48, request_id=7)
+    monkeypatch.setattr(record, "_decode_payload", lambda *a: pytest.fail("decodificado al comparar"))
+    clear_payload_cache()
+    assert a == b and not (a != b)
+    b["request_id"] = 8
+    assert a != b
+    c = Record(EPOCH, "3", "10.0.0.1", "10.0.0.2", 40000, 8080, "CALL", "com.proc", "CALL", RAW + " ",
+               extra={"wamp_code": 48, "request_id": 7})
+    assert a != c
+    # extras en otro orden: igual que dos dicts
+    d = _rec(request_id=7, wamp_code=48)
+    assert a == d
+    monkeypatch.undo()
+    # con args asignados se comparan los valores
+    e = _rec(wamp_code=48, request_id=7)
+    e["args"] = [1, 2]
+    assert a == e
+    e["args"] = [3]
+    assert a != e and a != dict(e) and dict(a) != e
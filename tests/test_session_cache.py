@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Caché de sesiones: ida y vuelta, invalidación y reutilización parcial por filtro de streams."""
+import os
+
+import pytest
+
+from src.core import pcap_parser, reassembly, session_cache
+from src.core.filters import Filters
+from src.core.pcap_parser import iter_messages
+from src.core.session_cache import SessionCache
+
+from .pcapgen import T0, Flow, wamp_session, write_pcap
+
+NATIVE = dict(backend="NATIVE")
+
+
+@pytest.fixture()
+def capture(tmp_path):
+    out = []
+    for i in range(3):
+        wamp_session(out, Flow("10.0.0.1", "10.0.0.2", 40000 + i, 8080), T0 + i, calls=2)
+    # un cliente distinto que comparte el servidor: otros endpoints
+    wamp_session(out, Flow("10.0.0.9", "10.0.0.2", 41000, 8080), T0 + 0.5, calls=1)
+    out.sort(key=lambda p: p[0])
+    path = str(tmp_path / "c.pcap")
+    write_pcap(path, out)
+    return path
+
+
+def _extract(path, flt):
+    stats = {}
+    return list(iter_messages(path, flt, stats=stats)), stats.get("buffers")
+
+
+def _rows(recs):
+    return [dict(r) for r in recs]
+
+
+def test_round_trip_records_and_dicts(tmp_path, capture):
+    cache = SessionCache(root=str(tmp_path / "cache"))
+    flt = Filters(**NATIVE)
+    recs, buffers = _extract(capture, flt)
+    assert cache.load(capture, flt) is None
+    cache.store(capture, flt, recs, buffers)
+    back = cache.load(capture, flt)
+    assert _rows(back) == _rows(recs)
+    assert [list(r) for r in back] == [list(r) for r in recs]
+    # dicts sueltos (registros con args/kwargs propios) también vuelven igual
+    plain = [{"epoch": T0, "time": "", "ms": "", "stream": "0", "opcode": "X", "topic": "t", "n": [1, {"a": None}]},
+             {"epoch": T0 + 1.5, "time": "", "ms": "", "stream": "1", "opcode": "Y", "topic": {"no": "escalar"}}]
+    cache.store(capture, Filters(mode="TCP_JSON", **NATIVE), plain)
+    back = cache.load(capture, Filters(mode="TCP_JSON", **NATIVE))
+    assert [b["n"] for b in back[:1]] == [[1, {"a": None}]]
+    assert back[1]["topic"] == {"no": "escalar"} and back[1]["time"] and back[1]["ms"]
+
+
+def test_invalidation(tmp_path, capture, monkeypatch):
+    cache = SessionCache(root=str(tmp_path / "cache"))
+    flt = Filters(**NATIVE)
+    recs, buffers = _extract(capture, flt)
+    cache.store(capture, flt, recs, buffers)
+    assert cache.load(capture, flt) is not None
+    # otros límites de reensamblado: otra clave
+    monkeypatch.setattr(reassembly, "STREAM_MAX_BYTES", reassembly.STREAM_MAX_BYTES // 2)
+    assert cache.load(capture, flt) is None
+    monkeypatch.undo()
+    assert cache.load(capture, flt) is not None
+    # la captura cambia (mtime y tamaño)
+    st = os.stat(capture)
+    os.utime(capture, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    assert cache.load(capture, flt) is None
+    with open(capture, "ab") as f:
+        f.write(b"\0")
+    assert cache.load(capture, flt) is None
+
+
+def test_tshark_version_in_key(tmp_path, capture, monkeypatch):
+    cache = SessionCache(root=str(tmp_path / "cache"))
+    flt = Filters()
+    monkeypatch.setattr(pcap_parser, "_TSHARK_VERSION", (4, 2, 2))
+    cache.store(capture, flt, [{"epoch": T0, "stream": "0", "raw": "[]"}])
+    assert cache.load(capture, flt) is not None
+    monkeypatch.setattr(pcap_parser, "_TSHARK_VERSION", (4, 4, 0))
+    assert cache.load(capture, flt) is None
+
+
+@pytest.mark.parametrize("streams", ["1", "0,2-3", "7"])
+def test_partial_reuse_equals_fresh_extraction(tmp_path, capture, streams, monkeypatch):
+    monkeypatch.setattr(session_cache, "DECODE_CHUNK", 3)   # varios bloques, contiguos o no
+    cache = SessionCache(root=str(tmp_path / "cache"))
+    cache.store(capture, Filters(**NATIVE), *_extract(capture, Filters(**NATIVE)))
+    flt = Filters(streams=streams, **NATIVE)
+    fresh, _ = _extract(capture, flt)
+    back = cache.load(capture, flt)
+    assert back is not None
+    assert _rows(back) == _rows(fresh)
+
+
+def test_no_partial_reuse_with_endpoint_filters_or_budget_evictions(tmp_path, capture):
+    cache = SessionCache(root=str(tmp_path / "cache"))
+    recs, buffers = _extract(capture, Filters(**NATIVE))
+    cache.store(capture, Filters(**NATIVE), recs, buffers)
+    assert cache.load(capture, Filters(src_ip="10.0.0.9", **NATIVE)) is None
+    assert cache.load(capture, Filters(dst_port="8080", streams="1", **NATIVE)) is None
+    cache.store(capture, Filters(**NATIVE), recs, dict(buffers, evicted_budget=1))
+    assert cache.load(capture, Filters(streams="1", **NATIVE)) is None
+    # la entrada completa sigue ahí
+    assert cache.load(capture, Filters(**NATIVE)) is not None
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Arranque en frío de la GUI: presupuesto de src.startup y módulos que no
+deben importarse hasta el primer uso (ver la cabecera de src/app.py).
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("PyQt5")
+
+from src import startup  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# núcleo que se importa al abrir la primera captura o exportar, no al arrancar
+LAZY_MODULES = ("openpyxl", "src.core.pcap_parser", "src.core.jsoncodec", "src.core.flat_view",
+                "src.core.analytics", "src.core.session_cache", "src.core.reassembly",
+                "src.ui.pcap_worker")
+
+_LIST_MODULES = """
+import sys
+from PyQt5 import QtWidgets
+from src.app import Controller
+app = QtWidgets.QApplication([])
+c = Controller(app)
+print("\\n".join(sorted(sys.modules)))
+"""
+
+
+def _python(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=startup._child_env(),
+                          capture_output=True, text=True)
+
+
+def test_startup_within_budget():
+    # startup.run lanza a su vez los arranques; en un intérprete aparte para
+    # que su informe no se mezcle con la salida de pytest
+    proc = _python(f"import sys; from src import startup; sys.exit(startup.run({startup.STARTUP_BUDGET!r}))")
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+
+
+def test_core_not_imported_at_startup():
+    proc = _python(_LIST_MODULES)
+    assert proc.returncode == 0, proc.stderr
+    loaded = set(proc.stdout.split())
+    assert "src.app" in loaded
+    assert [m for m in LAZY_MODULES if m in loaded] == []
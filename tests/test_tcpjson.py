@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""TcpJsonScanner: qué objetos de un stream TCP se convierten en registros."""
+import json
+
+from src.core.pcap_parser import TcpJsonScanner
+from src.core.utils import largest_json_in_text
+
+STREAM = (b'hola {"a": 1} basura {} [48, 1, {}, "com.p", [], {"b": 2}]'
+          b' {"c": {"d": {}}} fin')
+
+
+def _scan(chunks):
+    sc = TcpJsonScanner()
+    out = []
+    for i, c in enumerate(chunks):
+        out.extend(sc.feed(str(1700000000 + i), "10.0.0.1", "10.0.0.2", 40000, 9000, "0", c))
+    return out
+
+
+def test_every_top_level_object_except_empty():
+    recs = _scan([STREAM])
+    assert [r["kwargs"] for r in recs] == [{"a": 1}, {"b": 2}, {"c": {"d": {}}}]
+    assert [r["type"] for r in recs] == ["a", "b", "c"]
+    assert all(r["opcode"] == "TCPJSON" for r in recs)
+
+
+def test_independent_of_packet_boundaries():
+    ref = [r["raw"] for r in _scan([STREAM])]
+    for size in (1, 2, 5, 16):
+        recs = _scan([STREAM[i:i + size] for i in range(0, len(STREAM), size)])
+        assert [r["raw"] for r in recs] == ref, size
+
+
+def test_epoch_of_the_packet_where_the_object_starts():
+    recs = _scan([b'{"a": ', b'1} {"b"', b': 2}'])
+    assert [(r["epoch"], json.loads(r["raw"])) for r in recs] == [
+        (1700000000.0, {"a": 1}), (1700000001.0, {"b": 2})]
+
+
+def test_differs_from_largest_object_search():
+    # la búsqueda anterior sólo daba el mayor objeto del búfer y devolvía '{}' si era el único
+    assert largest_json_in_text(STREAM.decode()) == '{"c": {"d": {}}}'
+    assert largest_json_in_text("{}") == "{}"
+    assert _scan([b"{}"]) == []
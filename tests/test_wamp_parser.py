@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Decodificador WAMP v2: tabla de mensajes y resolución de topic/procedure por sesión."""
+import json
+
+import pytest
+
+from src.core.wamp_parser import WAMP_CODES, WAMP_MESSAGES, WampSessions, decode_fields, parse_wamp_array
+
+SAMPLE = {"id": 42, "uri": "com.example.uri", "dict": {"d": 1}, "args": [1, "a"], "kwargs": {"k": "v"}}
+WRONG = {"id": "42", "uri": 7, "dict": [], "args": {}, "kwargs": []}
+
+
+def _message(code):
+    name, spec = WAMP_MESSAGES[code]
+    return [code] + [SAMPLE[kind] for _, kind in spec]
+
+
+@pytest.mark.parametrize("code", sorted(WAMP_MESSAGES))
+def test_table_round_trip(code):
+    arr = _message(code)
+    decoded = decode_fields(json.loads(json.dumps(arr)))
+    assert decoded is not None
+    got_code, fields = decoded
+    assert got_code == code
+    # los campos salen con los nombres de la tabla y en su orden
+    spec = WAMP_MESSAGES[code][1]
+    assert list(fields) == [name for name, _ in spec]
+    assert [code] + [fields[name] for name, _ in spec] == arr
+
+
+@pytest.mark.parametrize("code", sorted(WAMP_MESSAGES))
+def test_optional_args_and_wrong_types(code):
+    spec = WAMP_MESSAGES[code][1]
+    arr = _message(code)
+    required = [kind for _, kind in spec if kind not in ("args", "kwargs")]
+    # sin args/kwargs sigue siendo el mismo mensaje
+    assert decode_fields(arr[:1 + len(required)])[0] == code
+    if required:
+        assert decode_fields(arr[:len(required)]) is None
+    for i, (_, kind) in enumerate(spec):
+        bad = list(arr)
+        bad[i + 1] = WRONG[kind]
+        assert decode_fields(bad) is None, (code, kind)
+
+
+def test_not_wamp():
+    for arr in ([], [999, 1], ["Msg", 1], [True, 1], {"a": 1}, "texto"):
+        assert decode_fields(arr) is None
+
+
+def _decode(sessions, arr, stream="1"):
+    return sessions.decode(stream, json.dumps(arr))
+
+
+def test_session_resolution():
+    s = WampSessions()
+    _decode(s, [32, 1, {}, "com.topic"])                       # SUBSCRIBE
+    assert _decode(s, [33, 1, 500])[1] == "com.topic"          # SUBSCRIBED
+    opcode, topic, args, kwargs, extra = _decode(s, [36, 500, 9000, {}, [1], {"x": 2}])
+    assert (opcode, topic, args, kwargs) == ("EVENT", "com.topic", [1], {"x": 2})
+    assert extra == {"wamp_code": 36, "subscription_id": 500, "publication_id": 9000}
+    # pattern-based: el topic real va en details
+    assert _decode(s, [36, 500, 9001, {"topic": "com.topic.sub"}])[1] == "com.topic.sub"
+
+    _decode(s, [48, 7, {}, "com.proc"])                        # CALL
+    assert _decode(s, [50, 7, {"progress": True}, [1]])[1] == "com.proc"
+    assert _decode(s, [50, 7, {}, [2]])[1] == "com.proc"
+    assert _decode(s, [50, 7, {}, [3]])[1] == ""               # ya respondido
+
+    _decode(s, [48, 8, {}, "com.fails"])
+    opcode, topic, _, _, extra = _decode(s, [8, 48, 8, {}, "wamp.error.x"])
+    assert (opcode, topic, extra["wamp_error"]) == ("ERROR", "com.fails", "wamp.error.x")
+
+    _decode(s, [64, 2, {}, "com.callee"])                      # REGISTER
+    assert _decode(s, [65, 2, 77])[1] == "com.callee"
+    assert _decode(s, [68, 3, 77, {}])[1] == "com.callee"      # INVOCATION
+    assert _decode(s, [70, 3, {}])[1] == "com.callee"          # YIELD
+
+    # cada stream es una sesión distinta
+    assert _decode(s, [36, 500, 9002, {}], stream="2")[1] == ""
+    s.drop("1")
+    assert _decode(s, [36, 500, 9003, {}])[1] == ""
+
+
+def test_publish_pending_only_with_acknowledge():
+    s = WampSessions()
+    _decode(s, [16, 1, {}, "com.pub"])
+    assert _decode(s, [17, 1, 100])[1] == ""
+    _decode(s, [16, 2, {"acknowledge": True}, "com.pub"])
+    assert _decode(s, [17, 2, 101])[1] == "com.pub"
+
+
+def test_legacy_arrays():
+    opcode, topic, args, kwargs = parse_wamp_array('["MsgHello", [1, 2], {"a": 1}]')
+    assert (opcode, topic, args, kwargs) == ("MsgHello", "", [1, 2], {"a": 1})
+    assert parse_wamp_array('[48, 1, {}, "com.p", [{"only": "dict"}]]') == (
+        "CALL", "com.p", [{"only": "dict"}], {"only": "dict"})
+    assert WAMP_CODES[36] == "EVENT"
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""permessage-deflate: context takeover entre mensajes, estado por sentido, no_context_takeover y tope."""
+import json
+import zlib
+
+import pytest
+
+from src.core.pcap_parser import WebSocketReassembler
+from src.core.reassembly import BufferBudget
+from src.core.ws_deflate import DEFLATE_TAIL, DeflateStreams, Inflater, MessageTooLarge, parse_extensions
+
+CLIENT, SERVER = ("10.0.0.1", 40000), ("10.0.0.2", 8080)
+
+
+class Deflater:
+    """Emisor RFC 7692: cada mensaje acaba en un sync flush sin la cola 00 00 ff ff."""
+
+    def __init__(self, no_context_takeover=False):
+        self.no_context_takeover = no_context_takeover
+        self._c = None
+
+    def __call__(self, data: bytes) -> bytes:
+        if self._c is None or self.no_context_takeover:
+            self._c = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+        out = self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+        assert out.endswith(DEFLATE_TAIL)
+        return out[:-4]
+
+
+def _msg(i, pad=200):
+    return json.dumps([36, 555, 9000 + i, {}, [], {"n": i, "pad": "abc" * pad}]).encode()
+
+
+def test_context_takeover_across_messages():
+    enc, inf = Deflater(), Inflater()
+    first, second = enc(_msg(1)), enc(_msg(2))
+    # el segundo reutiliza la ventana del primero: mucho más pequeño
+    assert len(second) < len(first) // 2
+    assert inf.inflate(first) == _msg(1)
+    assert inf.inflate(second) == _msg(2)
+    # sin el primero no se puede descomprimir
+    assert Inflater().inflate(second) != _msg(2)
+
+
+def test_state_per_direction():
+    streams = DeflateStreams()
+    streams.handshake("0", *SERVER, "permessage-deflate")
+    to_server, to_client = Deflater(), Deflater()
+    for i in range(4):
+        # los dos sentidos se intercalan; cada uno con su propia ventana
+        assert streams.inflate("0", *CLIENT, to_server(_msg(i))) == _msg(i)
+        assert streams.inflate("0", *SERVER, to_client(_msg(100 + i))) == _msg(100 + i)
+    # otro stream no comparte estado
+    other = Deflater()
+    assert streams.inflate("1", *CLIENT, other(_msg(7))) == _msg(7)
+
+
+def test_no_context_takeover_per_direction():
+    params = parse_extensions("permessage-deflate; server_no_context_takeover")
+    assert params.no_context_takeover(True) and not params.no_context_takeover(False)
+    streams = DeflateStreams()
+    streams.handshake("0", *SERVER, "permessage-deflate; server_no_context_takeover")
+    from_server, from_client = Deflater(no_context_takeover=True), Deflater()
+    for i in range(3):
+        assert streams.inflate("0", *SERVER, from_server(_msg(i))) == _msg(i)
+        assert streams.inflate("0", *CLIENT, from_client(_msg(50 + i))) == _msg(50 + i)
+    # el emisor sin contexto no depende de mensajes anteriores: cualquiera se descomprime suelto
+    assert Inflater(no_context_takeover=True).inflate(from_server(_msg(9))) == _msg(9)
+
+
+def test_oversized_message_keeps_the_window():
+    limit = len(_msg(0))
+    enc, inf = Deflater(), Inflater(max_bytes=limit)
+    assert inf.inflate(enc(_msg(0))) == _msg(0)           # justo el tope
+    big = json.dumps(["x" * 10 * limit]).encode()
+    with pytest.raises(MessageTooLarge) as exc:
+        inf.inflate(enc(big))
+    assert exc.value.size == len(big) and inf.oversized == 1
+    # el siguiente mensaje (que referencia la ventana) sigue saliendo bien
+    assert inf.inflate(enc(_msg(1))) == _msg(1)
+    assert inf.errors == 0
+
+
+def test_reassembler_counts_oversized_as_evicted():
+    budget = BufferBudget(total_bytes=1 << 20, stream_bytes=4096)
+    ws = WebSocketReassembler(budget)
+    ws.handshake("0", *SERVER, "permessage-deflate", "wamp.2.json")
+    enc = Deflater()
+    feed = lambda data: ws.feed("1.0", SERVER[0], CLIENT[0], SERVER[1], CLIENT[1], "0", "1", "1", enc(data), rsv=4)
+    assert feed(json.dumps([36, 1, 2, {}, ["y" * 10000]]).encode()) == []
+    assert budget.stats["evicted_cap"] == 1 and budget.stats["dropped_bytes"] > 10000
+    recs = feed(_msg(3, pad=10))
+    assert [r["opcode"] for r in recs] == ["EVENT"]
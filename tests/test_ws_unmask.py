@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""ws_unmask: igual que el XOR byte a byte para toda longitud (mod 4), por bloques, con numpy y con memoryview."""
+import os
+
+import pytest
+
+from src.core import utils
+from src.core.utils import ws_unmask
+
+KEYS = [b"\x00\x00\x00\x00", b"\xff\xff\xff\xff", b"\x9a\x01\xfe\x37", b"\x80\x00\x00\x01"]
+
+
+def _reference(data: bytes, key: bytes) -> bytes:
+    return bytes(c ^ key[i % 4] for i, c in enumerate(data))
+
+
+@pytest.mark.parametrize("key", KEYS)
+def test_every_length_mod_4(key):
+    data = os.urandom(80)
+    for n in range(len(data) + 1):
+        assert ws_unmask(data[:n], key) == _reference(data[:n], key), n
+        # el resultado siempre tiene la misma longitud (ceros finales incluidos)
+        zeros = bytes(n)
+        assert ws_unmask(zeros, key) == (key * 21)[:n]
+
+
+@pytest.mark.parametrize("block", [4, 8, 64])
+def test_block_boundaries(monkeypatch, block):
+    monkeypatch.setattr(utils, "UNMASK_BLOCK", block)
+    monkeypatch.setattr(utils, "_np", None)
+    key = KEYS[2]
+    data = os.urandom(5 * block + 3)
+    for n in (block - 1, block, block + 1, 2 * block, 2 * block + 2, 3 * block + 3, len(data)):
+        assert ws_unmask(data[:n], key) == _reference(data[:n], key), n
+
+
+def test_memoryview_input_and_key():
+    frame = os.urandom(4 + 1000)
+    mv = memoryview(frame)
+    key, body = mv[:4], mv[4:]
+    for start in range(4):
+        # vistas con cualquier alineación dentro del búfer
+        assert ws_unmask(body[start:], key) == _reference(bytes(body[start:]), bytes(key))
+    assert ws_unmask(b"", key) == b""
+
+
+def test_large_payload_paths(monkeypatch):
+    key = KEYS[3]
+    data = os.urandom(utils.UNMASK_NUMPY_MIN + 13)
+    ref = _reference(data, key)
+    monkeypatch.setattr(utils, "_np", None)
+    assert ws_unmask(data, key) == ref
+    np = pytest.importorskip("numpy")
+    monkeypatch.setattr(utils, "_np", np)
+    assert ws_unmask(data, key) == ref
+    assert ws_unmask(memoryview(data)[1:], key) == _reference(data[1:], key)